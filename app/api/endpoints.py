@@ -1,19 +1,28 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Form
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import Awaitable, Callable, List, Optional, Tuple
 import time
+import asyncio
 import logging
-import requests
 from datetime import datetime
 
 from app.models import (
     DocumentUploadResponse,
     BatchUploadResponse,
+    BatchFileTiming,
     DocumentClassificationResult,
-    DocumentType
+    DocumentType,
+    JobStatusResponse
 )
-from app.services.ocr_service import ocr_service
+from app.services.ocr_worker_pool import ocr_worker_pool, OCRQueueFullError
 from app.services.classifier_service import classifier_service
-from app.services.storage_service import storage_service
+from app.services.pipeline_service import document_pipeline, ClassificationPacker
+from app.services.storage_service import storage_service, FileTooLargeError
+from app.services.ocr_cache_service import ocr_cache
+from app.services.classification_cache_service import classification_cache
+from app.services.llm_classifier_service import llm_classifier_service
+from app.services.job_service import job_store, run_merged_document_job
+from app.services.callback_service import callback_outbox
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -35,36 +44,37 @@ async def classify_document(file: UploadFile = File(...)):
     """
     Classify a single medical document
     """
+    return await _classify_single_file(file)
+
+
+async def _classify_single_file(
+    file: UploadFile,
+    reject_when_full: bool = True,
+    classify: Optional[Callable[[str], Awaitable[Tuple[DocumentType, float, List[str]]]]] = None
+) -> DocumentUploadResponse:
+    """
+    Save, OCR and classify one uploaded file (classify defaults to document_pipeline.classify)
+    """
     start_time = time.time()
     file_path = None
 
     try:
-        # Validate file size
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-            )
-
-        # Save uploaded file
-        file_id, file_path = storage_service.save_uploaded_file(file.file, file.filename)
+        # Stream to storage (size limit and hash checked while reading)
+        stored = await storage_service.save_upload(file)
+        file_id, file_path, file_size = stored.file_id, stored.file_path, stored.size
 
         # Extract text with OCR
         logger.info(f"Processing document: {file.filename}")
-        extracted_text, _ = ocr_service.extract_text(file_path)
+        extracted_text, ocr_metadata = await document_pipeline.extract_text([file_path], reject_when_full=reject_when_full)
 
         # Classify document
-        document_type, confidence, keywords_found = classifier_service.classify(extracted_text)
+        document_type, confidence, keywords_found = await (classify or document_pipeline.classify)(extracted_text)
 
         # Extract dates
         dates = classifier_service.extract_dates(extracted_text)
 
         # Move to processed directory
-        storage_service.move_to_processed(file_path, document_type.value)
+        await storage_service.move_to_processed(file_path, document_type.value)
 
         # Calculate processing time
         processing_time = (time.time() - start_time) * 1000
@@ -76,7 +86,7 @@ async def classify_document(file: UploadFile = File(...)):
             keywords_found=keywords_found,
             extracted_text=extracted_text[:500],  # First 500 chars
             extracted_dates=dates,
-            metadata={}
+            metadata=ocr_metadata
         )
 
         response = DocumentUploadResponse(
@@ -91,10 +101,21 @@ async def classify_document(file: UploadFile = File(...)):
         logger.info(f"Document classified successfully: {document_type} ({confidence:.2f})")
         return response
 
+    except HTTPException:
+        if file_path:
+            await storage_service.cleanup_temp_file(file_path)
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting document {file.filename}: {str(e)}")
+        if file_path:
+            await storage_service.cleanup_temp_file(file_path)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing document: {str(e)}")
         if file_path:
-            storage_service.cleanup_temp_file(file_path)
+            await storage_service.cleanup_temp_file(file_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -115,51 +136,34 @@ async def classify_merged_document(files: List[UploadFile] = File(...)):
 
         logger.info(f"Processing {len(files)} files as merged document")
 
-        # Extract text from all files
-        all_text_parts = []
+        # Save all files
         total_file_size = 0
         filenames = []
 
         for file in files:
-            # Validate file size
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-            total_file_size += file_size
+            # Stream to storage (size limit and hash checked while reading)
+            stored = await storage_service.save_upload(file)
+            temp_files.append((stored.file_id, stored.file_path))
+            total_file_size += stored.size
             filenames.append(file.filename)
 
-            if file_size > settings.MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File {file.filename} too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-                )
-
-            # Save temporary file
-            file_id, file_path = storage_service.save_uploaded_file(file.file, file.filename)
-            temp_files.append((file_id, file_path))
-
-            # Extract text with OCR
-            logger.info(f"  - Processing {file.filename}")
-            extracted_text, _ = ocr_service.extract_text(file_path)
-            all_text_parts.append(extracted_text)
-
-        # Merge all text
-        merged_text = ' '.join(all_text_parts)
+        # Extract and merge text from all files
+        merged_text, ocr_metadata = await document_pipeline.extract_text([path for _, path in temp_files])
         logger.info(f"Merged text from {len(files)} files: {len(merged_text)} characters")
 
         # Classify merged document
-        document_type, confidence, keywords_found = classifier_service.classify(merged_text)
+        document_type, confidence, keywords_found = await document_pipeline.classify(merged_text)
 
         # Extract dates
         dates = classifier_service.extract_dates(merged_text)
 
         # Move first file to processed directory (represents the merged document)
         main_file_id, main_file_path = temp_files[0]
-        storage_service.move_to_processed(main_file_path, document_type.value)
+        await storage_service.move_to_processed(main_file_path, document_type.value)
 
         # Clean up other temporary files
         for file_id, file_path in temp_files[1:]:
-            storage_service.cleanup_temp_file(file_path)
+            await storage_service.cleanup_temp_file(file_path)
 
         # Calculate processing time
         processing_time = (time.time() - start_time) * 1000
@@ -173,7 +177,8 @@ async def classify_merged_document(files: List[UploadFile] = File(...)):
             extracted_dates=dates,
             metadata={
                 "merged_files": filenames,
-                "total_files": len(files)
+                "total_files": len(files),
+                **ocr_metadata
             }
         )
 
@@ -189,11 +194,24 @@ async def classify_merged_document(files: List[UploadFile] = File(...)):
         logger.info(f"Merged document classified: {document_type} ({confidence:.2f})")
         return response
 
+    except HTTPException:
+        for _, file_path in temp_files:
+            await storage_service.cleanup_temp_file(file_path)
+        raise
+    except FileTooLargeError as e:
+        for _, file_path in temp_files:
+            await storage_service.cleanup_temp_file(file_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting merged document: {str(e)}")
+        for _, file_path in temp_files:
+            await storage_service.cleanup_temp_file(file_path)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing merged document: {str(e)}")
         # Cleanup all temporary files
         for _, file_path in temp_files:
-            storage_service.cleanup_temp_file(file_path)
+            await storage_service.cleanup_temp_file(file_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -201,17 +219,52 @@ async def classify_merged_document(files: List[UploadFile] = File(...)):
 async def classify_documents_batch(files: List[UploadFile] = File(...)):
     """
     Classify multiple medical documents and check completeness
+    - Files are processed concurrently (at most BATCH_CONCURRENCY at a time)
+    - Results keep the order of uploaded files
+    - LLM_BATCH_PACKING: texts of concurrently processed files are classified together
     """
-    results = []
-    failed = 0
+    start_time = time.time()
+
+    # The batch is accepted or rejected as a whole; accepted files wait for OCR workers
+    if ocr_worker_pool.is_full():
+        raise HTTPException(status_code=429, detail="OCR queue is full, retry later")
+
+    semaphore = asyncio.Semaphore(max(settings.BATCH_CONCURRENCY, 1))
+    packer = ClassificationPacker() if settings.LLM_BATCH_PACKING else None
+
+    async def process_file(file: UploadFile):
+        queued_at = time.time()
+        async with semaphore:
+            started_at = time.time()
+            try:
+                if packer is None:
+                    result = await _classify_single_file(file, reject_when_full=False)
+                else:
+                    packer.start()
+                    try:
+                        result = await _classify_single_file(file, reject_when_full=False, classify=packer.classify)
+                    finally:
+                        packer.leave()
+                error = None
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Failed to process {file.filename}: {detail}")
+                result, error = None, str(detail)
+
+        timing = BatchFileTiming(
+            filename=file.filename,
+            status="failed" if result is None else "processed",
+            queued_ms=(started_at - queued_at) * 1000,
+            processing_ms=(time.time() - started_at) * 1000,
+            error=error
+        )
+        return result, timing
 
-    for file in files:
-        try:
-            result = await classify_document(file)
-            results.append(result)
-        except Exception as e:
-            logger.error(f"Failed to process {file.filename}: {str(e)}")
-            failed += 1
+    outcomes = await asyncio.gather(*[process_file(file) for file in files])
+
+    results = [result for result, _ in outcomes if result is not None]
+    file_timings = [timing for _, timing in outcomes]
+    failed = len(files) - len(results)
 
     # Check for missing required documents
     classified_types = [r.classification.document_type for r in results]
@@ -228,103 +281,12 @@ async def classify_documents_batch(files: List[UploadFile] = File(...)):
         failed=failed,
         results=results,
         missing_required_documents=missing_docs,
-        completeness_percentage=completeness
+        completeness_percentage=completeness,
+        file_timings=file_timings,
+        processing_time_ms=(time.time() - start_time) * 1000
     )
 
 
-def send_classification_callback(element_id: str, recipe_id: str, document_type: str, classify_confidence: float):
-    """
-    Send classification result to external API as callback
-    """
-    callback_url = settings.CALLBACK_URL.replace("{elementId}", element_id)
-
-    # Calculate confidence based on recipe_id match with document_type
-    if recipe_id == document_type:
-        confidence = 1.0
-    else:
-        confidence = 0.0
-
-    payload = {
-        "classifyDocumentType": document_type,
-        "classifyConfidence": classify_confidence,
-        "confidence": confidence,
-        "recipeId": recipe_id
-    }
-
-    try:
-        logger.info(f"Sending callback to {callback_url}")
-        logger.info(f"Payload: {payload}")
-
-        response = requests.post(
-            callback_url,
-            json=payload,
-            timeout=30,
-            headers={"Content-Type": "application/json"}
-        )
-
-        if response.status_code in [200, 201, 204]:
-            logger.info(f"Callback sent successfully. Status: {response.status_code}")
-        else:
-            logger.error(f"Callback failed with status {response.status_code}: {response.text}")
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error sending callback to {callback_url}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error sending callback: {str(e)}")
-
-
-def process_merged_document_async(element_id: str, recipe_id: str, files_data: List[tuple]):
-    """
-    Process merged document classification in background and send callback
-    files_data: List of tuples (file_id, file_path, filename)
-    """
-    temp_files = []
-
-    try:
-        logger.info(f"Background processing started for element {element_id}, recipe {recipe_id}")
-
-        # Extract text from all files
-        all_text_parts = []
-
-        for file_id, file_path, filename in files_data:
-            temp_files.append((file_id, file_path))
-
-            # Extract text with OCR
-            logger.info(f"  - Processing {filename}")
-            extracted_text, _ = ocr_service.extract_text(file_path)
-            all_text_parts.append(extracted_text)
-
-        # Merge all text
-        merged_text = ' '.join(all_text_parts)
-        logger.info(f"Merged text from {len(files_data)} files: {len(merged_text)} characters")
-
-        # Classify merged document
-        document_type, confidence, keywords_found = classifier_service.classify(merged_text)
-        logger.info(f"Classification result: {document_type} ({confidence:.2f})")
-
-        # Move first file to processed directory
-        main_file_id, main_file_path = temp_files[0]
-        storage_service.move_to_processed(main_file_path, document_type.value)
-
-        # Clean up other temporary files
-        for file_id, file_path in temp_files[1:]:
-            storage_service.cleanup_temp_file(file_path)
-
-        # Send callback with classification result
-        send_classification_callback(element_id, recipe_id, document_type.value, confidence)
-
-        logger.info(f"Background processing completed for element {element_id}")
-
-    except Exception as e:
-        logger.error(f"Error in background processing for element {element_id}: {str(e)}")
-        # Cleanup all temporary files on error
-        for _, file_path in temp_files:
-            try:
-                storage_service.cleanup_temp_file(file_path)
-            except:
-                pass
-
-
 @router.post("/classify/merged/async", status_code=201)
 async def classify_merged_document_async(
     background_tasks: BackgroundTasks,
@@ -348,30 +310,34 @@ async def classify_merged_document_async(
 
         logger.info(f"Received {len(files)} files for async processing (recipe: {recipeId}, element: {elementId})")
 
+        # With celery OCR runs on the workers, the queue absorbs bursts
+        if settings.JOB_QUEUE_BACKEND != "celery" and ocr_worker_pool.is_full():
+            raise HTTPException(status_code=429, detail="OCR queue is full, retry later")
+
         # Save all files temporarily
         files_data = []
 
         for file in files:
-            # Validate file size
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-
-            if file_size > settings.MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File {file.filename} too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-                )
-
-            # Save temporary file
-            file_id, file_path = storage_service.save_uploaded_file(file.file, file.filename)
-            files_data.append((file_id, file_path, file.filename))
+            # Stream to storage; the job may run in another process, so nothing is kept in memory
+            try:
+                stored = await storage_service.save_upload(file, keep_in_memory=False)
+            except FileTooLargeError as e:
+                for _, file_path, _ in files_data:
+                    await storage_service.cleanup_temp_file(file_path)
+                raise HTTPException(status_code=400, detail=str(e))
+            files_data.append((stored.file_id, stored.file_path, file.filename))
             logger.info(f"  - Saved {file.filename} temporarily")
 
-        # Schedule background processing
-        background_tasks.add_task(process_merged_document_async, elementId, recipeId, files_data)
+        job = await run_in_threadpool(job_store.create, elementId, recipeId, len(files_data))
+        job_id = job["job_id"]
+
+        if settings.JOB_QUEUE_BACKEND == "celery":
+            from app.worker import classify_merged_document_task
+            await run_in_threadpool(classify_merged_document_task.delay, job_id, elementId, recipeId, files_data)
+        else:
+            background_tasks.add_task(run_merged_document_job, job_id, elementId, recipeId, files_data)
 
-        logger.info(f"Background task scheduled for recipe {recipeId}, element {elementId}")
+        logger.info(f"Job {job_id} queued ({settings.JOB_QUEUE_BACKEND}) for recipe {recipeId}, element {elementId}")
 
         # Return immediate response with 201
         return {
@@ -379,7 +345,9 @@ async def classify_merged_document_async(
             "message": "Document processing started",
             "recipeId": recipeId,
             "elementId": elementId,
-            "filesCount": len(files)
+            "filesCount": len(files),
+            "jobId": job_id,
+            "statusUrl": f"/api/v1/jobs/{job_id}"
         }
 
     except HTTPException:
@@ -387,3 +355,57 @@ async def classify_merged_document_async(
     except Exception as e:
         logger.error(f"Error accepting document for async processing: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Status of an asynchronous classification job
+    """
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.get("/callbacks/dead-letters")
+async def list_dead_letter_callbacks():
+    """
+    Callbacks that could not be delivered after CALLBACK_MAX_ATTEMPTS attempts
+    """
+    return await run_in_threadpool(callback_outbox.dead_letters)
+
+
+@router.post("/callbacks/dead-letters/replay")
+async def replay_dead_letter_callbacks():
+    """
+    Queue all dead-lettered callbacks for delivery again
+    """
+    replayed = await run_in_threadpool(callback_outbox.replay)
+    return {"replayed": replayed}
+
+
+@router.post("/callbacks/dead-letters/{callback_id}/replay")
+async def replay_dead_letter_callback(callback_id: str):
+    """
+    Queue one dead-lettered callback for delivery again
+    """
+    replayed = await run_in_threadpool(callback_outbox.replay, callback_id)
+    if not replayed:
+        raise HTTPException(status_code=404, detail=f"Dead-lettered callback {callback_id} not found")
+    return {"replayed": replayed}
+
+
+@router.get("/stats")
+async def get_stats():
+    """
+    Runtime statistics (cache hit/miss counters)
+    """
+    return {
+        "ocr_cache": ocr_cache.stats(),
+        "ocr_pool": ocr_worker_pool.stats(),
+        "classification_cache": classification_cache.stats(),
+        "llm": llm_classifier_service.stats(),
+        "classifier": classifier_service.stats(),
+        "callbacks": callback_outbox.stats()
+    }
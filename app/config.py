@@ -8,31 +8,141 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     API_PORT: int = 8000
+    WEB_CONCURRENCY: int = 1  # uvicorn worker processes (uvicorn reads the same variable as its --workers default)
 
     # OCR
     OCR_LANGUAGES: str = "pl,en"
     OCR_GPU: bool = False
+    OCR_PDF_DPI: int = 200
+    PDF_TEXT_LAYER_ENABLED: bool = True  # use embedded PDF text before falling back to OCR
+    PDF_TEXT_LAYER_MIN_CHARS: int = 20
+    OCR_WORKERS: int = 2  # OCR worker processes per API process (0 = background thread)
+    OCR_QUEUE_SIZE: int = 16  # max pending OCR jobs before returning 429
+    OCR_BATCH_SIZE: int = 4  # pages/images per batched EasyOCR call (1 = no batching)
+    OCR_BATCH_MAX_WAIT_MS: int = 50  # how long a page may wait for others to fill a batch
+    OCR_BACKEND: str = "easyocr"  # easyocr | tesseract (needs the tesseract binary and traineddata)
+    TESSERACT_CMD: str = "tesseract"
+    TESSERACT_PSM: int = 3  # page segmentation mode (3 = automatic)
+    TESSERACT_TIMEOUT: float = 120.0
+    OCR_TORCH_THREADS: int = 0  # PyTorch threads per OCR process (0 = cores / OCR processes of all uvicorn workers)
+    OCR_QUANTIZE: bool = True  # dynamic int8 quantization of the models on CPU
+    OCR_PARAGRAPH: bool = False  # merge text boxes into paragraphs
+    OCR_ROTATION_INFO: str = ""  # extra recognition pass per angle, e.g. "90,180,270" (empty = none)
+    OCR_CONTRAST_RETRY: bool = True  # second pass over low-confidence boxes with adjusted contrast
+    OCR_DECODER: str = "greedy"  # greedy | beamsearch | wordbeamsearch
+    OCR_SERVER_SOCKET: str = ""  # Unix socket of the shared OCR server (python -m app.ocr_server); empty = OCR in this process
+    OCR_SERVER_WORKERS: int = 2  # processes forked by the OCR server after loading the models once
+    OCR_SERVER_TIMEOUT: float = 300.0
+    MODEL_WARMUP: bool = True  # load models in the background after startup (False = on first request)
+
+    # Image preprocessing before OCR
+    # Off until their effect on accuracy is measured on real documents (benchmarks/bench_preprocessing.py)
+    OCR_PREPROCESS_GRAYSCALE: bool = False
+    OCR_PREPROCESS_CROP_MARGINS: bool = False
+    OCR_PREPROCESS_DESKEW: bool = False
+    OCR_PREPROCESS_DOWNSCALE: bool = False
+    OCR_TARGET_TEXT_HEIGHT: int = 32  # downscale so typical text is this many pixels tall
+    OCR_MAX_IMAGE_SIDE: int = 2560  # longer side limit after preprocessing
+
+    # /classify/batch: files processed concurrently per request
+    BATCH_CONCURRENCY: int = 4
+
+    # Early-exit OCR: stop reading once the document type is confidently known
+    OCR_EARLY_EXIT_ENABLED: bool = False
+    OCR_EARLY_EXIT_CONFIDENCE: float = 0.5
+    OCR_EARLY_EXIT_HEADER_FRACTION: float = 0.25  # top part of a page OCR'd first (0 = whole pages)
+    OCR_EARLY_EXIT_CHECK_LLM: bool = False  # also ask the LLM after each region (slow)
+    OCR_ROI_ENABLED: bool = False  # early exit regions are title-like text boxes first, then the rest (detect once)
+    OCR_ROI_TOP_K: int = 8  # text boxes recognized first on every page
+    OCR_ROI_MIN_CONFIDENCE: float = 0.5  # below this mean OCR confidence the whole page is recognized at once
+
+    # OCR result cache
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "/app/data/ocr_cache"
+    OCR_CACHE_MEMORY_ENTRIES: int = 256
+    OCR_CACHE_MAX_DISK_MB: int = 512
 
     # LLM Classifier (Ollama)
     OLLAMA_URL: str = "http://ollama:11434"
     OLLAMA_MODEL: str = "llama3.1:8b"
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_READ_TIMEOUT: float = 300.0  # max wait for the next streamed chunk (incl. first token)
+    LLM_TOTAL_TIMEOUT: float = 1200.0  # whole generation (CPU inference is slow)
+    LLM_MAX_CONNECTIONS: int = 4  # pooled keep-alive connections to Ollama
+    LLM_HEALTH_CHECK_INTERVAL: int = 30  # seconds between Ollama availability probes
+    LLM_WARMUP_ATTEMPTS: int = 5  # startup probes while the Ollama container is still starting
+    LLM_WARMUP_BACKOFF_SECONDS: float = 2.0  # delay before the second startup probe, doubled after each
+    LLM_KEEP_ALIVE: str = "30m"  # keep model (and cached prompt prefix) loaded between requests
+    LLM_PREFIX_WARMUP: bool = True  # evaluate the static system prompt once when Ollama becomes available
+    LLM_TEXT_TOKEN_BUDGET: int = 1000  # max document tokens sent to the LLM (0 = no limit)
+    LLM_TEXT_HEAD_TOKENS: int = 250  # always keep the beginning of the document (header) up to this
+    LLM_BATCH_PACKING: bool = False  # /classify/batch: classify several short documents in one LLM prompt
+    LLM_BATCH_MAX_DOCUMENTS: int = 6  # documents per packed prompt
+    LLM_BATCH_TOKEN_BUDGET: int = 1500  # document tokens per packed prompt (keep within the model context)
+    LLM_BATCH_MAX_DOCUMENT_TOKENS: int = 400  # longer documents are always classified alone
+
+    # Classification strategy
+    CLASSIFIER_MODE: str = "llm_first"  # llm_first | tiered (local classifier, LLM only when uncertain)
+    TIERED_CONFIDENCE_THRESHOLD: float = 0.6  # escalate below this local confidence
+    TIERED_MIN_MARGIN: float = 0.15  # escalate when the top two local types are closer than this
+    TEXT_MODEL_ENABLED: bool = True  # use the trained char n-gram model as local classifier when present
+    TEXT_MODEL_PATH: str = "/app/data/models/text_classifier.npz"
+
+    # LLM classification cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_BACKEND: str = "memory"  # memory | redis
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+
+    # Redis
+    REDIS_URL: str = "redis://redis:6379/0"
+
+    # Async job queue (/classify/merged/async)
+    JOB_QUEUE_BACKEND: str = "background"  # background (in the API process) | celery (separate workers)
+    JOB_QUEUE_NAME: str = "classification"
+    JOB_STORE_BACKEND: str = "redis"  # redis | memory (single API worker only; always redis with celery)
+    JOB_STORE_MAX_ENTRIES: int = 10000
+    JOB_TTL_SECONDS: int = 7 * 24 * 3600
+    JOB_MAX_RETRIES: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 10
 
     # File Storage
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1048576  # uploads are streamed in chunks of this size
+    UPLOAD_MEMORY_MAX_BYTES: int = 10485760  # uploads up to this size are decoded for OCR from memory (OCR_WORKERS=0 without OCR server only)
     ALLOWED_EXTENSIONS: str = "pdf,png,jpg,jpeg,tiff"
     UPLOAD_DIR: str = "/app/data/uploads"
     PROCESSED_DIR: str = "/app/data/processed"
+    STORAGE_BACKEND: str = "local"  # local (PROCESSED_DIR) | s3 (S3-compatible object storage, needs boto3)
+    STORAGE_SHARD_DEPTH: int = 2  # processed files go to <type>/<ab>/<cd>/<file> (hash prefix levels)
+    STORAGE_S3_BUCKET: str = "medical-documents"
+    STORAGE_S3_ENDPOINT_URL: str = ""  # e.g. http://minio:9000 (empty = AWS)
+    STORAGE_S3_PREFIX: str = "processed"
+    UPLOAD_JANITOR_INTERVAL: int = 600  # seconds between orphaned upload scans (0 = disabled)
+    UPLOAD_ORPHAN_MAX_AGE: int = 21600  # uploads older than this are left over from crashes
 
     # Logging
     LOG_LEVEL: str = "INFO"
 
     # Callback
     CALLBACK_URL: str
+    CALLBACK_OUTBOX_BACKEND: str = "redis"  # redis | memory (single API worker only; always redis with celery)
+    CALLBACK_TIMEOUT: float = 30.0
+    CALLBACK_CONCURRENCY: int = 8  # parallel deliveries (= pooled connections)
+    CALLBACK_MAX_ATTEMPTS: int = 8  # then the callback goes to the dead-letter list
+    CALLBACK_RETRY_BACKOFF_SECONDS: float = 5.0  # delay before the first retry (then x2)
+    CALLBACK_RETRY_MAX_DELAY: float = 600.0
+    CALLBACK_POLL_INTERVAL: float = 1.0  # seconds between outbox scans when idle
 
     @property
     def ocr_languages_list(self) -> List[str]:
         return [lang.strip() for lang in self.OCR_LANGUAGES.split(",")]
 
+    @property
+    def ocr_in_process(self) -> bool:
+        """OCR runs on a thread of the API process (no worker processes, no OCR server)"""
+        return self.OCR_WORKERS == 0 and not self.OCR_SERVER_SOCKET
+
     @property
     def allowed_extensions_list(self) -> List[str]:
         return [ext.strip() for ext in self.ALLOWED_EXTENSIONS.split(",")]
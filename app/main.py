@@ -1,11 +1,21 @@
+import time
+
+_import_started = time.time()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
 from datetime import datetime
 
 from app.api.endpoints import router
 from app.models import HealthCheckResponse
 from app.config import settings
+from app.services.ocr_worker_pool import ocr_worker_pool
+from app.services.llm_classifier_service import llm_classifier_service
+from app.services.storage_service import storage_service
+from app.services.callback_service import callback_outbox
+from app.services.warmup_service import model_warmup
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +25,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+model_warmup.record("imports", time.time() - _import_started)
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -39,7 +51,27 @@ app.include_router(router, prefix="/api/v1", tags=["documents"])
 async def startup_event():
     """Application startup"""
     logger.info("Starting application...")
-    logger.info("Ready to classify documents!")
+    with model_warmup.step("ocr_pool"):
+        ocr_worker_pool.start()
+    with model_warmup.step("background_tasks"):
+        storage_service.start_janitor()
+        callback_outbox.start()
+
+    # Models load in the background; /ready reports when they are in memory
+    model_warmup.register("ocr", ocr_worker_pool.warmup, required=True)
+    model_warmup.register("llm", llm_classifier_service.warmup, required=False)
+    model_warmup.start()
+    logger.info(f"Serving after {model_warmup.timings()} (models warming up: {settings.MODEL_WARMUP})")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Application shutdown"""
+    await model_warmup.stop()
+    ocr_worker_pool.shutdown()
+    await storage_service.stop_janitor()
+    await callback_outbox.stop()
+    await llm_classifier_service.aclose()
 
 
 @app.get("/", response_model=HealthCheckResponse)
@@ -58,6 +90,13 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness check - 503 until the OCR model is loaded, with per-component startup timings"""
+    status = model_warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -48,6 +48,14 @@ class DocumentUploadResponse(BaseModel):
     processing_time_ms: float
 
 
+class BatchFileTiming(BaseModel):
+    filename: str
+    status: str  # processed | failed
+    queued_ms: float  # waiting for a free concurrency slot
+    processing_ms: float
+    error: Optional[str] = None
+
+
 class BatchUploadResponse(BaseModel):
     total_documents: int
     successfully_processed: int
@@ -55,6 +63,29 @@ class BatchUploadResponse(BaseModel):
     results: List[DocumentUploadResponse]
     missing_required_documents: List[str]
     completeness_percentage: float
+    file_timings: List[BatchFileTiming] = []
+    processing_time_ms: Optional[float] = None
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    RETRYING = "retrying"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    element_id: str
+    recipe_id: str
+    files_count: int
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[Dict] = None
+    error: Optional[str] = None
 
 
 class HealthCheckResponse(BaseModel):
@@ -0,0 +1,153 @@
+"""
+Shared OCR inference server (OCR_SERVER_SOCKET)
+
+Run with:
+    python -m app.ocr_server
+
+The master process loads the EasyOCR models once and then forks
+OCR_SERVER_WORKERS workers. Forked workers share the model weights with the
+master copy-on-write, so each extra worker costs little more than its own
+activations, instead of a full copy of the models per uvicorn worker (or per
+OCR_WORKERS process of every uvicorn worker). API processes send OCR jobs over
+a Unix socket; the server needs the same UPLOAD_DIR as the API.
+
+Protocol: one JSON request line per connection, {"job": name, "args": [...]},
+answered by one JSON line, {"result": ...} or {"error": "..."}.
+"""
+import os
+import json
+import signal
+import socket
+import logging
+from typing import Callable, Dict, List
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# OCR jobs answer [result, preprocessing timings], like the worker pool's jobs
+
+def _extract_region(file_path: str, page_number: int, region: str) -> List:
+    from app.services.ocr_service import ocr_service
+    return [ocr_service.extract_text_from_region(file_path, page_number, region), ocr_service.take_preprocess_timings()]
+
+
+def _extract_batch(items: List[List]) -> List:
+    from app.services.ocr_service import ocr_service
+    return [ocr_service.extract_text_batch([tuple(item) for item in items]), ocr_service.take_preprocess_timings()]
+
+
+def _extract_roi(file_path: str, page_number: int, region: str) -> List:
+    from app.services.ocr_service import ocr_service
+    return [list(ocr_service.extract_roi(file_path, page_number, region)), ocr_service.take_preprocess_timings()]
+
+
+def _warmup() -> List:
+    from app.services.ocr_service import ocr_service
+    return [os.getpid(), ocr_service.load_seconds, ocr_service.warmup()]
+
+
+# Jobs a client may request (JSON in and out, no pickled callables)
+OCR_JOBS: Dict[str, Callable] = {
+    "extract_region": _extract_region,
+    "extract_batch": _extract_batch,
+    "extract_roi": _extract_roi,
+    "warmup": _warmup,
+}
+
+
+def handle_request(line: bytes) -> Dict:
+    try:
+        request = json.loads(line)
+        job = OCR_JOBS.get(request.get("job"))
+        if job is None:
+            return {"error": f"Unknown OCR job: {request.get('job')}"}
+        return {"result": job(*request.get("args", []))}
+    except Exception as e:
+        logger.error(f"OCR job failed: {str(e)}")
+        return {"error": f"{type(e).__name__}: {str(e)}"}
+
+
+def _serve_forever(server: socket.socket):
+    """Worker loop: accept a connection, run its job, answer, repeat"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    logger.info(f"OCR server worker {os.getpid()} ready")
+
+    while True:
+        connection, _ = server.accept()
+        with connection, connection.makefile("rwb") as stream:
+            line = stream.readline()
+            if not line:
+                continue
+            stream.write(json.dumps(handle_request(line)).encode("utf-8") + b"\n")
+            stream.flush()
+
+
+def _fork_worker(server: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _serve_forever(server)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve(socket_path: str, workers: int):
+    """
+    Load the models, bind the socket and supervise forked workers (restarted if they die)
+    """
+    # Loading - but not running - the models before fork keeps the weights shared
+    # and avoids forking an initialized PyTorch thread pool
+    from app.services.ocr_service import ocr_service
+    logger.info(f"OCR models loaded in {ocr_service.load_seconds:.1f}s, forking {workers} worker(s)")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o660)
+    server.listen(128)
+
+    children = {_fork_worker(server) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info(f"🚀 OCR server listening on {socket_path}")
+
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+            if not stopping:
+                logger.warning(f"OCR server worker {pid} exited ({status}), starting a new one")
+                children.add(_fork_worker(server))
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    serve(settings.OCR_SERVER_SOCKET or "/tmp/ocr.sock", settings.OCR_SERVER_WORKERS)
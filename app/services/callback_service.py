@@ -0,0 +1,396 @@
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+from app.config import settings
+from app.services.classification_cache_service import REDIS_SUPPORT
+
+if REDIS_SUPPORT:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+
+def build_callback_payload(recipe_id: str, document_type: str, classify_confidence: float) -> Dict:
+    """
+    Body of the classification callback sent to the checklist service
+    """
+    # Calculate confidence based on recipe_id match with document_type
+    if recipe_id == document_type:
+        confidence = 1.0
+    else:
+        confidence = 0.0
+
+    return {
+        "classifyDocumentType": document_type,
+        "classifyConfidence": classify_confidence,
+        "confidence": confidence,
+        "recipeId": recipe_id
+    }
+
+
+def callback_retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter after `attempts` failed deliveries
+    """
+    delay = min(settings.CALLBACK_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.CALLBACK_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class MemoryOutboxBackend:
+    """
+    In-process outbox (JOB_QUEUE_BACKEND=background on a single API process);
+    pending callbacks are lost on restart
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._due: Dict[str, float] = {}
+        self._items: Dict[str, str] = {}
+        self._dead: Dict[str, str] = {}
+
+    def add(self, item: Dict, due_at: float):
+        with self._lock:
+            self._items[item["id"]] = json.dumps(item)
+            self._due[item["id"]] = due_at
+
+    def claim(self, now: float, limit: int, lease_until: float) -> List[Dict]:
+        with self._lock:
+            ids = sorted((due_at, item_id) for item_id, due_at in self._due.items() if due_at <= now)[:limit]
+            for _, item_id in ids:
+                self._due[item_id] = lease_until
+            return [json.loads(self._items[item_id]) for _, item_id in ids]
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._items.pop(item_id, None)
+            self._due.pop(item_id, None)
+
+    def add_dead(self, item: Dict):
+        with self._lock:
+            self._items.pop(item["id"], None)
+            self._due.pop(item["id"], None)
+            self._dead[item["id"]] = json.dumps(item)
+
+    def list_dead(self) -> List[Dict]:
+        with self._lock:
+            return [json.loads(value) for value in self._dead.values()]
+
+    def pop_dead(self, item_id: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._dead.pop(item_id, None)
+        return json.loads(value) if value is not None else None
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            return min(self._due.values(), default=None)
+
+    def counts(self) -> Dict:
+        return {"pending": len(self._items), "dead": len(self._dead)}
+
+
+class RedisOutboxBackend:
+    """
+    Outbox in Redis, shared by the API and Celery workers and surviving restarts.
+    Pending callbacks are a sorted set scored by the next delivery time; a claim
+    moves the score to the end of a lease, so a callback whose sender died is
+    delivered again (at-least-once).
+    """
+
+    # Atomically take due ids and push their score to the lease end
+    CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    redis.call('ZADD', KEYS[1], ARGV[3], id)
+end
+return ids
+"""
+
+    def __init__(self, redis_url: str, prefix: str = "callback:"):
+        if not REDIS_SUPPORT:
+            raise RuntimeError("Redis support not available. Install redis: pip install redis")
+
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+        self.due_key = f"{prefix}due"
+        self.items_key = f"{prefix}items"
+        self.dead_key = f"{prefix}dead"
+        self._claim = self.client.register_script(self.CLAIM_SCRIPT)
+
+    def add(self, item: Dict, due_at: float):
+        pipeline = self.client.pipeline()
+        pipeline.hset(self.items_key, item["id"], json.dumps(item))
+        pipeline.zadd(self.due_key, {item["id"]: due_at})
+        pipeline.execute()
+
+    def claim(self, now: float, limit: int, lease_until: float) -> List[Dict]:
+        ids = self._claim(keys=[self.due_key], args=[now, limit, lease_until])
+        if not ids:
+            return []
+        values = self.client.hmget(self.items_key, ids)
+        return [json.loads(value) for value in values if value is not None]
+
+    def remove(self, item_id: str):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.due_key, item_id)
+        pipeline.hdel(self.items_key, item_id)
+        pipeline.execute()
+
+    def add_dead(self, item: Dict):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.due_key, item["id"])
+        pipeline.hdel(self.items_key, item["id"])
+        pipeline.hset(self.dead_key, item["id"], json.dumps(item))
+        pipeline.execute()
+
+    def list_dead(self) -> List[Dict]:
+        return [json.loads(value) for value in self.client.hvals(self.dead_key)]
+
+    def pop_dead(self, item_id: str) -> Optional[Dict]:
+        pipeline = self.client.pipeline()
+        pipeline.hget(self.dead_key, item_id)
+        pipeline.hdel(self.dead_key, item_id)
+        value, _ = pipeline.execute()
+        return json.loads(value) if value is not None else None
+
+    def next_due(self) -> Optional[float]:
+        first = self.client.zrange(self.due_key, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    def counts(self) -> Dict:
+        return {"pending": self.client.hlen(self.items_key), "dead": self.client.hlen(self.dead_key)}
+
+
+class CallbackOutbox:
+    """
+    Reliable delivery of classification callbacks.
+
+    Jobs only enqueue() a callback (persisted in the outbox backend). The API process
+    runs the sender: due callbacks are posted with a pooled httpx.AsyncClient, at
+    most CALLBACK_CONCURRENCY at a time. Failures are retried with exponential
+    backoff; after CALLBACK_MAX_ATTEMPTS the callback goes to the dead-letter list,
+    from which it can be replayed (POST /api/v1/callbacks/dead-letters/replay).
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "delivered": 0,
+            "failed_attempts": 0,
+            "retries_scheduled": 0,
+            "dead_lettered": 0,
+            "replayed": 0,
+            "delivery_latency_seconds": 0.0,
+            "max_delivery_latency_seconds": 0.0,
+            "delivered_attempts": 0,
+        }
+
+    def enqueue(self, element_id: str, recipe_id: str, document_type: str, classify_confidence: float) -> Dict:
+        """
+        Persist a callback for delivery (safe to call from worker threads and processes)
+        """
+        item = {
+            "id": str(uuid.uuid4()),
+            "url": settings.CALLBACK_URL.replace("{elementId}", element_id),
+            "payload": build_callback_payload(recipe_id, document_type, classify_confidence),
+            "element_id": element_id,
+            "attempts": 0,
+            "created_at": time.time(),
+            "last_error": None,
+        }
+        self.backend.add(item, due_at=time.time())
+        self._count("enqueued")
+        logger.info(f"Callback {item['id']} queued for element {element_id}")
+        self._wake()
+        return item
+
+    def dead_letters(self) -> List[Dict]:
+        return sorted(self.backend.list_dead(), key=lambda item: item["created_at"])
+
+    def replay(self, item_id: Optional[str] = None) -> int:
+        """
+        Move one (or every) dead-lettered callback back to the outbox with a fresh attempt budget
+        Returns: number of replayed callbacks
+        """
+        ids = [item_id] if item_id is not None else [item["id"] for item in self.backend.list_dead()]
+        replayed = 0
+        for dead_id in ids:
+            item = self.backend.pop_dead(dead_id)
+            if item is None:
+                continue
+            item["attempts"] = 0
+            self.backend.add(item, due_at=time.time())
+            replayed += 1
+
+        if replayed:
+            self._count("replayed", replayed)
+            logger.info(f"Replaying {replayed} dead-lettered callback(s)")
+            self._wake()
+        return replayed
+
+    # Sender
+
+    def start(self):
+        """
+        Start the delivery loop on the running event loop (API startup)
+        """
+        if self._sender is None:
+            self._wakeup = asyncio.Event()
+            self._sender = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._sender is not None:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except asyncio.CancelledError:
+                pass
+            self._sender = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _wake(self):
+        if self._wakeup is None:
+            return
+        try:
+            loop = self._sender.get_loop()
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Loop already closed (shutdown)
+            pass
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.CALLBACK_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.CALLBACK_CONCURRENCY,
+                    max_keepalive_connections=settings.CALLBACK_CONCURRENCY
+                )
+            )
+        return self._client
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                delivered_any = await self.deliver_due()
+            except Exception as e:
+                logger.error(f"Callback sender failed: {str(e)}")
+                delivered_any = False
+
+            if delivered_any:
+                continue
+
+            next_due = await loop.run_in_executor(None, self.backend.next_due)
+            wait = settings.CALLBACK_POLL_INTERVAL
+            if next_due is not None:
+                wait = min(wait, max(next_due - time.time(), 0.05))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver_due(self) -> bool:
+        """
+        Claim due callbacks and deliver them concurrently
+        Returns: True when anything was claimed
+        """
+        loop = asyncio.get_running_loop()
+        now = time.time()
+        items = await loop.run_in_executor(
+            None, self.backend.claim, now, settings.CALLBACK_CONCURRENCY, now + settings.CALLBACK_TIMEOUT * 2
+        )
+        if not items:
+            return False
+
+        results = await asyncio.gather(*[self._deliver(item) for item in items], return_exceptions=True)
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                # Outbox write failed - the lease expires and the callback is claimed again
+                logger.error(f"Callback {item['id']} could not be recorded: {str(result)}")
+        return True
+
+    async def _deliver(self, item: Dict):
+        loop = asyncio.get_running_loop()
+        item["attempts"] += 1
+        error = None
+
+        try:
+            logger.info(f"Sending callback to {item['url']} (attempt {item['attempts']})")
+            response = await self._get_client().post(item["url"], json=item["payload"])
+            if response.status_code not in (200, 201, 204):
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            # Not only transport errors: an invalid callback URL or an unserializable
+            # payload must also end in a retry / dead letter, not in an endless lease loop
+            error = f"{type(e).__name__}: {str(e)}"
+
+        if error is None:
+            latency = time.time() - item["created_at"]
+            await loop.run_in_executor(None, self.backend.remove, item["id"])
+            with self._stats_lock:
+                self._stats["delivered"] += 1
+                self._stats["delivered_attempts"] += item["attempts"]
+                self._stats["delivery_latency_seconds"] += latency
+                self._stats["max_delivery_latency_seconds"] = max(self._stats["max_delivery_latency_seconds"], latency)
+            logger.info(f"Callback {item['id']} delivered after {item['attempts']} attempt(s), {latency:.2f}s")
+            return
+
+        self._count("failed_attempts")
+        item["last_error"] = error
+        if item["attempts"] >= settings.CALLBACK_MAX_ATTEMPTS:
+            item["dead_lettered_at"] = datetime.utcnow().isoformat()
+            await loop.run_in_executor(None, self.backend.add_dead, item)
+            self._count("dead_lettered")
+            logger.error(f"Callback {item['id']} dead-lettered after {item['attempts']} attempt(s): {error}")
+            return
+
+        delay = callback_retry_delay(item["attempts"])
+        await loop.run_in_executor(None, self.backend.add, item, time.time() + delay)
+        self._count("retries_scheduled")
+        logger.warning(f"Callback {item['id']} failed ({error}), retry in {delay:.0f}s")
+
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            stats.update(self.backend.counts())
+        except Exception as e:
+            logger.warning(f"Could not read callback outbox size: {e}")
+        delivered = stats["delivered"]
+        stats["avg_delivery_latency_seconds"] = stats["delivery_latency_seconds"] / delivered if delivered else 0.0
+        stats["avg_attempts"] = stats["delivered_attempts"] / delivered if delivered else 0.0
+        return stats
+
+
+def _create_backend():
+    if settings.CALLBACK_OUTBOX_BACKEND == "redis" or settings.JOB_QUEUE_BACKEND == "celery":
+        try:
+            return RedisOutboxBackend(settings.REDIS_URL)
+        except Exception as e:
+            # No in-memory fallback: pending callbacks would be lost on restart
+            raise RuntimeError(f"Redis callback outbox unavailable at {settings.REDIS_URL}: {e}") from e
+
+    return MemoryOutboxBackend()
+
+
+# Singleton instance
+callback_outbox = CallbackOutbox(_create_backend())
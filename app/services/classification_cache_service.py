@@ -0,0 +1,171 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_SUPPORT = True
+except ImportError:
+    REDIS_SUPPORT = False
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize OCR text so that trivially different extractions share a cache key
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache with TTL and max-entries (LRU) eviction
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis-backed cache shared between API workers; eviction is done by key TTL
+    (max entries should be enforced with Redis maxmemory policy)
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int, prefix: str = "llm_cache:"):
+        if not REDIS_SUPPORT:
+            raise RuntimeError("Redis support not available. Install redis: pip install redis")
+
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+        # Fail here, so callers fall back to the in-memory backend when Redis is unreachable
+        self.client.ping()
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str):
+        self.client.setex(self.prefix + key, self.ttl_seconds, value)
+
+    def size(self) -> int:
+        return -1
+
+
+class ClassificationCache:
+    """
+    Cache of LLM classification results keyed by normalized text, model and prompt version
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def build_key(text: str, model_name: str, prompt_version: str) -> str:
+        payload = f"{prompt_version}\x00{model_name}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up cached classification
+        Returns: dict with document_type, confidence, reasoning or None on miss
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Classification cache lookup failed: {e}")
+            self._count("errors")
+            return None
+
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return json.loads(value)
+
+    def put(self, key: str, result: Dict):
+        if not self.enabled:
+            return
+
+        try:
+            self.backend.set(key, json.dumps(result, ensure_ascii=False))
+            self._count("stores")
+        except Exception as e:
+            logger.warning(f"Classification cache store failed: {e}")
+            self._count("errors")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["evictions"] = self.backend.evictions
+        stats["entries"] = self.backend.size()
+        stats["backend"] = type(self.backend).__name__
+        stats["enabled"] = self.enabled
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def _create_backend():
+    if settings.LLM_CACHE_BACKEND == "redis":
+        try:
+            return RedisCacheBackend(settings.REDIS_URL, settings.LLM_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Redis classification cache unavailable ({e}), using in-memory cache")
+
+    return MemoryCacheBackend(settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MAX_ENTRIES)
+
+
+# Singleton instance
+classification_cache = ClassificationCache(_create_backend(), enabled=settings.LLM_CACHE_ENABLED)
@@ -1,10 +1,22 @@
 import re
+import time
 import logging
-from typing import List, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
 from app.models import DocumentType
+from app.config import settings
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.text_selection import select_salient_text
 
 logger = logging.getLogger(__name__)
 
+# Types the local tier tells apart poorly - always confirmed by the LLM when they are the top two
+CONFUSABLE_PAIRS = {
+    frozenset({DocumentType.PT_INR, DocumentType.INR_ANTYKOAGULANTY}),
+    frozenset({DocumentType.POZIOM_HBS, DocumentType.ANTYGEN_HBS}),
+    frozenset({DocumentType.ANTYGEN_HBS, DocumentType.ANTYGEN_HCV}),
+}
+
 
 class DocumentClassifier:
     def __init__(self):
@@ -16,6 +28,22 @@ class DocumentClassifier:
             logger.warning(f"Failed to import LLM classifier: {e}")
             self.llm_classifier = None
 
+        # Trained char n-gram model for the local tier (None = keyword rules)
+        from app.services.text_classifier_service import load_text_classifier
+        self.text_model = load_text_classifier()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "classifications": 0,
+            "local_decisions": 0,
+            "escalations": 0,
+            "escalation_reasons": {},
+            "local_seconds": 0.0,
+            "local_calls": 0,
+            "llm_seconds": 0.0,
+            "llm_calls": 0,
+        }
+
         # Define classification rules (fallback)
         self.classification_rules = {
             DocumentType.GRUPA_KRWI: [
@@ -85,71 +113,273 @@ class DocumentClassifier:
                 'zaświadczenie', 'onkolog', 'onkologia', 'nowotwór'
             ],
         }
+        self.keyword_matcher = KeywordMatcher(self.classification_rules)
 
     def classify(self, text: str) -> Tuple[DocumentType, float, List[str]]:
         """
-        Classify document based on extracted text using LLM-first approach
+        Synchronous wrapper of classify_async (must not be called from a running event loop)
         Returns: (document_type, confidence, keywords_found)
         """
+        # The Ollama client of this event loop is closed together with it
+        from app.services.llm_classifier_service import llm_classifier_service
+        return llm_classifier_service.run_sync(self.classify_async(text))
+
+    async def classify_async(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        """
+        Classify document based on extracted text
+        - CLASSIFIER_MODE=llm_first: LLM, rules only as fallback
+        - CLASSIFIER_MODE=tiered: local classifier, LLM only for uncertain cases
+        Returns: (document_type, confidence, keywords_found)
+        """
+        self._count("classifications")
+        if settings.CLASSIFIER_MODE == "tiered":
+            return await self._classify_tiered(text)
+
         # Try LLM classification first (primary method)
         if self.llm_classifier and self.llm_classifier.enabled:
-            llm_type, llm_confidence, llm_reasoning = self.llm_classifier.classify(text)
+            result = await self._classify_llm(text)
+            if result is not None:
+                return result
 
-            if llm_type and llm_confidence > 0.0:
-                logger.info(f"✓ LLM Classification: {llm_type} (confidence: {llm_confidence:.2f})")
-                logger.debug(f"  Reasoning: {llm_reasoning}")
+        # Fallback to rule-based classification only if LLM is disabled or failed
+        logger.info("⚠ Falling back to local classification (LLM unavailable)")
+        start_time = time.perf_counter()
+        result = self._classify_local(text)
+        self._record_latency("local", start_time)
+        return result
 
-                # Extract keywords for reference (but don't use for validation)
-                keywords_for_type = self.classification_rules.get(llm_type, [])
-                found_keywords = [kw for kw in keywords_for_type if kw.lower() in text.lower()]
+    async def classify_many_async(self, texts: List[str]) -> List[Tuple[DocumentType, float, List[str]]]:
+        """
+        Classify several documents at once - texts that need the LLM share packed
+        prompts (see LLMClassifierService.classify_many_async)
+        Returns: (document_type, confidence, keywords_found) per text, in input order
+        """
+        results: List[Optional[Tuple[DocumentType, float, List[str]]]] = [None] * len(texts)
+        fallbacks = {}
 
-                # Trust LLM decision - return its classification
-                return llm_type, llm_confidence, found_keywords if found_keywords else [llm_reasoning]
+        for i, text in enumerate(texts):
+            self._count("classifications")
+            if settings.CLASSIFIER_MODE == "tiered":
+                local_result, reason = self._local_decision(text)
+                if reason is None:
+                    results[i] = local_result
+                    continue
+                fallbacks[i] = local_result
             else:
-                logger.warning(f"LLM returned no classification or zero confidence")
+                fallbacks[i] = None
 
-        # Fallback to rule-based classification only if LLM is disabled or failed
-        logger.info("⚠ Falling back to rule-based classification (LLM unavailable)")
-        rule_type, rule_confidence, rule_keywords = self._classify_rules_based(text)
-        return rule_type, rule_confidence, rule_keywords
+        if fallbacks and self.llm_classifier and self.llm_classifier.enabled:
+            indices = list(fallbacks)
+            start_time = time.perf_counter()
+            llm_results = await self.llm_classifier.classify_many_async([self.prepare_llm_text(texts[i])[0] for i in indices])
+            self._record_latency("llm", start_time)
+            for i, (llm_type, llm_confidence, llm_reasoning) in zip(indices, llm_results):
+                results[i] = self._llm_result(texts[i], llm_type, llm_confidence, llm_reasoning)
 
-    def _classify_rules_based(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        for i, local_result in fallbacks.items():
+            if results[i] is None:
+                results[i] = local_result if local_result is not None else self._classify_local(texts[i])
+        return results
+
+    async def _classify_tiered(self, text: str) -> Tuple[DocumentType, float, List[str]]:
         """
-        Rule-based classification (original method)
+        Local tier first; escalate to the LLM when its answer is uncertain
+        """
+        local_result, reason = self._local_decision(text)
+        if reason is None:
+            return local_result
+
+        if self.llm_classifier and self.llm_classifier.enabled:
+            result = await self._classify_llm(text)
+            if result is not None:
+                return result
+
+        logger.info("⚠ LLM unavailable, keeping local classification")
+        return local_result
+
+    def _local_decision(self, text: str) -> Tuple[Tuple[DocumentType, float, List[str]], Optional[str]]:
+        """
+        Local tier answer and why it must be escalated (None = accept it)
+        Returns: ((document_type, confidence, keywords_found), escalation_reason)
+        """
+        start_time = time.perf_counter()
+        ranked = self._rank_local(text)
+        self._record_latency("local", start_time)
+
+        local_result = ranked[0] if ranked else (DocumentType.INNE, 0.0, [])
+        reason = self._escalation_reason(ranked)
+
+        if reason is None:
+            self._count("local_decisions")
+            logger.info(f"✓ Local classification: {local_result[0]} (confidence: {local_result[1]:.2f})")
+            return local_result, None
+
+        self._count("escalations")
+        with self._stats_lock:
+            reasons = self._stats["escalation_reasons"]
+            reasons[reason] = reasons.get(reason, 0) + 1
+        logger.info(f"↑ Escalating to LLM ({reason}), local: {local_result[0]} ({local_result[1]:.2f})")
+        return local_result, reason
+
+    def _escalation_reason(self, ranked: List[Tuple[DocumentType, float, List[str]]]) -> Optional[str]:
+        """
+        Why the local answer is not trusted (None = accept it)
+        """
+        if not ranked:
+            return "no_match"
+
+        top_type, top_confidence, _ = ranked[0]
+        if top_confidence < settings.TIERED_CONFIDENCE_THRESHOLD:
+            return "low_confidence"
+
+        if len(ranked) > 1:
+            second_type, second_confidence, _ = ranked[1]
+            if top_confidence - second_confidence < settings.TIERED_MIN_MARGIN:
+                return "small_margin"
+            if frozenset({top_type, second_type}) in CONFUSABLE_PAIRS:
+                return "confusable_pair"
+
+        return None
+
+    async def _classify_llm(self, text: str) -> Optional[Tuple[DocumentType, float, List[str]]]:
+        """
+        LLM tier
+        Returns: (document_type, confidence, keywords_found) or None when the LLM gave no answer
+        """
+        start_time = time.perf_counter()
+        llm_type, llm_confidence, llm_reasoning = await self.llm_classifier.classify_async(self.prepare_llm_text(text)[0])
+        self._record_latency("llm", start_time)
+        return self._llm_result(text, llm_type, llm_confidence, llm_reasoning)
+
+    def prepare_llm_text(self, text: str) -> Tuple[str, Dict]:
+        """
+        Text actually sent to the LLM: OCR noise removed and, above LLM_TEXT_TOKEN_BUDGET,
+        only the header and the spans with most classification keywords
+        Returns: (llm_text, metadata with original vs. sent token counts)
+        """
+        return select_salient_text(
+            text,
+            token_budget=settings.LLM_TEXT_TOKEN_BUDGET,
+            head_tokens=settings.LLM_TEXT_HEAD_TOKENS,
+            score=lambda segment: len(self.keyword_matcher.find(segment))
+        )
+
+    def _llm_result(self, text: str, llm_type: Optional[DocumentType], llm_confidence: float,
+                    llm_reasoning: str) -> Optional[Tuple[DocumentType, float, List[str]]]:
+        """
+        LLM answer with keywords for reference, None when the LLM gave no answer
+        """
+        if llm_type and llm_confidence > 0.0:
+            logger.info(f"✓ LLM Classification: {llm_type} (confidence: {llm_confidence:.2f})")
+            logger.debug(f"  Reasoning: {llm_reasoning}")
+
+            # Extract keywords for reference (but don't use for validation)
+            found_keywords = self.keyword_matcher.match(text).get(llm_type, [])
+
+            # Trust LLM decision - return its classification
+            return llm_type, llm_confidence, found_keywords if found_keywords else [llm_reasoning]
+
+        logger.warning(f"LLM returned no classification or zero confidence")
+        return None
+
+    def _rank_local(self, text: str) -> List[Tuple[DocumentType, float, List[str]]]:
+        """
+        Local tier candidates, best first (trained model when loaded, keyword rules otherwise)
+        """
+        if self.text_model is None:
+            return self._score_rules(text)
+
+        hits = self.keyword_matcher.match(text)
+        return [
+            (DocumentType(label), probability, hits.get(DocumentType(label), []))
+            for label, probability in self.text_model.rank(text)
+        ]
+
+    def _classify_local(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        """
+        Best local candidate
         Returns: (document_type, confidence, keywords_found)
         """
-        text_lower = text.lower()
+        if self.text_model is None:
+            return self._classify_rules_based(text)
 
-        best_match = DocumentType.INNE
-        best_score = 0.0
-        best_keywords = []
+        ranked = self._rank_local(text)
+        best_match, best_score, best_keywords = ranked[0] if ranked else (DocumentType.INNE, 0.0, [])
+        logger.info(f"Text model classification: {best_match} (confidence: {best_score:.2f})")
+        return best_match, best_score, best_keywords
 
-        for doc_type, keywords in self.classification_rules.items():
-            found_keywords = []
-            score = 0
+    def _record_latency(self, tier: str, start_time: float):
+        with self._stats_lock:
+            self._stats[f"{tier}_seconds"] += time.perf_counter() - start_time
+            self._stats[f"{tier}_calls"] += 1
 
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    found_keywords.append(keyword)
-                    score += 1
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
 
-            # Calculate confidence based on number of matching keywords
-            if score > 0:
-                confidence = min(score / len(keywords), 1.0)
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["escalation_reasons"] = dict(self._stats["escalation_reasons"])
 
-                if confidence > best_score:
-                    best_score = confidence
-                    best_match = doc_type
-                    best_keywords = found_keywords
+        tiered = stats["local_decisions"] + stats["escalations"]
+        stats["mode"] = settings.CLASSIFIER_MODE
+        stats["local_model"] = "text_model" if self.text_model is not None else "rules"
+        stats["escalation_rate"] = stats["escalations"] / tiered if tiered else 0.0
+        stats["local_avg_ms"] = stats["local_seconds"] / stats["local_calls"] * 1000 if stats["local_calls"] else 0.0
+        stats["llm_avg_ms"] = stats["llm_seconds"] / stats["llm_calls"] * 1000 if stats["llm_calls"] else 0.0
+        return stats
 
-        # Boost confidence for exact matches
-        if best_score > 0:
-            best_score = min(best_score * 1.2, 1.0)
+    async def should_stop_ocr(self, text: str) -> Tuple[bool, float]:
+        """
+        Decide whether enough text has been OCR'd to classify the document
+        Returns: (stop, confidence)
+        """
+        threshold = settings.OCR_EARLY_EXIT_CONFIDENCE
+
+        _, confidence, _ = self._classify_local(text)
+        if confidence >= threshold:
+            return True, confidence
+
+        if settings.OCR_EARLY_EXIT_CHECK_LLM and self.llm_classifier and self.llm_classifier.enabled:
+            llm_type, llm_confidence, _ = await self.llm_classifier.classify_async(self.prepare_llm_text(text)[0])
+            if llm_type and llm_confidence >= threshold:
+                return True, llm_confidence
+            confidence = max(confidence, llm_confidence)
+
+        return False, confidence
+
+    def _classify_rules_based(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        """
+        Rule-based classification (original method)
+        Returns: (document_type, confidence, keywords_found)
+        """
+        ranked = self._score_rules(text)
+        best_match, best_score, best_keywords = ranked[0] if ranked else (DocumentType.INNE, 0.0, [])
 
         logger.info(f"Rule-based classification: {best_match} (confidence: {best_score:.2f})")
 
         return best_match, best_score, best_keywords
 
+    def _score_rules(self, text: str) -> List[Tuple[DocumentType, float, List[str]]]:
+        """
+        Keyword score of every matching type
+        Returns: list of (document_type, confidence, keywords_found), best first
+        """
+        scored = []
+
+        # One pass over the text for all types (see app/utils/keyword_matcher.py)
+        for doc_type, found_keywords in self.keyword_matcher.match(text).items():
+            # Calculate confidence based on number of matching keywords
+            confidence = min(len(found_keywords) / len(self.classification_rules[doc_type]), 1.0)
+            scored.append((confidence, doc_type, found_keywords))
+
+        # Rank by the raw score - the boosted one is capped, so it would turn
+        # different scores into ties. Stable sort keeps rule order for real ties.
+        scored.sort(key=lambda item: item[0], reverse=True)
+        # Boost confidence for exact matches
+        return [(doc_type, min(confidence * 1.2, 1.0), found_keywords) for confidence, doc_type, found_keywords in scored]
+
     def extract_dates(self, text: str) -> List[str]:
         """
         Extract dates from text in Polish formats
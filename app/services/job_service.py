@@ -0,0 +1,164 @@
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.models import JobStatus
+from app.services.classification_cache_service import MemoryCacheBackend, RedisCacheBackend
+from app.services.callback_service import callback_outbox
+from app.services.pipeline_service import document_pipeline
+from app.services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    Status records of asynchronous classification jobs.
+
+    With the Redis backend records survive API restarts and are shared between
+    the API and Celery workers; the in-memory backend is only suitable for
+    JOB_QUEUE_BACKEND=background on a single API process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, element_id: str, recipe_id: str, files_count: int) -> Dict:
+        now = datetime.utcnow().isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": JobStatus.QUEUED.value,
+            "element_id": element_id,
+            "recipe_id": recipe_id,
+            "files_count": files_count,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        self._save(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        value = self.backend.get(job_id)
+        return json.loads(value) if value is not None else None
+
+    def update(self, job_id: str, **fields) -> Optional[Dict]:
+        """
+        Update fields of an existing job (only the job's own worker writes to it)
+        """
+        job = self.get(job_id)
+        if job is None:
+            logger.warning(f"Job {job_id} not found in job store")
+            return None
+
+        job.update(fields)
+        job["updated_at"] = datetime.utcnow().isoformat()
+        self._save(job)
+        return job
+
+    def _save(self, job: Dict):
+        self.backend.set(job["job_id"], json.dumps(job, ensure_ascii=False))
+
+
+def retry_delay(attempt: int) -> int:
+    """
+    Exponential backoff before the next attempt (attempt is 1-based)
+    """
+    return settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+
+
+async def process_merged_document_job(
+    job_id: str, element_id: str, recipe_id: str, files_data: List[tuple], attempt: int, final_attempt: bool
+):
+    """
+    One attempt of merged document classification: OCR, classify, store files,
+    send callback. Files are kept on failure until the final attempt, so a retry
+    (possibly on another worker) can read them again.
+    files_data: List of tuples (file_id, file_path, filename)
+    """
+    file_paths = [file_path for _, file_path, _ in files_data]
+    # The job store may be Redis - keep its blocking calls off the event loop
+    await run_in_threadpool(job_store.update, job_id, status=JobStatus.PROCESSING.value, attempts=attempt)
+
+    try:
+        logger.info(f"Job {job_id} attempt {attempt} started for element {element_id}, recipe {recipe_id}")
+
+        # Extract and merge text from all files (already accepted, so wait for free OCR workers)
+        merged_text, _ = await document_pipeline.extract_text(file_paths, reject_when_full=False)
+        logger.info(f"Merged text from {len(files_data)} files: {len(merged_text)} characters")
+
+        # Classify merged document
+        document_type, confidence, keywords_found = await document_pipeline.classify(merged_text)
+        logger.info(f"Classification result: {document_type} ({confidence:.2f})")
+
+    except Exception as e:
+        logger.error(f"Job {job_id} attempt {attempt} failed: {str(e)}")
+        if final_attempt:
+            await run_in_threadpool(job_store.update, job_id, status=JobStatus.FAILED.value, error=str(e))
+            for file_path in file_paths:
+                await storage_service.cleanup_temp_file(file_path)
+        else:
+            await run_in_threadpool(job_store.update, job_id, status=JobStatus.RETRYING.value, error=str(e))
+        raise
+
+    # Move first file to processed directory, clean up the others. The result is
+    # already known at this point, so a storage error must not trigger a retry.
+    try:
+        await storage_service.move_to_processed(file_paths[0], document_type.value)
+    except Exception as e:
+        logger.error(f"Job {job_id}: could not store processed file: {str(e)}")
+    for file_path in file_paths[1:]:
+        await storage_service.cleanup_temp_file(file_path)
+
+    # Queue callback with classification result (delivered and retried by the outbox)
+    await run_in_threadpool(callback_outbox.enqueue, element_id, recipe_id, document_type.value, confidence)
+
+    await run_in_threadpool(
+        job_store.update,
+        job_id,
+        status=JobStatus.COMPLETED.value,
+        error=None,
+        result={"document_type": document_type.value, "confidence": confidence, "keywords_found": keywords_found}
+    )
+    logger.info(f"Job {job_id} completed for element {element_id}")
+
+
+async def run_merged_document_job(job_id: str, element_id: str, recipe_id: str, files_data: List[tuple]):
+    """
+    In-process job execution with retries (JOB_QUEUE_BACKEND=background)
+    """
+    max_attempts = settings.JOB_MAX_RETRIES + 1
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            await process_merged_document_job(
+                job_id, element_id, recipe_id, files_data, attempt, final_attempt=attempt == max_attempts
+            )
+            return
+        except Exception:
+            if attempt == max_attempts:
+                logger.error(f"Job {job_id} failed after {attempt} attempt(s)")
+                return
+            await asyncio.sleep(retry_delay(attempt))
+
+
+def _create_backend():
+    if settings.JOB_STORE_BACKEND == "redis" or settings.JOB_QUEUE_BACKEND == "celery":
+        try:
+            return RedisCacheBackend(settings.REDIS_URL, settings.JOB_TTL_SECONDS, prefix="job:")
+        except Exception as e:
+            # No in-memory fallback: every API worker would keep its own records, so job
+            # status requests would 404 on the other workers and jobs would not survive restarts
+            raise RuntimeError(f"Redis job store unavailable at {settings.REDIS_URL}: {e}") from e
+
+    return MemoryCacheBackend(settings.JOB_TTL_SECONDS, settings.JOB_STORE_MAX_ENTRIES)
+
+
+# Singleton instance
+job_store = JobStore(_create_backend())
@@ -1,37 +1,206 @@
-import logging
+import time
 import json
-import requests
-from typing import Tuple, Optional
+import asyncio
+import logging
+import weakref
+import httpx
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Awaitable, Dict, List, Tuple, Optional
 from app.models import DocumentType
 from app.config import settings
+from app.services.classification_cache_service import classification_cache
+from app.utils.text_selection import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt changes so cached classifications are not reused
+PROMPT_VERSION = "3"
+
+
+def extract_json_value(text: str) -> Optional[str]:
+    """
+    Return the first complete top-level JSON object or array in text, or None
+    while it is still incomplete (brackets inside strings are ignored). A packed
+    answer may be a bare array, so it must not be cut at its first element.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    start = min(starts)
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
 
 class LLMClassifierService:
+    """
+    Document classification with a local LLM served by Ollama.
+
+    All network I/O is asynchronous (httpx.AsyncClient with a pooled keep-alive
+    connection), so the API event loop never waits on the LLM. Ollama availability
+    is probed lazily on first use and re-checked every LLM_HEALTH_CHECK_INTERVAL
+    seconds while it is down. classify() is a synchronous wrapper for scripts and
+    worker threads.
+    """
+
     def __init__(self):
-        self.enabled = False
         self.ollama_url = getattr(settings, 'OLLAMA_URL', 'http://localhost:11434')
         self.model_name = getattr(settings, 'OLLAMA_MODEL', 'llama3.1:8b')
+        self._available: Optional[bool] = None
+        self._checked_at = 0.0
+        # One pooled client per event loop: connections cannot be shared between loops
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self.system_prompt = self.build_system_prompt()
+        self._stats = {
+            "requests": 0, "errors": 0, "timeouts": 0, "early_aborts": 0, "seconds": 0.0, "prefill_seconds": 0.0,
+            "packed_requests": 0, "packed_documents": 0, "packed_fallbacks": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """
+        False only while Ollama is known to be unavailable: not probed yet, or the
+        last failed probe older than LLM_HEALTH_CHECK_INTERVAL, counts as enabled so
+        callers go on to is_available() and probe again
+        """
+        if self._available is not False:
+            return True
+        return time.time() - self._checked_at >= settings.LLM_HEALTH_CHECK_INTERVAL
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Pooled client of the running event loop (a new loop, e.g. asyncio.run in a
+        Celery task or the sync wrapper, gets its own client - see run_sync)
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.ollama_url,
+                timeout=httpx.Timeout(
+                    connect=settings.LLM_CONNECT_TIMEOUT,
+                    read=settings.LLM_READ_TIMEOUT,
+                    write=settings.LLM_CONNECT_TIMEOUT,
+                    pool=settings.LLM_READ_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                )
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """
+        Close the client of the running event loop
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    def run_sync(self, coroutine: Awaitable) -> Any:
+        """
+        asyncio.run that closes the loop's client before the loop ends, so every
+        call from sync code does not leave a connection pool behind
+        """
+        async def scoped():
+            try:
+                return await coroutine
+            finally:
+                await self.aclose()
+
+        return asyncio.run(scoped())
+
+    async def is_available(self) -> bool:
+        """
+        Lazy health probe of Ollama (GET /api/tags), result cached for LLM_HEALTH_CHECK_INTERVAL
+        """
+        if self._available is not None and time.time() - self._checked_at < settings.LLM_HEALTH_CHECK_INTERVAL:
+            return self._available
 
-        # Check if Ollama is available
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=2)
-            if response.status_code == 200:
-                self.enabled = True
-                logger.info(f"LLM Classifier initialized with Ollama model: {self.model_name}")
-            else:
+            response = await self._get_client().get("/api/tags", timeout=settings.LLM_CONNECT_TIMEOUT)
+            available = response.status_code == 200
+            if not available:
                 logger.warning(f"Ollama server not responding correctly")
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.warning(f"Ollama not available at {self.ollama_url}: {e}")
+            available = False
+
+        became_available = available and self._available is not True
+        if became_available:
+            logger.info(f"LLM Classifier initialized with Ollama model: {self.model_name}")
+        elif not available and self._available is not False:
             logger.info("LLM Classifier disabled - install and start Ollama to enable")
 
+        self._available = available
+        self._checked_at = time.time()
+
+        if became_available and settings.LLM_PREFIX_WARMUP:
+            await self.warm_prompt_prefix()
+        return available
+
+    async def warmup(self) -> Dict:
+        """
+        Probe Ollama at startup (and warm the prompt prefix when enabled), retried
+        with backoff while its container is still starting. If it is still down the
+        state is left unknown, so the first classification probes again.
+        Returns: details for the readiness report
+        """
+        attempts = max(settings.LLM_WARMUP_ATTEMPTS, 1)
+        delay = settings.LLM_WARMUP_BACKOFF_SECONDS
+        for attempt in range(1, attempts + 1):
+            # Probe now, regardless of LLM_HEALTH_CHECK_INTERVAL
+            self._checked_at = 0.0
+            if await self.is_available():
+                return {"available": True, "model": self.model_name, "attempts": attempt}
+            if attempt < attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        self._available = None
+        return {"available": False, "model": self.model_name, "attempts": attempts}
+
     def classify(self, text: str) -> Tuple[Optional[DocumentType], float, str]:
+        """
+        Synchronous wrapper of classify_async (must not be called from a running event loop)
+        Returns: (document_type, confidence, reasoning)
+        """
+        return self.run_sync(self.classify_async(text))
+
+    async def classify_async(self, text: str) -> Tuple[Optional[DocumentType], float, str]:
         """
         Classify document using local LLM (Ollama)
         Returns: (document_type, confidence, reasoning)
         """
-        if not self.enabled:
+        cache_key = classification_cache.build_key(text, self.model_name, PROMPT_VERSION)
+        # The cache may be Redis - keep its blocking calls off the event loop
+        cached = await run_in_threadpool(classification_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"🗄️ LLM classification cache hit: {cached['document_type']}")
+            return DocumentType(cached["document_type"]), cached["confidence"], cached["reasoning"]
+
+        if not await self.is_available():
             logger.warning("LLM classifier is not enabled")
             return None, 0.0, "LLM classifier not enabled"
 
@@ -39,27 +208,276 @@ class LLMClassifierService:
         logger.info("🤖 STARTING LLM CLASSIFICATION")
         logger.info("="*80)
 
-        try:
-            # Prepare document types list for the prompt
-            doc_types_list = "\n".join([
-                f"- {dt.value}: {self._get_type_description(dt)}"
-                for dt in DocumentType if dt != DocumentType.INNE
-            ])
+        response_text = None
+        start_time = time.time()
+        self._stats["requests"] += 1
 
+        try:
             logger.info(f"📄 Extracted text (first 200 chars):\n{text[:200]}...")
             logger.info(f"📊 Text length: {len(text)} characters")
 
-            prompt = f"""Jesteś ekspertem w klasyfikacji polskich dokumentów medycznych.
+            prompt = self.build_prompt(text)
+            logger.debug(f"📤 PROMPT SENT TO OLLAMA (after the static system prompt):\n{prompt}")
 
-Dostałeś tekst wyekstraktowany z dokumentu medycznego za pomocą OCR. Tekst może zawierać błędy OCR.
+            # Call Ollama API
+            logger.info(f"🔗 Calling Ollama API at {self.ollama_url}/api/generate")
+            logger.info(f"🤖 Model: {self.model_name}")
+
+            response_text = await asyncio.wait_for(
+                self._generate(prompt), timeout=settings.LLM_TOTAL_TIMEOUT
+            )
+            logger.info(f"📝 Extracted response text:\n{response_text}")
+
+            document_type, confidence, reasoning = self._parse_response(response_text)
+
+            logger.info("="*80)
+            logger.info("✅ FINAL LLM CLASSIFICATION RESULT:")
+            logger.info(f"   Document Type: {document_type}")
+            logger.info(f"   Confidence: {confidence:.2f}")
+            logger.info(f"   Reasoning: {reasoning}")
+            logger.info("="*80)
+
+            if confidence > 0.0:
+                await run_in_threadpool(classification_cache.put, cache_key, {
+                    "document_type": document_type.value,
+                    "confidence": confidence,
+                    "reasoning": reasoning
+                })
+
+            return document_type, confidence, reasoning
+
+        except json.JSONDecodeError as e:
+            self._stats["errors"] += 1
+            logger.error("="*80)
+            logger.error(f"❌ Failed to parse LLM response as JSON: {e}")
+            logger.error(f"LLM raw response: {response_text if response_text is not None else 'N/A'}")
+            logger.error("="*80)
+            return None, 0.0, f"JSON parsing error: {str(e)}"
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            self._stats["timeouts"] += 1
+            logger.error(f"❌ Ollama request timed out: {type(e).__name__}")
+            return None, 0.0, f"Ollama timeout: {type(e).__name__}"
+        except httpx.HTTPError as e:
+            self._stats["errors"] += 1
+            if isinstance(e, httpx.ConnectError):
+                # Re-probe before the next request instead of waiting for the interval
+                self._available = None
+            logger.error("="*80)
+            logger.error(f"❌ Error calling Ollama API: {str(e)}")
+            logger.error("="*80)
+            return None, 0.0, f"Ollama API error: {str(e)}"
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error("="*80)
+            logger.error(f"❌ Error during LLM classification: {str(e)}")
+            logger.error("="*80)
+            return None, 0.0, f"Error: {str(e)}"
+        finally:
+            self._stats["seconds"] += time.time() - start_time
+
+    async def classify_many_async(self, texts: List[str]) -> List[Tuple[Optional[DocumentType], float, str]]:
+        """
+        Classify several documents, packing short ones into shared prompts
+        (LLM_BATCH_MAX_DOCUMENTS per prompt, LLM_BATCH_TOKEN_BUDGET document tokens).
+        Documents missing from a packed answer are classified one by one.
+        Returns: (document_type, confidence, reasoning) per text, in input order
+        """
+        results: List[Optional[Tuple[Optional[DocumentType], float, str]]] = [None] * len(texts)
+        cache_keys = [classification_cache.build_key(text, self.model_name, PROMPT_VERSION) for text in texts]
+
+        pending = []
+        cached_results = await run_in_threadpool(lambda: [classification_cache.get(cache_key) for cache_key in cache_keys])
+        for i, cached in enumerate(cached_results):
+            if cached is not None:
+                results[i] = DocumentType(cached["document_type"]), cached["confidence"], cached["reasoning"]
+            else:
+                pending.append(i)
+
+        if pending and not await self.is_available():
+            for i in pending:
+                results[i] = None, 0.0, "LLM classifier not enabled"
+            return results
+
+        async def classify_group(group: List[int]):
+            packed = await self._classify_packed([texts[i] for i in group]) if len(group) > 1 else {}
+            for position, i in enumerate(group):
+                if position in packed:
+                    results[i] = packed[position]
+                    document_type, confidence, reasoning = packed[position]
+                    await run_in_threadpool(classification_cache.put, cache_keys[i], {
+                        "document_type": document_type.value,
+                        "confidence": confidence,
+                        "reasoning": reasoning
+                    })
+                else:
+                    if len(group) > 1:
+                        self._stats["packed_fallbacks"] += 1
+                    results[i] = await self.classify_async(texts[i])
+
+        await asyncio.gather(*[classify_group(group) for group in self.pack([texts[i] for i in pending], pending)])
+        return results
+
+    def pack(self, texts: List[str], indices: List[int]) -> List[List[int]]:
+        """
+        Group documents for packed prompts (first fit, input order). Documents longer
+        than LLM_BATCH_MAX_DOCUMENT_TOKENS always get a prompt of their own.
+        Returns: groups of indices
+        """
+        groups: List[List[int]] = []
+        open_group: List[int] = []
+        open_tokens = 0
+
+        for text, i in zip(texts, indices):
+            tokens = estimate_tokens(text)
+            if tokens > settings.LLM_BATCH_MAX_DOCUMENT_TOKENS:
+                groups.append([i])
+                continue
+            if open_group and (open_tokens + tokens > settings.LLM_BATCH_TOKEN_BUDGET
+                               or len(open_group) >= settings.LLM_BATCH_MAX_DOCUMENTS):
+                groups.append(open_group)
+                open_group, open_tokens = [], 0
+            open_group.append(i)
+            open_tokens += tokens
+
+        if open_group:
+            groups.append(open_group)
+        return groups
+
+    async def _classify_packed(self, texts: List[str]) -> Dict[int, Tuple[DocumentType, float, str]]:
+        """
+        One prompt for several documents
+        Returns: {position in texts: (document_type, confidence, reasoning)} - only valid answers
+        """
+        logger.info(f"🤖 Packed LLM classification of {len(texts)} documents")
+        response_text = None
+        start_time = time.time()
+        self._stats["requests"] += 1
+        self._stats["packed_requests"] += 1
+        self._stats["packed_documents"] += len(texts)
+
+        try:
+            response_text = await asyncio.wait_for(
+                self._generate(self.build_batch_prompt(texts), num_predict=150 * len(texts) + 50),
+                timeout=settings.LLM_TOTAL_TIMEOUT
+            )
+            results = self._parse_batch_response(response_text, len(texts))
+            logger.info(f"✅ Packed LLM answer covers {len(results)}/{len(texts)} documents")
+            return results
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            self._stats["timeouts"] += 1
+            logger.error(f"❌ Packed Ollama request timed out: {type(e).__name__}")
+        except httpx.HTTPError as e:
+            self._stats["errors"] += 1
+            if isinstance(e, httpx.ConnectError):
+                self._available = None
+            logger.error(f"❌ Error calling Ollama API: {str(e)}")
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"❌ Invalid packed LLM answer ({e}): {response_text if response_text is not None else 'N/A'}")
+        finally:
+            self._stats["seconds"] += time.time() - start_time
+        return {}
+
+    async def _generate(self, prompt: str, num_predict: int = 500) -> str:
+        """
+        Stream tokens from /api/generate and stop reading as soon as the answer
+        contains a complete JSON value (closing the stream aborts generation)
+        Returns: response text (the JSON object or array)
+        """
+        payload = self._payload(prompt, stream=True, num_predict=num_predict)
+
+        response_text = ""
+        request_start = time.time()
+        first_chunk = True
+        async with self._get_client().stream("POST", "/api/generate", json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                logger.error(f"❌ Ollama API error: {response.status_code}")
+                logger.error(f"Response body: {body[:500]}")
+                raise httpx.HTTPStatusError(
+                    f"Ollama API error: {response.status_code}", request=response.request, response=response
+                )
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if first_chunk:
+                    # Time to first token is dominated by prompt prefill
+                    self._stats["prefill_seconds"] += time.time() - request_start
+                    first_chunk = False
+
+                response_text += chunk.get("response", "")
+                json_value = extract_json_value(response_text)
+                if json_value is not None:
+                    if not chunk.get("done"):
+                        self._stats["early_aborts"] += 1
+                    return json_value
+                if chunk.get("done"):
+                    break
+
+        return response_text.strip()
+
+    def _payload(self, prompt: str, stream: bool, num_predict: int = 500) -> Dict:
+        """
+        /api/generate request body. Model, system prompt and options must stay the
+        same between requests, otherwise Ollama reloads the model or drops the
+        cached prefix.
+        """
+        return {
+            "model": self.model_name,
+            "system": self.system_prompt,
+            "prompt": prompt,
+            "stream": stream,
+            "format": "json",
+            "keep_alive": settings.LLM_KEEP_ALIVE,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": num_predict
+            }
+        }
+
+    async def warm_prompt_prefix(self):
+        """
+        Load the model and evaluate the static system prompt once, so the first
+        real request only prefills the document text
+        """
+        start_time = time.time()
+        try:
+            response = await self._get_client().post(
+                "/api/generate", json=self._payload(self.build_prompt(""), stream=False, num_predict=1)
+            )
+            response.raise_for_status()
+            data = response.json()
+            logger.info(
+                f"🔥 LLM prompt prefix warmed up in {time.time() - start_time:.1f}s "
+                f"({data.get('prompt_eval_count', '?')} prompt tokens)"
+            )
+        except httpx.HTTPError as e:
+            logger.warning(f"LLM prompt prefix warm-up failed: {e}")
+
+    def build_system_prompt(self) -> str:
+        """
+        Static instructions (types, rules, examples, answer format). Sent as the
+        system prompt ahead of the document text, so Ollama evaluates it once and
+        reuses its KV cache as a common prefix of every request.
+        """
+        # Prepare document types list for the prompt
+        doc_types_list = "\n".join([
+            f"- {dt.value}: {self._get_type_description(dt)}"
+            for dt in DocumentType if dt != DocumentType.INNE
+        ])
+
+        prompt = f"""Jesteś ekspertem w klasyfikacji polskich dokumentów medycznych.
+
+Dostaniesz tekst wyekstraktowany z dokumentu medycznego za pomocą OCR. Tekst może zawierać błędy OCR.
 
 TYPY DOKUMENTÓW:
 {doc_types_list}
 - inne: dokumenty, które nie pasują do żadnej z powyższych kategorii
 
-TEKST DOKUMENTU:
-{text}
-
 ZASADY KLASYFIKACJI (sprawdzaj w tej kolejności):
 1. Szukaj kluczowych fraz i terminów specyficznych dla danego typu dokumentu
 2. Zwracaj TYLKO typy z listy powyżej - NIGDY nie wymyślaj nowych typów
@@ -87,7 +505,7 @@ PRZYKŁADY:
 - "Zaświadczenie neurologiczne" -> DOC_BADANIE_LN
 - "Grupa krwi 0 Rh+" -> DOC_BADANIE_RH
 
-Przeanalizuj dokument i określ jego typ. Zwróć odpowiedź w formacie JSON:
+Przeanalizuj dokument i określ jego typ. Dla pojedynczego dokumentu (TEKST DOKUMENTU) zwróć odpowiedź w formacie JSON:
 {{
   "document_type": "typ_dokumentu",
   "confidence": 0.95,
@@ -99,93 +517,89 @@ Gdzie:
 - confidence to wartość od 0.0 do 1.0 oznaczająca pewność klasyfikacji
 - reasoning to krótkie (1-2 zdania) wyjaśnienie
 
-WAŻNE: Zwróć TYLKO JSON, bez żadnego dodatkowego tekstu."""
+Jeśli wiadomość zawiera kilka dokumentów (=== DOKUMENT 0 ===, === DOKUMENT 1 === ...), zamiast
+pojedynczego obiektu zwróć format podany w wiadomości: {{"results": [...]}} z jednym elementem na dokument.
 
-            logger.info("="*80)
-            logger.info("📤 FULL PROMPT SENT TO OLLAMA:")
-            logger.info("="*80)
-            logger.info(prompt)
-            logger.info("="*80)
-
-            # Call Ollama API
-            logger.info(f"🔗 Calling Ollama API at {self.ollama_url}/api/generate")
-            logger.info(f"🤖 Model: {self.model_name}")
-
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "format": "json",
-                    "options": {
-                        "temperature": 0.1,
-                        "num_predict": 500
-                    }
-                },
-                timeout=1200  # 20 minutes for CPU inference (llama3.1 8B is slow on CPU)
-            )
+WAŻNE: Zwróć TYLKO JSON, bez żadnego dodatkowego tekstu."""
+        return prompt
 
-            if response.status_code != 200:
-                logger.error(f"❌ Ollama API error: {response.status_code}")
-                logger.error(f"Response body: {response.text[:500]}")
-                return None, 0.0, f"Ollama API error: {response.status_code}"
+    def build_prompt(self, text: str) -> str:
+        """
+        Variable part of the prompt - the only tokens prefilled per request
+        """
+        return f"""TEKST DOKUMENTU:
+{text}"""
 
-            response_data = response.json()
-            logger.info("="*80)
-            logger.info("📥 FULL RESPONSE FROM OLLAMA:")
-            logger.info("="*80)
-            logger.info(f"Response data: {response_data}")
-            logger.info("="*80)
+    def build_batch_prompt(self, texts: List[str]) -> str:
+        """
+        Variable part of a packed prompt - the system prompt stays the same, so the
+        cached prefix is reused here too
+        """
+        documents = "\n\n".join(f"=== DOKUMENT {i} ===\n{text}" for i, text in enumerate(texts))
+        return f"""Poniżej jest {len(texts)} osobnych dokumentów. Sklasyfikuj KAŻDY z nich niezależnie, według tych samych zasad.
+Zwróć JSON w formacie:
+{{"results": [{{"index": 0, "document_type": "typ_dokumentu", "confidence": 0.95, "reasoning": "krótkie wyjaśnienie"}}]}}
+z dokładnie jednym elementem dla każdego indeksu od 0 do {len(texts) - 1}.
 
-            response_text = response_data.get("response", "").strip()
-            logger.info(f"📝 Extracted response text:\n{response_text}")
+{documents}"""
 
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                response_text = response_text.split("\n", 1)[1]
-                response_text = response_text.rsplit("```", 1)[0].strip()
+    def _parse_response(self, response_text: str) -> Tuple[DocumentType, float, str]:
+        """
+        Parse JSON answer of the model
+        Returns: (document_type, confidence, reasoning)
+        """
+        response_text = response_text.strip()
 
-            result = json.loads(response_text)
-            logger.info(f"✅ Parsed JSON result: {result}")
+        # Remove markdown code blocks if present
+        if response_text.startswith("```"):
+            response_text = response_text.split("\n", 1)[1]
+            response_text = response_text.rsplit("```", 1)[0].strip()
 
-            # Parse document type
-            doc_type_str = result.get("document_type", "inne")
-            try:
-                document_type = DocumentType(doc_type_str)
-                logger.info(f"✅ Document type parsed: {document_type}")
-            except ValueError:
-                logger.warning(f"⚠️ Unknown document type from LLM: {doc_type_str}, defaulting to INNE")
-                document_type = DocumentType.INNE
+        result = json.loads(response_text)
+        logger.info(f"✅ Parsed JSON result: {result}")
 
-            confidence = float(result.get("confidence", 0.0))
-            reasoning = result.get("reasoning", "")
+        # Parse document type
+        doc_type_str = result.get("document_type", "inne")
+        try:
+            document_type = DocumentType(doc_type_str)
+            logger.info(f"✅ Document type parsed: {document_type}")
+        except ValueError:
+            logger.warning(f"⚠️ Unknown document type from LLM: {doc_type_str}, defaulting to INNE")
+            document_type = DocumentType.INNE
 
-            logger.info("="*80)
-            logger.info("✅ FINAL LLM CLASSIFICATION RESULT:")
-            logger.info(f"   Document Type: {document_type}")
-            logger.info(f"   Confidence: {confidence:.2f}")
-            logger.info(f"   Reasoning: {reasoning}")
-            logger.info("="*80)
+        confidence = float(result.get("confidence", 0.0))
+        reasoning = result.get("reasoning", "")
+        return document_type, confidence, reasoning
 
-            return document_type, confidence, reasoning
+    def _parse_batch_response(self, response_text: str, count: int) -> Dict[int, Tuple[DocumentType, float, str]]:
+        """
+        Parse {"results": [{"index": ..., ...}]} (a bare array is accepted too).
+        Entries with an unknown index or document type are dropped.
+        Returns: {index: (document_type, confidence, reasoning)}
+        """
+        result = json.loads(response_text.strip())
+        items = result.get("results", []) if isinstance(result, dict) else result
 
-        except json.JSONDecodeError as e:
-            logger.error("="*80)
-            logger.error(f"❌ Failed to parse LLM response as JSON: {e}")
-            logger.error(f"LLM raw response: {response_text if 'response_text' in locals() else 'N/A'}")
-            logger.error("="*80)
-            return None, 0.0, f"JSON parsing error: {str(e)}"
-        except requests.exceptions.RequestException as e:
-            logger.error("="*80)
-            logger.error(f"❌ Error calling Ollama API: {str(e)}")
-            logger.error("="*80)
-            return None, 0.0, f"Ollama API error: {str(e)}"
-        except Exception as e:
-            logger.error("="*80)
-            logger.error(f"❌ Error during LLM classification: {str(e)}")
-            logger.error("="*80)
-            return None, 0.0, f"Error: {str(e)}"
+        parsed = {}
+        for item in items:
+            try:
+                index = int(item["index"])
+                document_type = DocumentType(item["document_type"])
+                confidence = float(item.get("confidence", 0.0))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"⚠️ Skipping invalid packed answer entry: {item}")
+                continue
+            if 0 <= index < count and confidence > 0.0:
+                parsed[index] = document_type, confidence, item.get("reasoning", "")
+        return parsed
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats["available"] = self._available
+        stats["model"] = self.model_name
+        stats["avg_seconds"] = stats["seconds"] / stats["requests"] if stats["requests"] else 0.0
+        stats["avg_prefill_seconds"] = stats["prefill_seconds"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
 
     def _get_type_description(self, doc_type: DocumentType) -> str:
         """Get human-readable description for document type"""
@@ -0,0 +1,247 @@
+import io
+import os
+import time
+import shutil
+import logging
+import subprocess
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image
+from app.config import settings
+from app.utils.image_utils import pad_to_common_shape
+from app.utils.ocr_engine import OCREngineConfig, default_torch_threads
+from app.utils.text_regions import Box, select_title_boxes
+
+logger = logging.getLogger(__name__)
+
+# Checked without importing: easyocr pulls in PyTorch, which a Tesseract deployment does not need
+EASYOCR_SUPPORT = importlib.util.find_spec("easyocr") is not None
+
+# OCR_LANGUAGES codes (EasyOCR) -> Tesseract traineddata names
+TESSERACT_LANGUAGES = {"pl": "pol", "en": "eng", "de": "deu", "uk": "ukr", "ru": "rus", "cs": "ces", "sk": "slk"}
+
+
+def tesseract_languages(languages: List[str]) -> str:
+    return "+".join(TESSERACT_LANGUAGES.get(lang, lang) for lang in languages)
+
+
+class OCRBackend(ABC):
+    """
+    OCR engine turning a preprocessed page image into lines of text. Everything
+    around it (file loading, preprocessing, regions, worker pool, cache) is shared,
+    so engines can be swapped with OCR_BACKEND and compared on the same input
+    (see benchmarks/bench_ocr_backends.py).
+    """
+    name = "abstract"
+    # Capability flags
+    supports_batch = False  # recognize_batch is faster than one image at a time
+    supports_gpu = False
+    supports_roi = False  # separate detect / recognize_boxes steps (region-of-interest OCR)
+
+    @abstractmethod
+    def recognize(self, image: np.ndarray) -> List[str]:
+        """
+        Returns: list_of_lines in reading order
+        """
+
+    def recognize_batch(self, images: List[np.ndarray]) -> List[List[str]]:
+        """
+        Returns: list_of_lines for every image, in input order
+        """
+        return [self.recognize(image) for image in images]
+
+    def detect(self, image: np.ndarray) -> List[Box]:
+        """
+        Find text boxes without recognizing them (supports_roi backends)
+        """
+        raise NotImplementedError(f"OCR backend {self.name} does not support region-of-interest OCR")
+
+    def recognize_boxes(self, image: np.ndarray, boxes: List[Box]) -> List[Tuple[Box, str, float]]:
+        """
+        Recognize only the given boxes (supports_roi backends)
+        Returns: (box, text, confidence) in reading order
+        """
+        raise NotImplementedError(f"OCR backend {self.name} does not support region-of-interest OCR")
+
+    def capabilities(self) -> Dict:
+        return {"backend": self.name, "batch": self.supports_batch, "gpu": self.supports_gpu, "roi": self.supports_roi}
+
+
+class EasyOCRBackend(OCRBackend):
+    """
+    EasyOCR (CRAFT detector + CRNN recognizer on PyTorch), tuned by OCREngineConfig
+    """
+    name = "easyocr"
+    supports_batch = True
+    supports_gpu = True
+    supports_roi = True
+
+    def __init__(self, languages: List[str], gpu: bool, engine: OCREngineConfig):
+        if not EASYOCR_SUPPORT:
+            raise RuntimeError("EasyOCR not available. Install easyocr: pip install easyocr")
+        import easyocr
+
+        self.engine = engine
+        self.engine.apply_threads()
+        self.readtext_options = engine.readtext_kwargs()
+        self.reader = easyocr.Reader(languages, gpu=gpu, **engine.reader_kwargs())
+
+    def recognize(self, image: np.ndarray) -> List[str]:
+        return self.reader.readtext(image, detail=0, **self.readtext_options)
+
+    def recognize_batch(self, images: List[np.ndarray]) -> List[List[str]]:
+        """
+        readtext_batched amortizes model overhead. Images of similar size are
+        grouped (up to OCR_BATCH_SIZE) and padded to a common shape, so text
+        geometry is not distorted by resizing.
+        """
+        if len(images) == 1:
+            return [self.recognize(images[0])]
+
+        batch_size = max(settings.OCR_BATCH_SIZE, 1)
+        order = sorted(range(len(images)), key=lambda i: images[i].shape[:2])
+        results: List[List[str]] = [[] for _ in images]
+
+        for start in range(0, len(order), batch_size):
+            group = order[start:start + batch_size]
+            padded = pad_to_common_shape([images[i] for i in group])
+            batch_results = self.reader.readtext_batched(padded, batch_size=batch_size, detail=0, **self.readtext_options)
+            for i, lines in zip(group, batch_results):
+                results[i] = lines
+
+        return results
+
+    def detect(self, image: np.ndarray) -> List[Box]:
+        horizontal_list, free_list = self.reader.detect(image)
+        boxes = [(int(x_min), int(y_min), int(x_max), int(y_max)) for x_min, x_max, y_min, y_max in horizontal_list[0]]
+        # Rotated boxes are recognized through their bounding rectangle
+        for polygon in free_list[0]:
+            xs = [point[0] for point in polygon]
+            ys = [point[1] for point in polygon]
+            boxes.append((int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))))
+        return boxes
+
+    def recognize_boxes(self, image: np.ndarray, boxes: List[Box]) -> List[Tuple[Box, str, float]]:
+        if not boxes:
+            return []
+        results = self.reader.recognize(
+            image,
+            horizontal_list=[[x_min, x_max, y_min, y_max] for x_min, y_min, x_max, y_max in boxes],
+            free_list=[],
+            detail=1,
+            decoder=self.readtext_options["decoder"],
+            contrast_ths=self.readtext_options["contrast_ths"]
+        )
+        recognized = []
+        for points, text, confidence in results:
+            xs = [point[0] for point in points]
+            ys = [point[1] for point in points]
+            recognized.append(((int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))), text, float(confidence)))
+        return sorted(recognized, key=lambda item: (item[0][1], item[0][0]))
+
+
+class TesseractBackend(OCRBackend):
+    """
+    Tesseract through its command line binary (no Python bindings needed) - CPU
+    only, no model weights in this process' memory
+    """
+    name = "tesseract"
+
+    def __init__(self, languages: List[str], command: str, psm: int, threads: int):
+        self.command = shutil.which(command)
+        if self.command is None:
+            raise RuntimeError(f"Tesseract not available. Install tesseract-ocr (binary '{command}' not found)")
+        self.languages = tesseract_languages(languages)
+        self.psm = psm
+        # Tesseract uses OpenMP; keep it from taking every core in every process
+        self.env = dict(os.environ, OMP_THREAD_LIMIT=str(threads))
+
+    def recognize(self, image: np.ndarray) -> List[str]:
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format="PNG")
+
+        result = subprocess.run(
+            [self.command, "stdin", "stdout", "-l", self.languages, "--psm", str(self.psm)],
+            input=buffer.getvalue(),
+            capture_output=True,
+            env=self.env,
+            timeout=settings.TESSERACT_TIMEOUT
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Tesseract failed: {result.stderr.decode('utf-8', 'replace').strip()[:300]}")
+
+        text = result.stdout.decode("utf-8", "replace")
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def recognize_title_region(
+    backend: OCRBackend,
+    image: np.ndarray,
+    boxes: List[Box],
+    region: str,
+    top_k: int,
+    min_confidence: float
+) -> Tuple[List[str], Dict]:
+    """
+    Region-of-interest OCR of a page whose text boxes were already detected.
+    Region "roi" recognizes the top_k most title-like boxes - and the remaining
+    boxes too when their mean confidence is below min_confidence, which completes
+    the page. Region "rest" recognizes the boxes "roi" skipped.
+    Returns: (list_of_lines, stats)
+    """
+    selected, rest = select_title_boxes(boxes, image.shape[0], top_k)
+    targets = selected if region == "roi" else rest
+
+    start_time = time.time()
+    results = backend.recognize_boxes(image, [boxes[i] for i in targets])
+    confidence = sum(item[2] for item in results) / len(results) if results else 0.0
+    complete = region == "rest" or not rest
+    fallback = False
+
+    if not complete and confidence < min_confidence:
+        results = sorted(
+            results + backend.recognize_boxes(image, [boxes[i] for i in rest]),
+            key=lambda item: (item[0][1], item[0][0])
+        )
+        targets = selected + rest
+        complete = fallback = True
+
+    stats = {
+        "boxes_total": len(boxes),
+        "boxes_recognized": len(targets),
+        "complete": complete,
+        "low_confidence_fallback": fallback,
+        "confidence": round(confidence, 4),
+        "recognize_seconds": round(time.time() - start_time, 4),
+    }
+    return [text for _, text, _ in results], stats
+
+
+def create_ocr_backend() -> OCRBackend:
+    """
+    Backend selected by OCR_BACKEND (easyocr | tesseract)
+    """
+    if settings.OCR_BACKEND == "tesseract":
+        return TesseractBackend(
+            settings.ocr_languages_list,
+            command=settings.TESSERACT_CMD,
+            psm=settings.TESSERACT_PSM,
+            threads=settings.OCR_TORCH_THREADS or default_torch_threads()
+        )
+    return EasyOCRBackend(settings.ocr_languages_list, settings.OCR_GPU, OCREngineConfig.from_settings())
+
+
+def ocr_backend_fingerprint() -> Dict:
+    """
+    Backend settings that change the OCR output (part of the OCR cache key),
+    computed without loading any model
+    """
+    if settings.OCR_BACKEND == "tesseract":
+        return {
+            "backend": "tesseract",
+            "languages": tesseract_languages(settings.ocr_languages_list),
+            "psm": settings.TESSERACT_PSM
+        }
+    return {"backend": "easyocr", **OCREngineConfig.from_settings().fingerprint()}
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils.image_preprocessing import ImagePreprocessor
+from app.services.ocr_backends import ocr_backend_fingerprint
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Compute SHA-256 of a file without loading it into memory at once
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ocr_cache_fingerprint() -> Dict:
+    """
+    OCR settings that influence the extracted text (part of the cache key)
+    """
+    try:
+        reader_version = metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        reader_version = "unknown"
+
+    return {
+        "languages": settings.ocr_languages_list,
+        "pdf_dpi": settings.OCR_PDF_DPI,
+        "pdf_text_layer": settings.PDF_TEXT_LAYER_ENABLED,
+        "pdf_text_layer_min_chars": settings.PDF_TEXT_LAYER_MIN_CHARS,
+        "preprocess": ImagePreprocessor.from_settings().fingerprint(),
+        "ocr_backend": ocr_backend_fingerprint(),
+        "reader_version": reader_version,
+    }
+
+
+class OCRCache:
+    """
+    Content-addressed cache of OCR results.
+
+    Two tiers: a small in-memory LRU in front of a size-bounded LRU directory on
+    disk. Entries are keyed by the SHA-256 of the uploaded bytes combined with the
+    OCR settings that influence the output, so changing languages, DPI or the
+    reader version never returns stale text.
+    """
+
+    def __init__(self, cache_dir: str, memory_entries: int, max_disk_bytes: int, enabled: bool = True):
+        self.enabled = enabled
+        self.cache_dir = Path(cache_dir)
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "ocr_seconds_saved": 0.0,
+        }
+
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+            logger.info(f"OCR cache enabled at {self.cache_dir} ({self._disk_bytes} bytes on disk)")
+
+    @staticmethod
+    def build_key(content_hash: str, fingerprint: Dict) -> str:
+        """
+        Combine content hash with OCR settings fingerprint into a cache key
+        """
+        payload = json.dumps({"content": content_hash, "ocr": fingerprint}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        """
+        Look up OCR result
+        Returns: (full_text, list_of_lines) or None on miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._stats["ocr_seconds_saved"] += entry.get("ocr_seconds", 0.0)
+                return entry["full_text"], list(entry["lines"])
+
+        entry = self._read_disk(key)
+
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["disk_hits"] += 1
+            self._stats["ocr_seconds_saved"] += entry.get("ocr_seconds", 0.0)
+            self._remember(key, entry)
+            return entry["full_text"], list(entry["lines"])
+
+    def put(self, key: str, full_text: str, lines: List[str], ocr_seconds: float = 0.0):
+        """
+        Store OCR result in both tiers
+        """
+        if not self.enabled:
+            return
+
+        entry = {
+            "full_text": full_text,
+            "lines": list(lines),
+            "ocr_seconds": ocr_seconds,
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            self._remember(key, entry)
+            self._stats["stores"] += 1
+
+        try:
+            self._write_disk(key, entry)
+        except OSError as e:
+            logger.warning(f"Failed to write OCR cache entry {key[:12]}: {e}")
+
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters and current size of both tiers
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+    def clear(self):
+        """
+        Drop all cached entries (memory and disk)
+        """
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._scan_disk():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+    def _remember(self, key: str, entry: Dict):
+        # Caller must hold the lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Bump mtime so disk eviction is least-recently-used, not oldest-written
+            os.utime(path, None)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Corrupted OCR cache entry {path}: {e}")
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key: str, entry: Dict):
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        previous_size = path.stat().st_size if path.exists() else 0
+
+        # Write atomically so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._disk_bytes += path.stat().st_size - previous_size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        # Caller must hold the lock. Evict down to 90% of the limit to avoid
+        # rescanning the directory on every write once the cache is full.
+        entries = sorted(self._scan_disk(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                self._stats["evictions"] += 1
+            except OSError:
+                pass
+
+        self._disk_bytes = total
+        logger.info(f"OCR cache evicted down to {total} bytes")
+
+    def _scan_disk(self) -> List[Tuple[Path, int, float]]:
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+# Singleton instance
+ocr_cache = OCRCache(
+    cache_dir=settings.OCR_CACHE_DIR,
+    memory_entries=settings.OCR_CACHE_MEMORY_ENTRIES,
+    max_disk_bytes=settings.OCR_CACHE_MAX_DISK_MB * 1024 * 1024,
+    enabled=settings.OCR_CACHE_ENABLED,
+)
@@ -1,45 +1,85 @@
-import easyocr
+import io
+import time
 import logging
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 from PIL import Image
 import numpy as np
-from pathlib import Path
 from app.config import settings
+from app.services.ocr_cache_service import ocr_cache, ocr_cache_fingerprint, file_sha256
+from app.services.storage_service import upload_buffers
+from app.utils.image_preprocessing import ImagePreprocessor
+from app.services.ocr_backends import create_ocr_backend, recognize_title_region
+from app.utils.pdf_utils import (
+    PDF_SUPPORT, get_pdf_page_count, get_pdf_text_layers, render_pdf_page, merge_pages, is_pdf
+)
 
 logger = logging.getLogger(__name__)
 
-try:
-    from pdf2image import convert_from_path
-    PDF_SUPPORT = True
+if PDF_SUPPORT:
     logger.info("PDF support enabled (pdf2image available)")
-except ImportError:
-    PDF_SUPPORT = False
+else:
     logger.warning("PDF support disabled (pdf2image not installed)")
 
 
 class OCRService:
     def __init__(self):
-        logger.info(f"Initializing EasyOCR with languages: {settings.ocr_languages_list}")
-        self.reader = easyocr.Reader(
-            settings.ocr_languages_list,
-            gpu=settings.OCR_GPU
-        )
+        logger.info(f"Initializing OCR backend {settings.OCR_BACKEND} with languages: {settings.ocr_languages_list}")
+        start_time = time.time()
+        self.backend = create_ocr_backend()
+        self.load_seconds = time.time() - start_time
+        logger.info(f"OCR backend {self.backend.name} loaded in {self.load_seconds:.1f}s")
+        self.preprocessor = ImagePreprocessor.from_settings()
+        # Preprocessing time per step since the last take_preprocess_timings()
+        self._preprocess_ms: Dict[str, float] = {}
+        self._preprocessed_images = 0
+        # Text boxes of recently OCR'd pages, so "rest" does not repeat detection of "roi"
+        self._detections: OrderedDict = OrderedDict()
 
-    def extract_text(self, image_path: str) -> Tuple[str, List[str]]:
+    def warmup(self) -> float:
+        """
+        Run one small inference so lazy framework initialization does not hit the first request
+        Returns: seconds taken
         """
-        Extract text from image or PDF
+        start_time = time.time()
+        image = np.full((64, 256, 3), 255, dtype=np.uint8)
+        image[24:40, 32:224] = 0
+        self.backend.recognize(image)
+        return time.time() - start_time
+
+    def extract_text(self, image_path: str, use_cache: bool = True) -> Tuple[str, List[str]]:
+        """
+        Extract text from image or PDF, reusing cached results for identical files
         Returns: (full_text, list_of_lines)
         """
+        cache_key = None
+        if use_cache and ocr_cache.enabled:
+            content_hash = upload_buffers.sha256(image_path) or file_sha256(image_path)
+            cache_key = ocr_cache.build_key(content_hash, ocr_cache_fingerprint())
+            cached = ocr_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {image_path}")
+                return cached
+
+        start_time = time.time()
+        full_text, lines = self._extract_text_uncached(image_path)
+
+        if cache_key is not None:
+            ocr_cache.put(cache_key, full_text, lines, ocr_seconds=time.time() - start_time)
+
+        return full_text, lines
+
+    def _extract_text_uncached(self, image_path: str) -> Tuple[str, List[str]]:
+        """Run OCR on image or PDF"""
         try:
-            file_path = Path(image_path)
             logger.info(f"Processing file: {image_path}")
 
             # Check if it's a PDF
-            if file_path.suffix.lower() == '.pdf':
+            if is_pdf(image_path):
                 if not PDF_SUPPORT:
                     raise RuntimeError("PDF support not available. Install pdf2image: pip install pdf2image")
 
-                logger.info("📄 Detected PDF file - converting to images")
+                logger.info("📄 Detected PDF file - converting pages to images")
                 return self._extract_text_from_pdf(image_path)
             else:
                 # Regular image processing
@@ -52,12 +92,10 @@ class OCRService:
 
     def _extract_text_from_image(self, image_path: str) -> Tuple[str, List[str]]:
         """Extract text from a single image"""
-        # Read image
-        image = Image.open(image_path)
-        image_np = np.array(image)
+        image_np = self.load_page_image(image_path, 1)
 
         # Perform OCR
-        results = self.reader.readtext(image_np, detail=0)
+        results = self.backend.recognize(image_np)
 
         # Join results
         full_text = ' '.join(results)
@@ -66,46 +104,152 @@ class OCRService:
         return full_text, results
 
     def _extract_text_from_pdf(self, pdf_path: str) -> Tuple[str, List[str]]:
-        """Extract text from PDF by converting pages to images"""
-        logger.info(f"Converting PDF to images: {pdf_path}")
+        """
+        Extract text from PDF - embedded text layer where usable, otherwise OCR
+        rasterizing one page at a time
+        """
+        page_count = get_pdf_page_count(pdf_path)
+        logger.info(f"📄 PDF has {page_count} page(s)")
+
+        text_layers = get_pdf_text_layers(pdf_path)
+
+        pages = {
+            page_num: text_layers[page_num - 1]
+            for page_num in range(1, len(text_layers) + 1)
+            if text_layers[page_num - 1] is not None
+        }
+        pages_to_ocr = [page_num for page_num in range(1, page_count + 1) if page_num not in pages]
+
+        # Rasterize at most one batch of pages at a time
+        batch_size = max(settings.OCR_BATCH_SIZE, 1)
+        for start in range(0, len(pages_to_ocr), batch_size):
+            chunk = pages_to_ocr[start:start + batch_size]
+            results = self.extract_text_batch([(pdf_path, page_num, "page") for page_num in chunk])
+            pages.update(zip(chunk, results))
+
+        return merge_pages([pages[page_num] for page_num in range(1, page_count + 1)])
+
+    def extract_text_from_pdf_page(self, pdf_path: str, page_number: int) -> List[str]:
+        """
+        OCR a single PDF page (1-based)
+        Returns: list_of_lines
+        """
+        logger.info(f"Processing page {page_number} of {pdf_path}")
+
+        image_np = self.load_region_image(pdf_path, page_number)
+        results = self.backend.recognize(image_np)
+
+        logger.info(f"  → Extracted {len(results)} text segments from page {page_number}")
+        return results
 
-        # Convert PDF to images (one image per page)
-        images = convert_from_path(pdf_path, dpi=200)
-        logger.info(f"📄 PDF has {len(images)} page(s)")
+    def load_page_image(self, file_path: str, page_number: int) -> np.ndarray:
+        """
+        Load one page of an image or PDF (1-based) as preprocessed numpy array
+        """
+        if is_pdf(file_path):
+            image_np = np.array(render_pdf_page(file_path, page_number))
+        else:
+            # Decode the upload straight from memory when this process received it
+            content = upload_buffers.content(file_path)
+            image_np = np.array(Image.open(io.BytesIO(content) if content is not None else file_path))
+        return self.preprocess_image(image_np)
+
+    def load_region_image(self, file_path: str, page_number: int, region: str = "page") -> np.ndarray:
+        """
+        Load one region of a page: "header" (top OCR_EARLY_EXIT_HEADER_FRACTION of
+        the page), "body" (the rest) or "page" (whole page)
+        """
+        image_np = self.load_page_image(file_path, page_number)
 
-        all_text_segments = []
-        full_text_parts = []
+        split_at = int(image_np.shape[0] * settings.OCR_EARLY_EXIT_HEADER_FRACTION)
+        if region == "header":
+            image_np = image_np[:split_at]
+        elif region == "body":
+            image_np = image_np[split_at:]
 
-        # Process each page
-        for page_num, image in enumerate(images, 1):
-            logger.info(f"Processing page {page_num}/{len(images)}")
+        return image_np
 
-            # Convert PIL Image to numpy array
-            image_np = np.array(image)
+    def extract_text_from_region(self, file_path: str, page_number: int, region: str) -> List[str]:
+        """
+        OCR one region of a page (see load_region_image)
+        Returns: list_of_lines
+        """
+        image_np = self.load_region_image(file_path, page_number, region)
+
+        results = self.backend.recognize(image_np)
+        logger.info(f"  → Extracted {len(results)} text segments from page {page_number} ({region})")
+        return results
 
-            # Perform OCR on this page
-            results = self.reader.readtext(image_np, detail=0)
+    def extract_roi(self, file_path: str, page_number: int, region: str) -> Tuple[List[str], Dict]:
+        """
+        Region-of-interest OCR of a page (OCR_ROI_ENABLED): detect text boxes once,
+        recognize the title-like ones ("roi"), the others only when asked ("rest").
+        Backends without separate detection recognize the whole page as "roi".
+        Returns: (list_of_lines, stats)
+        """
+        image_np = self.load_page_image(file_path, page_number)
 
-            if results:
-                page_text = ' '.join(results)
-                full_text_parts.append(page_text)
-                all_text_segments.extend(results)
-                logger.info(f"  → Extracted {len(results)} text segments from page {page_num}")
+        if not self.backend.supports_roi:
+            lines = self.backend.recognize(image_np) if region == "roi" else []
+            return lines, {"boxes_total": 0, "boxes_recognized": 0, "complete": True, "recognize_seconds": 0.0}
 
-        # Combine all pages
-        full_text = ' '.join(full_text_parts)
-        logger.info(f"✅ Total extracted {len(all_text_segments)} text segments from {len(images)} page(s)")
+        start_time = time.time()
+        key = (file_path, page_number)
+        boxes = self._detections.pop(key, None)
+        if boxes is None:
+            boxes = self.backend.detect(image_np)
+        if region == "roi":
+            self._detections[key] = boxes
+            while len(self._detections) > 64:
+                self._detections.popitem(last=False)
+        detect_seconds = time.time() - start_time
 
-        return full_text, all_text_segments
+        lines, stats = recognize_title_region(
+            self.backend, image_np, boxes, region, settings.OCR_ROI_TOP_K, settings.OCR_ROI_MIN_CONFIDENCE
+        )
+        stats["detect_seconds"] = round(detect_seconds, 4)
+        logger.info(
+            f"  → ROI OCR page {page_number} ({region}): {stats['boxes_recognized']}/{stats['boxes_total']} boxes, "
+            f"confidence {stats['confidence']:.2f}"
+        )
+        return lines, stats
+
+    def extract_text_batch(self, items: List[Tuple[str, int, str]]) -> List[List[str]]:
+        """
+        OCR many regions in batched inference calls
+        items: list of (file_path, page_number, region)
+        Returns: list_of_lines for every item, in input order
+        """
+        images = [self.load_region_image(file_path, page_number, region) for file_path, page_number, region in items]
+        results = self.backend.recognize_batch(images)
+        logger.info(f"  → Batched OCR of {len(items)} region(s)")
+        return results
+
+    def preprocess_image(self, image_np: np.ndarray) -> np.ndarray:
+        """
+        Preprocess image before OCR (grayscale, margin crop, deskew, downscale -
+        see ImagePreprocessor, steps are toggled in settings)
+        """
+        original_shape = image_np.shape
+        image_np, timings = self.preprocessor.process(image_np)
+        self._preprocessed_images += 1
+        for step, ms in timings.items():
+            self._preprocess_ms[step] = self._preprocess_ms.get(step, 0.0) + ms
+        logger.debug(
+            f"Preprocessed {original_shape[1]}x{original_shape[0]} -> {image_np.shape[1]}x{image_np.shape[0]} "
+            f"({', '.join(f'{step} {ms:.1f}ms' for step, ms in timings.items())})"
+        )
+        return image_np
 
-    def preprocess_image(self, image_path: str) -> str:
+    def take_preprocess_timings(self) -> Dict:
         """
-        Preprocess image for better OCR results
-        Can be extended with more preprocessing steps
+        Preprocessing timings since the previous call (collected by the worker pool for /stats)
+        Returns: {"images": count, "steps_ms": {step: total_ms}}
         """
-        # Placeholder for image preprocessing
-        # You can add: denoise, contrast adjustment, deskewing, etc.
-        return image_path
+        timings = {"images": self._preprocessed_images, "steps_ms": self._preprocess_ms}
+        self._preprocess_ms = {}
+        self._preprocessed_images = 0
+        return timings
 
 
 # Singleton instance
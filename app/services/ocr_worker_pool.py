@@ -0,0 +1,519 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.services.ocr_cache_service import ocr_cache, ocr_cache_fingerprint, file_sha256
+from app.services.storage_service import upload_buffers
+from app.utils.pdf_utils import get_pdf_page_count, get_pdf_text_layers, get_page_count, merge_pages, is_pdf
+
+logger = logging.getLogger(__name__)
+
+# (file_path, page_number, region)
+RegionItem = Tuple[str, int, str]
+
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR queue has no free slots (mapped to HTTP 429)"""
+
+
+def _init_worker():
+    """
+    Worker process initializer - importing the OCR service builds this
+    process' own easyocr.Reader before the first job arrives
+    """
+    from app.services.ocr_service import ocr_service  # noqa: F401
+    logger.info("OCR worker ready")
+
+
+def _run_warmup() -> Tuple[int, float, float]:
+    """Job executed inside a worker - load the OCR model and run one inference"""
+    from app.services.ocr_service import ocr_service
+    return os.getpid(), ocr_service.load_seconds, ocr_service.warmup()
+
+
+# OCR jobs return (result, preprocessing timings of the job), so per-step timings
+# reach /stats also from worker processes and the OCR server
+
+def _run_extract_region(file_path: str, page_number: int, region: str) -> Tuple[List[str], Dict]:
+    """Job executed inside a worker - OCR one region of a page"""
+    from app.services.ocr_service import ocr_service
+    return ocr_service.extract_text_from_region(file_path, page_number, region), ocr_service.take_preprocess_timings()
+
+
+def _run_extract_roi(file_path: str, page_number: int, region: str) -> Tuple[List, Dict]:
+    """Job executed inside a worker - region-of-interest OCR of a page ("roi" / "rest")"""
+    from app.services.ocr_service import ocr_service
+    return list(ocr_service.extract_roi(file_path, page_number, region)), ocr_service.take_preprocess_timings()
+
+
+def _run_extract_batch(items: List[RegionItem]) -> Tuple[List[List[str]], Dict]:
+    """Job executed inside a worker - OCR several regions in one batched call"""
+    from app.services.ocr_service import ocr_service
+    return ocr_service.extract_text_batch(items), ocr_service.take_preprocess_timings()
+
+
+def roi_seconds_saved(boxes_total: int, boxes_recognized: int, recognize_seconds: float) -> float:
+    """
+    Estimated recognition time of the boxes region-of-interest OCR skipped, at the
+    measured time per recognized box
+    """
+    if boxes_recognized == 0:
+        return 0.0
+    return recognize_seconds / boxes_recognized * max(boxes_total - boxes_recognized, 0)
+
+
+class OCRServerClient:
+    """
+    Sends OCR jobs to the shared OCR server (python -m app.ocr_server) over its
+    Unix socket, one connection per job
+    """
+
+    # Responses carry recognized lines of up to a few batched pages
+    MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, socket_path: str, timeout: float):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    async def call(self, job: str, *args):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=self.MAX_RESPONSE_BYTES)
+        try:
+            writer.write(json.dumps({"job": job, "args": list(args)}).encode("utf-8") + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+        finally:
+            writer.close()
+
+        if not line:
+            raise RuntimeError("OCR server closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"OCR server: {response['error']}")
+        return response["result"]
+
+
+# Worker pool jobs the OCR server can run, by job name
+REMOTE_JOBS = {
+    _run_extract_region: "extract_region",
+    _run_extract_batch: "extract_batch",
+    _run_extract_roi: "extract_roi",
+    _run_warmup: "warmup",
+}
+
+
+class OCRBatcher:
+    """
+    Collects single-region OCR requests coming from concurrent requests for up to
+    max_wait_ms (or until batch_size are waiting) and runs them as one batched
+    job on the worker pool
+    """
+
+    def __init__(self, pool: "OCRWorkerPool", batch_size: int, max_wait_ms: int):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+        self._waiting: List[Tuple[RegionItem, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Running batches (the event loop keeps only weak references to tasks)
+        self._batches: Set[asyncio.Task] = set()
+
+    async def recognize(self, item: RegionItem) -> List[str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((item, future))
+
+        if len(self._waiting) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._waiting = self._waiting, []
+        # Waiters cancelled meanwhile (e.g. early exit closed its region iterator) need no OCR
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch: List[Tuple[RegionItem, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        self.pool._stats["batches"] += 1
+        self.pool._stats["batched_items"] += len(items)
+
+        try:
+            results = await self.pool._execute_ocr(_run_extract_batch, items)
+        except Exception as e:
+            if len(items) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # One unreadable image must not fail the other documents in the batch
+            logger.warning(f"Batched OCR of {len(items)} regions failed ({e}), retrying one by one")
+            await asyncio.gather(*[self._run_single(item, future) for item, future in batch])
+            return
+
+        for (_, future), lines in zip(batch, results):
+            if not future.done():
+                future.set_result(lines)
+
+    async def _run_single(self, item: RegionItem, future: asyncio.Future):
+        try:
+            lines = await self.pool._execute_ocr(_run_extract_region, *item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(lines)
+
+
+class OCRWorkerPool:
+    """
+    Runs OCR jobs outside the event loop.
+
+    With OCR_WORKERS > 0 jobs go to a pool of processes, each holding its own
+    easyocr.Reader, so one API process can keep serving requests while N cores do
+    OCR. With OCR_WORKERS = 0 jobs run on a single background thread of the API
+    process. In both modes at most OCR_QUEUE_SIZE jobs may be pending; further
+    submissions fail fast with OCRQueueFullError.
+
+    Every unit of OCR work is one region of one page (see OCRService.load_region_image).
+    With OCR_BATCH_SIZE > 1 regions from concurrent requests are grouped by OCRBatcher.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        batch_size: int = 1,
+        batch_max_wait_ms: int = 0,
+        server_socket: str = ""
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.server_socket = server_socket
+        self._executor: Optional[Executor] = None
+        self._remote: Optional[OCRServerClient] = None
+        self._pending = 0
+        self._batcher = OCRBatcher(self, batch_size, batch_max_wait_ms) if batch_size > 1 else None
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "busy_seconds": 0.0,
+            "batches": 0,
+            "batched_items": 0,
+            "roi_pages": 0,
+            "roi_boxes_total": 0,
+            "roi_boxes_recognized": 0,
+            "roi_low_confidence_fallbacks": 0,
+            "roi_recognize_seconds": 0.0,
+            "preprocessed_images": 0,
+        }
+        self._preprocess_ms: Dict[str, float] = {}
+
+    def start(self):
+        """
+        Create the executor (called at application startup, or lazily on first job)
+        """
+        if self._executor is not None or self._remote is not None:
+            return
+
+        if self.server_socket:
+            logger.info(f"OCR jobs go to the shared OCR server at {self.server_socket}")
+            self._remote = OCRServerClient(self.server_socket, settings.OCR_SERVER_TIMEOUT)
+        elif self.workers > 0:
+            logger.info(f"Starting OCR worker pool with {self.workers} process(es), queue size {self.queue_size}")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        else:
+            logger.info("OCR running in-process on a background thread")
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+
+    async def warmup(self) -> Dict:
+        """
+        Load the OCR model in every worker before the first request arrives
+        Returns: details for the readiness report
+        """
+        workers = settings.OCR_SERVER_WORKERS if self.server_socket else max(self.workers, 1)
+        results = await asyncio.gather(*[self._execute(_run_warmup) for _ in range(workers)])
+        return {
+            "workers_loaded": len({pid for pid, _, _ in results}),
+            "model_load_seconds": round(max(load for _, load, _ in results), 3),
+            "first_inference_seconds": round(max(inference for _, _, inference in results), 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._remote = None
+
+    def is_full(self) -> bool:
+        return self._pending >= self.queue_size
+
+    async def extract_text(self, file_path: str, reject_when_full: bool = True) -> Tuple[str, List[str]]:
+        """
+        Extract text from image or PDF without blocking the event loop.
+        Jobs that were already accepted (background processing) pass
+        reject_when_full=False and wait for a free worker instead of failing.
+        Returns: (full_text, list_of_lines)
+        """
+        cache_key, cached = await self.lookup_cache(file_path)
+        if cached is not None:
+            return cached
+
+        start_time = time.time()
+        if is_pdf(file_path):
+            full_text, lines = await self._extract_text_from_pdf(file_path, reject_when_full)
+        else:
+            lines = await self.ocr_region(file_path, 1, "page", reject_when_full=reject_when_full)
+            full_text = ' '.join(lines)
+
+        await self.store_cache(cache_key, full_text, lines, time.time() - start_time)
+        return full_text, lines
+
+    async def lookup_cache(self, file_path: str) -> Tuple[Optional[str], Optional[Tuple[str, List[str]]]]:
+        """
+        Look up full-document OCR result for a file
+        Returns: (cache_key, (full_text, list_of_lines) or None)
+        """
+        if not ocr_cache.enabled:
+            return None, None
+
+        loop = asyncio.get_running_loop()
+        # Hashed while the upload was streamed in, otherwise read the file
+        content_hash = upload_buffers.sha256(file_path) or await loop.run_in_executor(None, file_sha256, file_path)
+        cache_key = ocr_cache.build_key(content_hash, ocr_cache_fingerprint())
+        cached = await loop.run_in_executor(None, ocr_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"OCR cache hit for {file_path}")
+        return cache_key, cached
+
+    async def store_cache(self, cache_key: Optional[str], full_text: str, lines: List[str], ocr_seconds: float):
+        """
+        Store full-document OCR result (the disk write and eviction scan run off the event loop)
+        """
+        if cache_key is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, ocr_cache.put, cache_key, full_text, lines, ocr_seconds)
+
+    async def _extract_text_from_pdf(self, pdf_path: str, reject_when_full: bool) -> Tuple[str, List[str]]:
+        """
+        OCR PDF pages in parallel across workers and reassemble them in page order.
+        Each worker rasterizes only its own page, so no process holds the whole document.
+        """
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(None, get_pdf_page_count, pdf_path)
+        text_layers = await loop.run_in_executor(None, get_pdf_text_layers, pdf_path)
+
+        # Born-digital pages are read from the text layer and never reach the workers
+        pages_to_ocr = [
+            page_num for page_num in range(1, page_count + 1)
+            if page_num > len(text_layers) or text_layers[page_num - 1] is None
+        ]
+        logger.info(f"📄 PDF has {page_count} page(s), {len(pages_to_ocr)} need OCR")
+
+        # Backpressure applies to the document as a whole: once it is accepted,
+        # all of its pages queue up instead of being rejected one by one
+        if pages_to_ocr and reject_when_full:
+            self._reject_if_full()
+
+        ocr_results = await asyncio.gather(*[
+            self.ocr_region(pdf_path, page_num, "page", reject_when_full=False)
+            for page_num in pages_to_ocr
+        ])
+        ocr_pages = dict(zip(pages_to_ocr, ocr_results))
+
+        pages = [
+            ocr_pages[page_num] if page_num in ocr_pages else text_layers[page_num - 1]
+            for page_num in range(1, page_count + 1)
+        ]
+        return merge_pages(pages)
+
+    async def page_count(self, file_path: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, get_page_count, file_path)
+
+    async def iter_regions(
+        self,
+        file_path: str,
+        reject_when_full: bool = True,
+        roi_pages: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Tuple[int, str, List[str]]]:
+        """
+        OCR a document incrementally: for every page the header region first, then
+        the rest of the page. With OCR_ROI_ENABLED the regions are the title-like
+        text boxes ("roi") and the remaining boxes ("rest") instead of horizontal
+        strips; per-page box counts are appended to roi_pages. PDF pages with a
+        usable text layer are yielded whole as region "text_layer" without OCR.
+        The consumer stops iterating once it has enough text, so remaining regions
+        are never submitted.
+        Yields: (page_number, region, list_of_lines)
+        """
+        loop = asyncio.get_running_loop()
+        page_count = await self.page_count(file_path)
+        if settings.OCR_ROI_ENABLED:
+            regions = ("roi", "rest")
+        elif settings.OCR_EARLY_EXIT_HEADER_FRACTION > 0:
+            regions = ("header", "body")
+        else:
+            regions = ("page",)
+
+        text_layers = []
+        if is_pdf(file_path):
+            text_layers = await loop.run_in_executor(None, get_pdf_text_layers, file_path)
+
+        for page_number in range(1, page_count + 1):
+            if page_number <= len(text_layers) and text_layers[page_number - 1] is not None:
+                yield page_number, "text_layer", text_layers[page_number - 1]
+                continue
+
+            page_stats = None
+            for region in regions:
+                if region in ("roi", "rest"):
+                    if page_stats is not None and page_stats["complete"]:
+                        continue
+                    lines, stats = await self.ocr_roi(file_path, page_number, region, reject_when_full=reject_when_full)
+                    page_stats = self._merge_roi_page(page_stats, page_number, stats)
+                    if region == "roi" and roi_pages is not None:
+                        roi_pages.append(page_stats)
+                else:
+                    lines = await self.ocr_region(file_path, page_number, region, reject_when_full=reject_when_full)
+                # The document is accepted once its first region has been processed
+                reject_when_full = False
+                yield page_number, region, lines
+
+    async def ocr_roi(self, file_path: str, page_number: int, region: str, reject_when_full: bool = True) -> Tuple[List[str], Dict]:
+        """
+        Region-of-interest OCR of one page (see OCRService.extract_roi)
+        Returns: (list_of_lines, stats)
+        """
+        async with self._slot(reject_when_full):
+            lines, stats = await self._execute_ocr(_run_extract_roi, file_path, page_number, region)
+
+        if region == "roi":
+            self._stats["roi_pages"] += 1
+            self._stats["roi_boxes_total"] += stats["boxes_total"]
+        self._stats["roi_boxes_recognized"] += stats["boxes_recognized"]
+        self._stats["roi_low_confidence_fallbacks"] += int(stats.get("low_confidence_fallback", False))
+        self._stats["roi_recognize_seconds"] += stats["recognize_seconds"]
+        return lines, stats
+
+    @staticmethod
+    def _merge_roi_page(page_stats: Optional[Dict], page_number: int, stats: Dict) -> Dict:
+        if page_stats is None:
+            page_stats = {"page": page_number, "boxes_total": stats["boxes_total"], "boxes_recognized": 0, "recognize_seconds": 0.0}
+        page_stats["boxes_recognized"] += stats["boxes_recognized"]
+        page_stats["recognize_seconds"] += stats["recognize_seconds"]
+        page_stats["complete"] = stats["complete"]
+        return page_stats
+
+    async def ocr_region(self, file_path: str, page_number: int, region: str, reject_when_full: bool = True) -> List[str]:
+        """
+        OCR one region of a page, batched together with concurrent requests when enabled
+        Returns: list_of_lines
+        """
+        async with self._slot(reject_when_full):
+            if self._batcher is not None:
+                return await self._batcher.recognize((file_path, page_number, region))
+            return await self._execute_ocr(_run_extract_region, file_path, page_number, region)
+
+    async def submit(self, fn: Callable, *args, reject_when_full: bool = True):
+        """
+        Run a picklable job on the pool and await its result
+        Raises: OCRQueueFullError when the queue is full
+        """
+        async with self._slot(reject_when_full):
+            return await self._execute(fn, *args)
+
+    @asynccontextmanager
+    async def _slot(self, reject_when_full: bool):
+        """
+        Account one pending unit of work (queue backpressure and counters)
+        """
+        if reject_when_full:
+            self._reject_if_full()
+
+        self._pending += 1
+        self._stats["submitted"] += 1
+        start_time = time.time()
+
+        try:
+            yield
+            self._stats["completed"] += 1
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+            self._stats["busy_seconds"] += time.time() - start_time
+
+    async def _execute(self, fn: Callable, *args):
+        self.start()
+        if self._remote is not None:
+            if fn not in REMOTE_JOBS:
+                raise ValueError(f"{fn.__name__} cannot run on the OCR server")
+            return await self._remote.call(REMOTE_JOBS[fn], *args)
+        return await asyncio.wrap_future(self._executor.submit(fn, *args))
+
+    async def _execute_ocr(self, fn: Callable, *args):
+        """
+        Run an OCR job and record the preprocessing timings it returns
+        """
+        result, timings = await self._execute(fn, *args)
+        self._stats["preprocessed_images"] += timings["images"]
+        for step, ms in timings["steps_ms"].items():
+            self._preprocess_ms[step] = self._preprocess_ms.get(step, 0.0) + ms
+        return result
+
+    def _reject_if_full(self):
+        if self.is_full():
+            self._stats["rejected"] += 1
+            raise OCRQueueFullError(f"OCR queue is full ({self.queue_size} pending jobs)")
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats["mode"] = "server" if self.server_socket else "processes" if self.workers > 0 else "thread"
+        stats["backend"] = settings.OCR_BACKEND
+        stats["workers"] = self.workers
+        stats["queue_size"] = self.queue_size
+        stats["pending"] = self._pending
+        stats["avg_batch_size"] = stats["batched_items"] / stats["batches"] if stats["batches"] else 0.0
+        stats["roi_fraction_recognized"] = (
+            stats["roi_boxes_recognized"] / stats["roi_boxes_total"] if stats["roi_boxes_total"] else 1.0
+        )
+        stats["roi_seconds_saved"] = roi_seconds_saved(
+            stats["roi_boxes_total"], stats["roi_boxes_recognized"], stats["roi_recognize_seconds"]
+        )
+        images = stats["preprocessed_images"]
+        stats["preprocess_avg_ms"] = {
+            step: round(ms / images, 2) for step, ms in self._preprocess_ms.items()
+        } if images else {}
+        return stats
+
+
+# Singleton instance
+ocr_worker_pool = OCRWorkerPool(
+    workers=settings.OCR_WORKERS,
+    queue_size=settings.OCR_QUEUE_SIZE,
+    batch_size=settings.OCR_BATCH_SIZE,
+    batch_max_wait_ms=settings.OCR_BATCH_MAX_WAIT_MS,
+    server_socket=settings.OCR_SERVER_SOCKET
+)
@@ -0,0 +1,191 @@
+import time
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Dict, List, Set, Tuple
+from app.models import DocumentType
+from app.config import settings
+from app.services.ocr_worker_pool import ocr_worker_pool, roi_seconds_saved
+from app.services.classifier_service import classifier_service
+from app.utils.pdf_utils import merge_pages
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentPipeline:
+    """
+    OCR + classification steps shared by the synchronous endpoints and background processing
+    """
+
+    async def extract_text(self, file_paths: List[str], reject_when_full: bool = True) -> Tuple[str, Dict]:
+        """
+        Extract text from one or more files treated as one document
+        Returns: (merged_text, ocr_metadata incl. LLM token counts)
+        """
+        if settings.OCR_EARLY_EXIT_ENABLED:
+            text, metadata = await self._extract_text_early_exit(file_paths, reject_when_full)
+        else:
+            all_text_parts = []
+            for file_path in file_paths:
+                extracted_text, _ = await ocr_worker_pool.extract_text(file_path, reject_when_full=reject_when_full)
+                all_text_parts.append(extracted_text)
+                # The document is accepted once its first file is in the queue
+                reject_when_full = False
+            text, metadata = ' '.join(all_text_parts), {"ocr_early_exit": False}
+
+        metadata.update(classifier_service.prepare_llm_text(text)[1])
+        return text, metadata
+
+    async def _extract_text_early_exit(self, file_paths: List[str], reject_when_full: bool) -> Tuple[str, Dict]:
+        """
+        OCR region by region (page header first, then the rest of the page) and stop
+        as soon as the classifier is confident enough about the text read so far
+        """
+        text_parts = []
+        pages_total = 0
+        pages_processed = 0
+        regions_processed = 0
+        text_layer_pages = 0
+        stopped = False
+        confidence = 0.0
+        roi_pages = []
+
+        for file_path in file_paths:
+            pages_total += await ocr_worker_pool.page_count(file_path)
+
+        for file_index, file_path in enumerate(file_paths):
+            cache_key, cached = await ocr_worker_pool.lookup_cache(file_path)
+
+            if cached is not None:
+                text_parts.append(cached[0])
+            else:
+                last_page = None
+                file_roi_pages = []
+                page_lines: Dict[int, List[str]] = {}
+                start_time = time.time()
+                regions = ocr_worker_pool.iter_regions(
+                    file_path, reject_when_full=reject_when_full, roi_pages=file_roi_pages
+                )
+                async with aclosing(regions):
+                    async for page_number, region, lines in regions:
+                        if region == "text_layer":
+                            text_layer_pages += 1
+                        else:
+                            regions_processed += 1
+                            if page_number != last_page:
+                                pages_processed += 1
+                                last_page = page_number
+                        page_lines.setdefault(page_number, []).extend(lines)
+                        if lines:
+                            text_parts.append(' '.join(lines))
+
+                        stopped, confidence = await classifier_service.should_stop_ocr(' '.join(text_parts))
+                        if stopped:
+                            logger.info(f"⏹ Early exit after page {page_number} ({region}), confidence {confidence:.2f}")
+                            break
+                    else:
+                        # Whole file read - cache it like a full OCR run (a partial read is not cached)
+                        full_text, all_lines = merge_pages([page_lines[page] for page in sorted(page_lines)])
+                        await ocr_worker_pool.store_cache(cache_key, full_text, all_lines, time.time() - start_time)
+                roi_pages.extend({"file": file_index, **page} for page in file_roi_pages)
+
+            reject_when_full = False
+            if not stopped and cached is not None:
+                stopped, confidence = await classifier_service.should_stop_ocr(' '.join(text_parts))
+            if stopped:
+                break
+
+        metadata = {
+            "ocr_early_exit": stopped,
+            "ocr_pages_total": pages_total,
+            "ocr_pages_processed": pages_processed,
+            "ocr_regions_processed": regions_processed,
+            "ocr_pages_text_layer": text_layer_pages,
+            "ocr_exit_confidence": round(confidence, 4),
+        }
+        if settings.OCR_ROI_ENABLED:
+            metadata["ocr_roi_pages"] = [
+                {
+                    "file": page["file"],
+                    "page": page["page"],
+                    "boxes_total": page["boxes_total"],
+                    "boxes_recognized": page["boxes_recognized"],
+                    "fraction_recognized": round(page["boxes_recognized"] / page["boxes_total"], 4) if page["boxes_total"] else 1.0,
+                }
+                for page in roi_pages
+            ]
+            metadata["ocr_roi_seconds_saved"] = round(sum(
+                roi_seconds_saved(page["boxes_total"], page["boxes_recognized"], page["recognize_seconds"])
+                for page in roi_pages
+            ), 3)
+        return ' '.join(text_parts), metadata
+
+    async def classify(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        """
+        Classify extracted text without blocking the event loop
+        Returns: (document_type, confidence, keywords_found)
+        """
+        return await classifier_service.classify_async(text)
+
+
+class ClassificationPacker:
+    """
+    Collects texts of files processed concurrently (one asyncio task per file) and
+    classifies them together, so the LLM can pack short documents into one prompt.
+
+    Every task calls start() when it begins and leave() when it is done. The pending
+    texts are classified once no started task is still busy with OCR - tasks waiting
+    for a concurrency slot do not hold the batch back.
+    """
+
+    def __init__(self):
+        self._running = 0
+        self._submitted: Set[asyncio.Task] = set()
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._batches: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._running += 1
+
+    def leave(self):
+        task = asyncio.current_task()
+        if task in self._submitted:
+            self._submitted.discard(task)
+        else:
+            # Failed before classification
+            self._running -= 1
+            self._flush_if_idle()
+
+    async def classify(self, text: str) -> Tuple[DocumentType, float, List[str]]:
+        """
+        Same contract as DocumentPipeline.classify
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        self._submitted.add(asyncio.current_task())
+        self._running -= 1
+        self._flush_if_idle()
+        return await future
+
+    def _flush_if_idle(self):
+        if self._pending and self._running == 0:
+            batch, self._pending = self._pending, []
+            task = asyncio.create_task(self._classify_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _classify_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            results = await classifier_service.classify_many_async([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# Singleton instance
+document_pipeline = DocumentPipeline()
@@ -1,57 +1,281 @@
 import os
+import time
 import uuid
+import errno
 import shutil
+import asyncio
+import hashlib
 import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import BinaryIO
+from typing import Dict, Optional, Tuple
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import boto3
+    S3_SUPPORT = True
+except ImportError:
+    S3_SUPPORT = False
+
+# Suffix of files being written; renamed to the final name only when complete
+PARTIAL_SUFFIX = ".part"
+
+
+class FileTooLargeError(ValueError):
+    """Raised while streaming an upload once it exceeds MAX_FILE_SIZE"""
+
+
+@dataclass
+class StoredUpload:
+    file_id: str
+    file_path: str
+    size: int
+    sha256: str
+
+
+class UploadBuffers:
+    """
+    Content and hash of uploads still being processed, keyed by file path, so OCR in
+    this process decodes the received bytes and the OCR cache skips re-hashing the
+    file. Entries are dropped when the file is moved to processed or cleaned up.
+    OCR worker processes and the OCR server do not see these buffers and read the
+    file, so content is only kept when OCR runs in this process (hashes always are).
+    """
 
-class StorageService:
     def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Optional[bytes], str]] = {}
+
+    def put(self, file_path: str, content: Optional[bytes], sha256: str):
+        with self._lock:
+            self._entries[file_path] = (content, sha256)
+
+    def content(self, file_path: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(file_path)
+        return entry[0] if entry else None
+
+    def sha256(self, file_path: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(file_path)
+        return entry[1] if entry else None
+
+    def release(self, file_path: str):
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class StorageBackend(ABC):
+    """
+    Permanent storage of processed documents. Keys are relative paths
+    ("<document_type>/<shard>/<shard>/<file name>").
+    """
+    name = "abstract"
+
+    @abstractmethod
+    async def store_file(self, local_path: str, key: str) -> str:
+        """
+        Move a local file to key (the local file is gone afterwards)
+        Returns: location of the stored file
+        """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files under a root directory. A rename within one filesystem is atomic; across
+    filesystems the file is copied to a partial file next to the target first, so
+    readers never see a half-written document.
+    """
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    async def store_file(self, local_path: str, key: str) -> str:
+        target = self._path(key)
+        await aiofiles.os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            await aiofiles.os.replace(local_path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            partial = target + PARTIAL_SUFFIX
+            await asyncio.get_running_loop().run_in_executor(None, shutil.copyfile, local_path, partial)
+            await aiofiles.os.replace(partial, target)
+            await aiofiles.os.remove(local_path)
+        return target
+
+    async def exists(self, key: str) -> bool:
+        return await aiofiles.os.path.exists(self._path(key))
+
+    async def delete(self, key: str):
+        try:
+            await aiofiles.os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3-compatible object storage (AWS S3, MinIO, LocalStack...). An object becomes
+    visible only after a complete upload, so writes are atomic. Credentials come from
+    the usual AWS environment variables / config files.
+    """
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = ""):
+        if not S3_SUPPORT:
+            raise RuntimeError("S3 storage not available. Install boto3: pip install boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    async def store_file(self, local_path: str, key: str) -> str:
+        await self._run(self.client.upload_file, local_path, self.bucket, self._key(key))
+        await aiofiles.os.remove(local_path)
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self._run(self.client.head_object, Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    async def delete(self, key: str):
+        await self._run(self.client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+
+def create_storage_backend() -> StorageBackend:
+    """
+    Backend selected by STORAGE_BACKEND (local | s3)
+    """
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            bucket=settings.STORAGE_S3_BUCKET,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+            prefix=settings.STORAGE_S3_PREFIX
+        )
+    return LocalStorageBackend(settings.PROCESSED_DIR)
+
+
+def processed_key(document_type: str, filename: str, depth: Optional[int] = None) -> str:
+    """
+    Hash-prefix sharded key: DOC_BADANIE_MORF/3f/a2/<file name>. With depth 2 every
+    document type is spread over 65536 directories, so none of them grows huge.
+    """
+    depth = settings.STORAGE_SHARD_DEPTH if depth is None else depth
+    digest = hashlib.sha256(filename.encode("utf-8")).hexdigest()
+    shards = [digest[2 * i:2 * i + 2] for i in range(depth)]
+    return "/".join([document_type, *shards, filename])
+
+
+class StorageService:
+    """
+    Temporary uploads on local disk (UPLOAD_DIR, needed by OCR) and permanent storage
+    of processed documents in a pluggable backend. All I/O is asynchronous.
+    """
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
         # Create directories if they don't exist
         Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
         Path(settings.PROCESSED_DIR).mkdir(parents=True, exist_ok=True)
+        self.backend = backend or create_storage_backend()
+        self._janitor: Optional[asyncio.Task] = None
 
-    def save_uploaded_file(self, file: BinaryIO, filename: str) -> tuple[str, str]:
+    async def save_upload(self, upload: UploadFile, keep_in_memory: bool = True) -> StoredUpload:
         """
-        Save uploaded file to temporary storage
-        Returns: (file_id, file_path)
+        Stream an upload to temporary storage: MAX_FILE_SIZE is enforced while reading
+        (an oversized file is rejected without reading the rest) and the SHA-256 is
+        computed on the fly. The file is written under a partial name and renamed when
+        complete. Uploads up to UPLOAD_MEMORY_MAX_BYTES stay in memory for OCR on the
+        in-process thread (see UploadBuffers). keep_in_memory=False registers nothing - for files that may be
+        processed by another process, which would never release the entry.
+        Raises: ValueError for a disallowed extension, FileTooLargeError
         """
         file_id = str(uuid.uuid4())
-        file_extension = Path(filename).suffix
+        file_extension = Path(upload.filename or "").suffix
 
         # Validate extension
         if file_extension.lstrip('.').lower() not in settings.allowed_extensions_list:
             raise ValueError(f"File extension {file_extension} not allowed")
 
-        file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{file_extension}")
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+        while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.MAX_FILE_SIZE:
+                raise FileTooLargeError(
+                    f"File {upload.filename} too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
+                )
+            digest.update(chunk)
+            chunks.append(chunk)
+        content = b"".join(chunks)
 
+        file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{file_extension}")
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file, buffer)
-
-            logger.info(f"File saved: {file_path}")
-            return file_id, file_path
-
+            await self._write_atomic(file_path, content)
         except Exception as e:
             logger.error(f"Error saving file: {str(e)}")
             raise
 
-    def move_to_processed(self, file_path: str, document_type: str) -> str:
+        if keep_in_memory:
+            # Worker processes and the OCR server read the file, the bytes would only use memory
+            buffered = settings.ocr_in_process and size <= settings.UPLOAD_MEMORY_MAX_BYTES
+            upload_buffers.put(file_path, content if buffered else None, digest.hexdigest())
+
+        logger.info(f"File saved: {file_path} ({size} bytes)")
+        return StoredUpload(file_id=file_id, file_path=file_path, size=size, sha256=digest.hexdigest())
+
+    @staticmethod
+    async def _write_atomic(path: str, content: bytes):
+        partial = path + PARTIAL_SUFFIX
+        try:
+            async with aiofiles.open(partial, "wb") as buffer:
+                await buffer.write(content)
+            await aiofiles.os.replace(partial, path)
+        except BaseException:
+            if await aiofiles.os.path.exists(partial):
+                await aiofiles.os.remove(partial)
+            raise
+
+    async def move_to_processed(self, file_path: str, document_type: str) -> str:
         """
-        Move processed file to permanent storage
-        Returns: new_file_path
+        Move processed file to permanent storage (sharded key, see processed_key)
+        Returns: location of the stored file
         """
+        upload_buffers.release(file_path)
         try:
-            filename = Path(file_path).name
-            type_dir = os.path.join(settings.PROCESSED_DIR, document_type)
-            Path(type_dir).mkdir(parents=True, exist_ok=True)
-
-            new_path = os.path.join(type_dir, filename)
-            shutil.move(file_path, new_path)
+            new_path = await self.backend.store_file(file_path, processed_key(document_type, Path(file_path).name))
 
             logger.info(f"File moved to: {new_path}")
             return new_path
@@ -60,17 +284,81 @@ class StorageService:
             logger.error(f"Error moving file: {str(e)}")
             raise
 
-    def cleanup_temp_file(self, file_path: str):
+    async def cleanup_temp_file(self, file_path: str):
         """
         Remove temporary file
         """
+        upload_buffers.release(file_path)
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Temporary file removed: {file_path}")
+            await aiofiles.os.remove(file_path)
+            logger.info(f"Temporary file removed: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Error removing temporary file: {str(e)}")
 
+    async def cleanup_orphans(self, max_age_seconds: Optional[float] = None) -> int:
+        """
+        Remove files left in UPLOAD_DIR by crashed requests or workers: older than
+        UPLOAD_ORPHAN_MAX_AGE and not held by a request of this process
+        Returns: number of removed files
+        """
+        max_age = settings.UPLOAD_ORPHAN_MAX_AGE if max_age_seconds is None else max_age_seconds
+        loop = asyncio.get_running_loop()
+        candidates = await loop.run_in_executor(None, self._files_older_than, settings.UPLOAD_DIR, time.time() - max_age)
+        removed = 0
+
+        for path in candidates:
+            if upload_buffers.sha256(path) is not None:
+                continue
+            try:
+                await aiofiles.os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+
+        if removed:
+            logger.info(f"🧹 Removed {removed} orphaned upload(s) older than {max_age:.0f}s")
+        return removed
+
+    @staticmethod
+    def _files_older_than(directory: str, cutoff: float) -> list:
+        paths = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        paths.append(entry.path)
+                except FileNotFoundError:
+                    continue
+        return paths
+
+    def start_janitor(self):
+        """
+        Run cleanup_orphans every UPLOAD_JANITOR_INTERVAL seconds (0 = disabled)
+        """
+        if settings.UPLOAD_JANITOR_INTERVAL <= 0 or self._janitor is not None:
+            return
+        self._janitor = asyncio.create_task(self._run_janitor())
+
+    async def stop_janitor(self):
+        if self._janitor is not None:
+            self._janitor.cancel()
+            try:
+                await self._janitor
+            except asyncio.CancelledError:
+                pass
+            self._janitor = None
+
+    async def _run_janitor(self):
+        while True:
+            try:
+                await self.cleanup_orphans()
+            except Exception as e:
+                logger.error(f"Upload janitor failed: {str(e)}")
+            await asyncio.sleep(settings.UPLOAD_JANITOR_INTERVAL)
+
 
-# Singleton instance
+# Singleton instances
+upload_buffers = UploadBuffers()
 storage_service = StorageService()
@@ -0,0 +1,312 @@
+"""
+Character n-gram TF-IDF + softmax linear classifier (pure NumPy)
+
+Local tier between keyword rules and the LLM: robust to OCR errors and missing
+Polish diacritics, trained from a folder of labeled OCR texts:
+
+    <training_dir>/<DOCUMENT_TYPE_VALUE>/*.txt
+
+Train:     python -m app.services.text_classifier_service train <training_dir> <model.npz>
+Benchmark: python -m app.services.text_classifier_service bench <model.npz> <training_dir>
+"""
+import re
+import sys
+import time
+import logging
+import unicodedata
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from app.models import DocumentType
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"[0-9]")
+_HASH_PRIME = np.uint32(16777619)
+_FIB_MULTIPLIER = np.uint32(2654435769)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, strip diacritics, map digits to 0 and collapse everything that is
+    not a letter or digit to single spaces
+    """
+    # "ł" has no decomposition, fold it by hand
+    text = unicodedata.normalize("NFKD", text.lower().replace("ł", "l"))
+    text = text.encode("ascii", "ignore").decode("ascii")
+    text = _DIGITS.sub("0", text)
+    return " " + _NON_ALNUM.sub(" ", text).strip() + " "
+
+
+class NgramTextClassifier:
+    """
+    Multinomial logistic regression over hashed character n-grams.
+
+    Feature extraction is vectorized over the whole batch: all texts are
+    concatenated into one code array, n-gram hashes are computed with array
+    arithmetic and weights are summed per document with reduceat.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        dim_bits: int = 18,
+        ngram_range: Tuple[int, int] = (3, 4),
+        max_chars: int = 2000,
+    ):
+        self.labels = list(labels)
+        self.dim_bits = dim_bits
+        self.dim = 2 ** dim_bits
+        self.ngram_range = ngram_range
+        self.max_chars = max_chars
+        # (classes, features)
+        self.weights = np.zeros((len(self.labels), self.dim), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        self.idf = np.ones(self.dim, dtype=np.float32)
+
+    # Features
+
+    def _hashed_ngrams(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns: (document_index, feature_index) of every n-gram occurrence,
+        ordered by n-gram length, then document
+        """
+        normalized = [normalize_text(text[:self.max_chars]) for text in texts]
+        lengths = np.array([len(text) for text in normalized], dtype=np.int64)
+
+        # "\0" separates documents so n-grams never span two of them
+        codes = np.frombuffer("\0".join(normalized).encode("ascii"), dtype=np.uint8).astype(np.uint32)
+        doc_of_position = np.repeat(np.arange(len(normalized)), lengths + 1)[:len(codes)]
+        separators = np.concatenate([[0], np.cumsum(codes == 0)])
+
+        doc_parts, feature_parts = [], []
+        hashes = codes.copy()
+        for n in range(2, self.ngram_range[1] + 1):
+            # Rolling polynomial hash (uint32 wraps around), extended by one character per n
+            count = len(codes) - n + 1
+            if count <= 0:
+                break
+            hashes = hashes[:count] * _HASH_PRIME + codes[n - 1:n - 1 + count]
+            if n < self.ngram_range[0]:
+                continue
+
+            valid = separators[n:n + count] == separators[:count]
+            # Fibonacci hashing: high bits of the product are well mixed
+            features = ((hashes[valid] + np.uint32(n)) * _FIB_MULTIPLIER) >> np.uint32(32 - self.dim_bits)
+            doc_parts.append(doc_of_position[:count][valid])
+            feature_parts.append(features.astype(np.int64))
+
+        if not doc_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(doc_parts), np.concatenate(feature_parts)
+
+    def transform(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        IDF-weighted n-gram occurrences, scaled so every document vector has unit norm
+        (x_f = count_f * idf_f / ||sqrt(count) * idf||, no per-document sort needed)
+        Returns: (rows, cols, values) - one entry per n-gram occurrence
+        """
+        rows, cols = self._hashed_ngrams(texts)
+        values = self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(texts)))
+        values = values / np.maximum(norms[rows], 1e-12)
+        return rows, cols, values.astype(np.float32)
+
+    # Inference
+
+    def _logits(self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray, n_docs: int) -> np.ndarray:
+        """
+        Sparse-dense product: per class, gather weights of all occurrences (the
+        class row fits in CPU cache) and sum runs of the same document
+        """
+        run_starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        run_docs = rows[run_starts]
+
+        logits = np.tile(self.bias, (n_docs, 1))
+        for c in range(len(self.labels)):
+            run_sums = np.add.reduceat(self.weights[c][cols] * values, run_starts) if len(rows) else []
+            np.add.at(logits[:, c], run_docs, run_sums)
+        return logits
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Class probabilities, shape (len(texts), len(labels))
+        """
+        rows, cols, values = self.transform(texts)
+        return _softmax(self._logits(rows, cols, values, len(texts)))
+
+    def rank(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Labels of one text with probabilities, best first
+        """
+        probabilities = self.predict_proba([text])[0]
+        order = np.argsort(-probabilities)
+        return [(self.labels[i], float(probabilities[i])) for i in order]
+
+    # Training
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 150,
+            learning_rate: float = 0.05, l2: float = 1e-5) -> "NgramTextClassifier":
+        """
+        Fit IDF and softmax weights (full-batch Adam)
+        """
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        targets = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        targets[np.arange(len(texts)), [label_index[label] for label in labels]] = 1.0
+
+        rows, cols = self._hashed_ngrams(texts)
+        document_frequency = np.bincount(np.unique(rows * self.dim + cols) % self.dim, minlength=self.dim)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        rows, cols, values = self.transform(texts)
+
+        # Train on the columns that occur in the data only, scatter back at the end
+        active, compact_cols = np.unique(cols, return_inverse=True)
+        weights = np.zeros((len(self.labels), len(active)), dtype=np.float32)
+        bias = np.zeros(len(self.labels), dtype=np.float32)
+        moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+        beta1, beta2 = 0.9, 0.999
+
+        for step in range(1, epochs + 1):
+            self.weights[:, active] = weights
+            self.bias = bias
+            errors = (_softmax(self._logits(rows, cols, values, len(texts))) - targets) / len(texts)
+
+            grad_weights = np.empty_like(weights)
+            for c in range(len(self.labels)):
+                grad_weights[c] = np.bincount(compact_cols, weights=values * errors[rows, c], minlength=len(active))
+            grad_weights += l2 * weights
+            grad_bias = errors.sum(axis=0)
+
+            for param, grad, m, v in ((weights, grad_weights, moments[0], moments[1]),
+                                      (bias, grad_bias, moments[2], moments[3])):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad ** 2
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+
+        self.weights[:, active] = weights
+        self.bias = bias
+
+        accuracy = float((self.predict_proba(texts).argmax(axis=1) == targets.argmax(axis=1)).mean())
+        logger.info(f"Trained text classifier on {len(texts)} texts, {len(self.labels)} labels, train accuracy {accuracy:.3f}")
+        return self
+
+    # Serialization
+
+    def save(self, path: str):
+        """
+        Store only feature columns with non-zero weights (float16)
+        """
+        used = np.flatnonzero(np.abs(self.weights).max(axis=0) > 0)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            dim_bits=self.dim_bits,
+            ngram_range=np.array(self.ngram_range),
+            max_chars=self.max_chars,
+            columns=used.astype(np.int32),
+            weights=self.weights[:, used].astype(np.float16),
+            idf=self.idf[used].astype(np.float16),
+            bias=self.bias,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NgramTextClassifier":
+        with np.load(path) as data:
+            model = cls(
+                labels=[str(label) for label in data["labels"]],
+                dim_bits=int(data["dim_bits"]),
+                ngram_range=tuple(int(n) for n in data["ngram_range"]),
+                max_chars=int(data["max_chars"]),
+            )
+            columns = data["columns"]
+            model.weights[:, columns] = data["weights"].astype(np.float32)
+            # Unseen n-grams have zero weight, their IDF only affects normalization
+            model.idf[:] = float(data["idf"].max()) if len(columns) else 1.0
+            model.idf[columns] = data["idf"].astype(np.float32)
+            model.bias = data["bias"].astype(np.float32)
+        return model
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_training_texts(directory: str) -> Tuple[List[str], List[str]]:
+    """
+    Read <directory>/<DOCUMENT_TYPE_VALUE>/*.txt
+    Returns: (texts, labels)
+    """
+    valid_labels = {doc_type.value for doc_type in DocumentType}
+    texts, labels = [], []
+
+    for label_dir in sorted(Path(directory).iterdir()):
+        if not label_dir.is_dir():
+            continue
+        if label_dir.name not in valid_labels:
+            logger.warning(f"Skipping {label_dir}: not a document type")
+            continue
+        for text_file in sorted(label_dir.glob("*.txt")):
+            texts.append(text_file.read_text(encoding="utf-8"))
+            labels.append(label_dir.name)
+
+    return texts, labels
+
+
+def load_text_classifier() -> Optional[NgramTextClassifier]:
+    """
+    Load the trained model configured in TEXT_MODEL_PATH (None if disabled or missing)
+    """
+    if not settings.TEXT_MODEL_ENABLED:
+        return None
+
+    path = Path(settings.TEXT_MODEL_PATH)
+    if not path.exists():
+        logger.info(f"Text classifier model not found at {path} - local tier uses keyword rules")
+        return None
+
+    start_time = time.time()
+    try:
+        model = NgramTextClassifier.load(str(path))
+    except Exception as e:
+        logger.error(f"Failed to load text classifier from {path}: {e}")
+        return None
+
+    logger.info(f"Text classifier loaded from {path} in {(time.time() - start_time) * 1000:.0f} ms ({len(model.labels)} labels)")
+    return model
+
+
+def _main(argv: List[str]):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if len(argv) == 3 and argv[0] == "train":
+        texts, labels = load_training_texts(argv[1])
+        model = NgramTextClassifier(labels=sorted(set(labels))).fit(texts, labels)
+        model.save(argv[2])
+        print(f"Saved model to {argv[2]} ({Path(argv[2]).stat().st_size / 1024:.0f} KB)")
+
+    elif len(argv) == 3 and argv[0] == "bench":
+        model = NgramTextClassifier.load(argv[1])
+        texts, labels = load_training_texts(argv[2])
+        batch = (texts * (1000 // max(len(texts), 1) + 1))[:1000]
+
+        start_time = time.perf_counter()
+        probabilities = model.predict_proba(batch)
+        elapsed = time.perf_counter() - start_time
+
+        predicted = [model.labels[i] for i in probabilities[:len(texts)].argmax(axis=1)]
+        accuracy = sum(p == label for p, label in zip(predicted, labels)) / max(len(labels), 1)
+        print(f"{len(batch)} texts in {elapsed * 1000:.0f} ms ({elapsed / len(batch) * 1e6:.0f} µs/text), accuracy {accuracy:.3f}")
+
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
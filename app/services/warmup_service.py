@@ -0,0 +1,121 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Component states reported by /ready
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+UNAVAILABLE = "unavailable"
+FAILED = "failed"
+
+
+class ModelWarmup:
+    """
+    Startup timings and model readiness.
+
+    Nothing heavy is loaded at import time: the API process starts serving
+    (/health) right away and models are loaded in the background after startup
+    (MODEL_WARMUP=True) or on first use (MODEL_WARMUP=False). /ready answers 503
+    until every required component is loaded, so traffic is routed only to
+    processes that can classify without a multi-second cold start.
+    """
+
+    def __init__(self):
+        self._steps: Dict[str, float] = {}
+        self._components: Dict[str, Dict] = {}
+        self._loaders: Dict[str, Callable[[], Awaitable[Optional[Dict]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = time.time()
+
+    def record(self, name: str, seconds: float):
+        self._steps[name] = round(seconds, 3)
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Time one startup step
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - start_time)
+
+    def register(self, name: str, loader: Callable[[], Awaitable[Optional[Dict]]], required: bool = True):
+        """
+        Register a model to load during warmup. The loader returns details for
+        /ready, or {"available": False} for an optional service that is down.
+        """
+        self._loaders[name] = loader
+        self._components[name] = {"state": NOT_LOADED, "required": required, "seconds": None, "error": None}
+
+    def start(self):
+        """
+        Load all registered components in the background (API startup)
+        """
+        if not settings.MODEL_WARMUP or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        start_time = time.time()
+        await asyncio.gather(*[self._load(name) for name in self._loaders])
+        self.record("warmup", time.time() - start_time)
+        logger.info(f"🔥 Warmup finished in {time.time() - start_time:.1f}s: {self.timings()}")
+
+    async def _load(self, name: str):
+        component = self._components[name]
+        component["state"] = LOADING
+        start_time = time.time()
+        try:
+            details = await self._loaders[name]() or {}
+            component["state"] = UNAVAILABLE if details.get("available") is False else READY
+            component.update(details)
+        except Exception as e:
+            logger.error(f"Warmup of {name} failed: {str(e)}")
+            component["state"] = FAILED
+            component["error"] = str(e)
+        component["seconds"] = round(time.time() - start_time, 3)
+
+    def is_ready(self) -> bool:
+        """
+        All required components loaded; with MODEL_WARMUP=False models load on
+        first use and the process is ready as soon as it started
+        """
+        if not settings.MODEL_WARMUP:
+            return True
+        return all(c["state"] == READY for c in self._components.values() if c["required"])
+
+    def timings(self) -> Dict[str, float]:
+        timings = dict(self._steps)
+        for name, component in self._components.items():
+            if component["seconds"] is not None:
+                timings[f"load_{name}"] = component["seconds"]
+        return timings
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.is_ready(),
+            "uptime_seconds": round(time.time() - self._started_at, 1),
+            "startup_seconds": self.timings(),
+            "components": {name: dict(component) for name, component in self._components.items()},
+        }
+
+
+# Singleton instance
+model_warmup = ModelWarmup()
@@ -0,0 +1,210 @@
+import time
+import logging
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessor:
+    """
+    Cheap image transformations applied before OCR.
+
+    Every step can be switched off and is timed, so the speed/accuracy trade-off
+    can be measured (see benchmarks/bench_preprocessing.py):
+    - grayscale: drop color channels
+    - crop_margins: cut empty borders around the content
+    - deskew: straighten slightly rotated scans
+    - downscale: shrink so that typical text height is close to target_text_height
+      (EasyOCR gains nothing from 4000x3000 phone photos, it only gets slower)
+    """
+
+    def __init__(
+        self,
+        grayscale: bool = True,
+        crop_margins: bool = False,
+        deskew: bool = False,
+        downscale: bool = True,
+        target_text_height: int = 32,
+        max_side: int = 2560,
+    ):
+        self.grayscale = grayscale
+        self.crop_margins = crop_margins
+        self.deskew = deskew
+        self.downscale = downscale
+        self.target_text_height = target_text_height
+        self.max_side = max_side
+
+    @classmethod
+    def from_settings(cls) -> "ImagePreprocessor":
+        return cls(
+            grayscale=settings.OCR_PREPROCESS_GRAYSCALE,
+            crop_margins=settings.OCR_PREPROCESS_CROP_MARGINS,
+            deskew=settings.OCR_PREPROCESS_DESKEW,
+            downscale=settings.OCR_PREPROCESS_DOWNSCALE,
+            target_text_height=settings.OCR_TARGET_TEXT_HEIGHT,
+            max_side=settings.OCR_MAX_IMAGE_SIDE,
+        )
+
+    def fingerprint(self) -> Dict:
+        """
+        Settings that change the OCR output (part of the OCR cache key)
+        """
+        return {
+            "grayscale": self.grayscale,
+            "crop_margins": self.crop_margins,
+            "deskew": self.deskew,
+            "downscale": self.downscale,
+            "target_text_height": self.target_text_height,
+            "max_side": self.max_side,
+        }
+
+    def process(self, image_np: np.ndarray) -> Tuple[np.ndarray, Dict[str, float]]:
+        """
+        Apply enabled steps in order
+        Returns: (processed_image, step_timings_ms)
+        """
+        timings = {}
+
+        if image_np.ndim == 3 and image_np.shape[2] == 4:
+            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
+
+        # Grayscale first - every later step is cheaper on a single channel
+        if self.grayscale:
+            image_np = self._timed(timings, "grayscale", to_grayscale, image_np)
+
+        if self.crop_margins:
+            image_np = self._timed(timings, "crop_margins", crop_margins, image_np)
+
+        if self.deskew:
+            image_np = self._timed(timings, "deskew", deskew, image_np)
+
+        if self.downscale:
+            image_np = self._timed(
+                timings, "downscale", downscale, image_np, self.target_text_height, self.max_side
+            )
+
+        return image_np, timings
+
+    @staticmethod
+    def _timed(timings: Dict[str, float], name: str, step, image_np: np.ndarray, *args) -> np.ndarray:
+        start_time = time.perf_counter()
+        result = step(image_np, *args)
+        timings[name] = (time.perf_counter() - start_time) * 1000
+        return result
+
+
+def to_grayscale(image_np: np.ndarray) -> np.ndarray:
+    if image_np.ndim == 2:
+        return image_np
+    return cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+
+
+def _text_mask(image_np: np.ndarray) -> np.ndarray:
+    """
+    Binary mask of dark (ink) pixels, Otsu threshold
+    """
+    gray = to_grayscale(image_np)
+    if gray.dtype != np.uint8:
+        gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return mask
+
+
+def estimate_text_height(image_np: np.ndarray) -> Optional[float]:
+    """
+    Median height of character-like connected components, None when the image
+    does not contain enough of them (photos, blank pages)
+    """
+    mask = _text_mask(image_np)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    max_height = image_np.shape[0] * 0.1
+    char_like = heights[(heights >= 4) & (heights <= max_height) & (widths >= 2) & (widths <= heights * 4)]
+
+    if len(char_like) < 10:
+        return None
+    return float(np.median(char_like))
+
+
+def downscale(image_np: np.ndarray, target_text_height: int, max_side: int) -> np.ndarray:
+    """
+    Shrink image so that text is about target_text_height pixels tall and the
+    longer side does not exceed max_side. Never upscales.
+    """
+    height, width = image_np.shape[:2]
+    scale = 1.0
+
+    text_height = estimate_text_height(image_np)
+    if text_height and text_height > target_text_height:
+        scale = target_text_height / text_height
+
+    if max(height, width) * scale > max_side:
+        scale = max_side / max(height, width)
+
+    if scale >= 0.95:
+        return image_np
+
+    new_size = (max(int(width * scale), 1), max(int(height * scale), 1))
+    logger.debug(f"Downscaling image {width}x{height} -> {new_size[0]}x{new_size[1]}")
+    return cv2.resize(image_np, new_size, interpolation=cv2.INTER_AREA)
+
+
+def crop_margins(image_np: np.ndarray, padding: int = 10) -> np.ndarray:
+    """
+    Cut empty borders around the content (keeps a small padding)
+    """
+    mask = _text_mask(image_np)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return image_np
+
+    x, y, w, h = cv2.boundingRect(points)
+    y0, y1 = max(y - padding, 0), min(y + h + padding, image_np.shape[0])
+    x0, x1 = max(x - padding, 0), min(x + w + padding, image_np.shape[1])
+    return image_np[y0:y1, x0:x1]
+
+
+def estimate_skew_angle(image_np: np.ndarray) -> float:
+    """
+    Estimate page rotation in degrees from the minimum-area rectangle around the ink
+    (estimated on a downscaled copy, which is accurate enough and much faster)
+    """
+    mask = _text_mask(image_np)
+    scale = 1000 / max(mask.shape)
+    if scale < 1:
+        mask = cv2.resize(mask, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+    points = cv2.findNonZero(mask)
+    if points is None or len(points) < 50:
+        return 0.0
+
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports angles in [0, 90) (>= 4.5) or [-90, 0) (older); normalize to [-45, 45)
+    if angle >= 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return float(angle)
+
+
+def deskew(image_np: np.ndarray, min_angle: float = 0.3, max_angle: float = 15.0) -> np.ndarray:
+    """
+    Rotate the page so text lines are horizontal. Angles outside
+    [min_angle, max_angle] are ignored (straight pages, or unreliable estimates).
+    """
+    angle = estimate_skew_angle(image_np)
+    if abs(angle) < min_angle or abs(angle) > max_angle:
+        return image_np
+
+    height, width = image_np.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    border = 255 if image_np.ndim == 2 else (255, 255, 255)
+    return cv2.warpAffine(
+        image_np, matrix, (width, height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=border
+    )
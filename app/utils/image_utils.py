@@ -0,0 +1,30 @@
+import numpy as np
+from typing import List
+
+
+def to_rgb(image_np: np.ndarray) -> np.ndarray:
+    """
+    Convert grayscale / RGBA arrays to 3-channel RGB
+    """
+    if image_np.ndim == 2:
+        return np.stack([image_np] * 3, axis=-1)
+    if image_np.shape[2] == 4:
+        return image_np[:, :, :3]
+    return image_np
+
+
+def pad_to_common_shape(images: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Pad images with white to the largest height and width in the group
+    (batched detection requires identically shaped inputs)
+    """
+    images = [to_rgb(image_np) for image_np in images]
+    height = max(image_np.shape[0] for image_np in images)
+    width = max(image_np.shape[1] for image_np in images)
+
+    padded = []
+    for image_np in images:
+        canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+        canvas[:image_np.shape[0], :image_np.shape[1]] = image_np
+        padded.append(canvas)
+    return padded
@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+# Characters EasyOCR commonly confuses inside words (only applied to keywords of
+# OCR_TOLERANT_MIN_LENGTH+ characters - short codes like "pt" must match exactly)
+OCR_CONFUSIONS = {
+    "o": "o0",
+    "l": "l1i|",
+    "i": "i1l|",
+    "s": "s5",
+    "z": "z2",
+    "b": "b8",
+}
+OCR_TOLERANT_MIN_LENGTH = 5
+# Keywords up to this many characters need a word boundary on both sides
+SHORT_KEYWORD_LENGTH = 3
+
+_LEFT_BOUNDARY = r"(?<![a-z0-9])"
+_RIGHT_BOUNDARY = r"(?![a-z0-9])"
+_END = object()
+_POLISH_LETTERS = list(zip("ąćęłńóśźż", "acelnoszz"))
+_SPAN_CACHE_SIZE = 10000
+
+
+def fold_text(text: str) -> str:
+    """
+    Lowercase and strip diacritics (Polish letters via str.replace, which is much
+    faster than per-character unicodedata; anything else left goes through NFKD)
+    """
+    text = text.lower()
+    for letter, plain in _POLISH_LETTERS:
+        if letter in text:
+            text = text.replace(letter, plain)
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+class KeywordMatcher:
+    """
+    All classification keywords compiled into one regex, matched in a single pass.
+
+    - text and keywords are diacritic-folded, so "zaswiadczenie" matches "zaświadczenie"
+    - short keywords ("pt", "rh", "a+") need word boundaries on both sides,
+      longer ones only on the left (Polish inflection: "przeciwciała", "kardiologiczny")
+    - longer keywords tolerate common OCR confusions (0/o, 1/l, 5/s) and any
+      whitespace/line break between words
+    - a keyword found inside a longer matched keyword ("hbs" in "anti-hbs") is counted too
+    """
+
+    def __init__(self, rules: Dict[Hashable, Sequence[str]]):
+        self.rules = {key: list(keywords) for key, keywords in rules.items()}
+
+        self.keywords: List[str] = list(dict.fromkeys(kw for keywords in self.rules.values() for kw in keywords))
+        tokens = {kw: self._keyword_tokens(kw) for kw in self.keywords}
+        self._patterns = {
+            kw: re.compile(_LEFT_BOUNDARY + "".join(parts) + (_RIGHT_BOUNDARY if boundary else ""))
+            for kw, (parts, boundary) in tokens.items()
+        }
+
+        # One regex shaped like a trie of all keywords: shared prefixes are tried once,
+        # so the cost per text position does not grow with the number of keywords
+        trie: dict = {}
+        for parts, boundary in tokens.values():
+            node = trie
+            for part in parts:
+                node = node.setdefault(part, {})
+            node[_END] = node.get(_END, True) and boundary
+        self._regex = re.compile(_LEFT_BOUNDARY + "(?:" + self._trie_pattern(trie) + ")")
+
+        # Matched text -> keywords it contains (spans repeat a lot in real documents)
+        self._span_keywords: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def _keyword_tokens(keyword: str) -> Tuple[List[str], bool]:
+        """
+        Returns: (regex fragment per character, needs right word boundary)
+        """
+        folded = fold_text(keyword)
+        tolerant = len(folded) >= OCR_TOLERANT_MIN_LENGTH
+
+        parts = []
+        for position, char in enumerate(folded):
+            if char == " ":
+                parts.append(r"\s+")
+            elif char == "-" and 0 < position < len(folded) - 1:
+                parts.append(r"[-\s]?")
+            elif tolerant and char in OCR_CONFUSIONS:
+                parts.append(f"[{re.escape(OCR_CONFUSIONS[char])}]")
+            else:
+                parts.append(re.escape(char))
+
+        return parts, len(folded) <= SHORT_KEYWORD_LENGTH and folded[-1].isalnum()
+
+    @classmethod
+    def _trie_pattern(cls, node: dict) -> str:
+        branches = [part + cls._trie_pattern(child) for part, child in node.items() if part is not _END]
+        if not branches:
+            return _RIGHT_BOUNDARY if node[_END] else ""
+
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if _END in node:
+            # Prefer the longer keyword, fall back to the one ending here
+            return "(?:" + body + "|" + (_RIGHT_BOUNDARY if node[_END] else "") + ")"
+        return body
+
+    def find(self, text: str) -> set:
+        """
+        Set of keywords present in text
+        """
+        found = set()
+        for match in self._regex.finditer(fold_text(text)):
+            span = match.group()
+            keywords = self._span_keywords.get(span)
+            if keywords is None:
+                # Also covers keywords inside a longer match ("hbs" in "anti-hbs")
+                keywords = [kw for kw, pattern in self._patterns.items() if pattern.search(span)]
+                if len(self._span_keywords) < _SPAN_CACHE_SIZE:
+                    self._span_keywords[span] = keywords
+            found.update(keywords)
+        return found
+
+    def match(self, text: str) -> Dict[Hashable, List[str]]:
+        """
+        Keywords found per rule key (in rule order), keys without hits omitted
+        """
+        found = self.find(text)
+        if not found:
+            return {}
+
+        hits = {}
+        for key, keywords in self.rules.items():
+            matched = [kw for kw in keywords if kw in found]
+            if matched:
+                hits[key] = matched
+        return hits
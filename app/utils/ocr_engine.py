@@ -0,0 +1,95 @@
+import os
+import logging
+from typing import Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCREngineConfig:
+    """
+    CPU inference settings of the EasyOCR engine (see benchmarks/bench_ocr_engine.py):
+    - torch_threads: PyTorch intra-op threads of this process; several OCR processes
+      with the default (one thread per core each) oversubscribe the CPU
+    - quantize: dynamic int8 quantization of the detector and recognizer on CPU
+    - paragraph: merge boxes into paragraphs (the classifier does not need it)
+    - rotation_info: extra recognition pass per angle, e.g. [90, 180, 270]
+    - contrast_retry: second recognition pass over low-confidence boxes with
+      adjusted contrast
+    - decoder: greedy | beamsearch | wordbeamsearch
+    """
+
+    def __init__(
+        self,
+        torch_threads: int = 0,
+        quantize: bool = True,
+        paragraph: bool = False,
+        rotation_info: Optional[List[int]] = None,
+        contrast_retry: bool = True,
+        decoder: str = "greedy",
+    ):
+        self.torch_threads = torch_threads
+        self.quantize = quantize
+        self.paragraph = paragraph
+        self.rotation_info = rotation_info or None
+        self.contrast_retry = contrast_retry
+        self.decoder = decoder
+
+    @classmethod
+    def from_settings(cls) -> "OCREngineConfig":
+        rotation_info = [int(angle) for angle in settings.OCR_ROTATION_INFO.split(",") if angle.strip()]
+        return cls(
+            torch_threads=settings.OCR_TORCH_THREADS or default_torch_threads(),
+            quantize=settings.OCR_QUANTIZE,
+            paragraph=settings.OCR_PARAGRAPH,
+            rotation_info=rotation_info,
+            contrast_retry=settings.OCR_CONTRAST_RETRY,
+            decoder=settings.OCR_DECODER,
+        )
+
+    def fingerprint(self) -> Dict:
+        """
+        Settings that change the OCR output (part of the OCR cache key)
+        """
+        return {
+            "quantize": self.quantize,
+            "paragraph": self.paragraph,
+            "rotation_info": self.rotation_info,
+            "contrast_retry": self.contrast_retry,
+            "decoder": self.decoder,
+        }
+
+    def reader_kwargs(self) -> Dict:
+        return {"quantize": self.quantize}
+
+    def readtext_kwargs(self) -> Dict:
+        return {
+            "paragraph": self.paragraph,
+            "rotation_info": self.rotation_info,
+            # Boxes recognized with confidence below contrast_ths get a second pass
+            "contrast_ths": 0.1 if self.contrast_retry else 0.0,
+            "decoder": self.decoder,
+        }
+
+    def apply_threads(self):
+        """
+        Set the PyTorch intra-op thread count of this process
+        """
+        if self.torch_threads <= 0:
+            return
+        import torch
+        torch.set_num_threads(self.torch_threads)
+        logger.info(f"PyTorch intra-op threads: {self.torch_threads}")
+
+
+def default_torch_threads() -> int:
+    """
+    Cores divided among all OCR processes on the machine: the OCR server workers
+    shared by every API process, or WEB_CONCURRENCY uvicorn workers each running
+    OCR_WORKERS processes (or the single OCR thread)
+    """
+    if settings.OCR_SERVER_SOCKET:
+        processes = settings.OCR_SERVER_WORKERS
+    else:
+        processes = max(settings.WEB_CONCURRENCY, 1) * max(settings.OCR_WORKERS, 1)
+    return max(1, (os.cpu_count() or 1) // processes)
@@ -0,0 +1,131 @@
+import logging
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Tuple
+from PIL import Image
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+POLISH_CHARS = set("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ°µ–—„”’")
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+
+def is_pdf(file_path: str) -> bool:
+    return Path(file_path).suffix.lower() == '.pdf'
+
+
+def get_page_count(file_path: str) -> int:
+    """
+    Number of pages of a document (images always have one page)
+    """
+    return get_pdf_page_count(file_path) if is_pdf(file_path) else 1
+
+
+def ensure_pdf_support():
+    if not PDF_SUPPORT:
+        raise RuntimeError("PDF support not available. Install pdf2image: pip install pdf2image")
+
+
+def get_pdf_page_count(pdf_path: str) -> int:
+    """
+    Read number of pages from PDF metadata (without rasterizing anything)
+    """
+    ensure_pdf_support()
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def render_pdf_page(pdf_path: str, page_number: int, dpi: int = None) -> Image.Image:
+    """
+    Rasterize a single PDF page (1-based) so that only one page is held in memory
+    """
+    ensure_pdf_support()
+    images = convert_from_path(
+        pdf_path,
+        dpi=dpi or settings.OCR_PDF_DPI,
+        first_page=page_number,
+        last_page=page_number
+    )
+    return images[0]
+
+
+def get_pdf_text_layers(pdf_path: str) -> List[Optional[List[str]]]:
+    """
+    Read embedded text layer of every page with poppler's pdftotext (one call for
+    the whole document). Pages whose text layer is empty or looks like garbage
+    (scans, broken font encodings) are returned as None and need OCR.
+    Returns: list with one entry per page - list_of_lines or None
+    """
+    if not settings.PDF_TEXT_LAYER_ENABLED:
+        return []
+
+    try:
+        completed = subprocess.run(
+            ["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True,
+            timeout=30,
+            check=True
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not read PDF text layer of {pdf_path}: {e}")
+        return []
+
+    # Pages are separated by form feed; pdftotext terminates the last page with one too
+    pages = completed.stdout.decode("utf-8", errors="replace").split("\f")
+    if pages and not pages[-1].strip():
+        pages = pages[:-1]
+
+    layers = []
+    for page_text in pages:
+        if is_usable_text_layer(page_text):
+            layers.append([line.strip() for line in page_text.splitlines() if line.strip()])
+        else:
+            layers.append(None)
+
+    usable = sum(layer is not None for layer in layers)
+    logger.info(f"📝 PDF text layer usable on {usable}/{len(layers)} page(s)")
+    return layers
+
+
+def is_usable_text_layer(text: str) -> bool:
+    """
+    Heuristic check that extracted text is real text and not OCR-worthy garbage
+    """
+    chars = ''.join(text.split())
+    if len(chars) < settings.PDF_TEXT_LAYER_MIN_CHARS:
+        return False
+
+    letters = sum(ch.isalpha() for ch in chars)
+    alnum = sum(ch.isalnum() for ch in chars)
+    # Latin script incl. Polish diacritics - broken font encodings produce other symbols
+    latin = sum(ch.isascii() or ch in POLISH_CHARS for ch in chars)
+
+    return (
+        alnum / len(chars) >= 0.5
+        and letters / len(chars) >= 0.3
+        and latin / len(chars) >= 0.9
+    )
+
+
+def merge_pages(pages: List[List[str]]) -> Tuple[str, List[str]]:
+    """
+    Reassemble per-page OCR results (already in page order) into one document
+    Returns: (full_text, list_of_lines)
+    """
+    all_text_segments = []
+    full_text_parts = []
+
+    for results in pages:
+        if results:
+            full_text_parts.append(' '.join(results))
+            all_text_segments.extend(results)
+
+    full_text = ' '.join(full_text_parts)
+    logger.info(f"✅ Total extracted {len(all_text_segments)} text segments from {len(pages)} page(s)")
+
+    return full_text, all_text_segments
@@ -0,0 +1,38 @@
+from statistics import median
+from typing import List, Tuple
+
+# Text box as (x_min, y_min, x_max, y_max) in pixels
+Box = Tuple[int, int, int, int]
+
+
+def title_scores(boxes: List[Box], image_height: int) -> List[float]:
+    """
+    How title-like every box is: text larger than the page's typical line height
+    and close to the top of the page scores high, small print and table cells
+    further down score low
+    """
+    if not boxes:
+        return []
+    typical_height = median(max(y_max - y_min, 1) for _, y_min, _, y_max in boxes)
+
+    scores = []
+    for _, y_min, _, y_max in boxes:
+        relative_height = max(y_max - y_min, 1) / typical_height
+        relative_position = (y_min + y_max) / 2 / max(image_height, 1)
+        scores.append(relative_height * (2.0 - relative_position))
+    return scores
+
+
+def select_title_boxes(boxes: List[Box], image_height: int, top_k: int) -> Tuple[List[int], List[int]]:
+    """
+    Split box indices into the top_k most title-like boxes and the rest
+    Returns: (selected, rest), both in reading order
+    """
+    scores = title_scores(boxes, image_height)
+    ranked = sorted(range(len(boxes)), key=lambda i: (-scores[i], boxes[i][1], boxes[i][0]))
+    selected = set(ranked[:max(top_k, 0)])
+
+    def reading_order(indices):
+        return sorted(indices, key=lambda i: (boxes[i][1], boxes[i][0]))
+
+    return reading_order(selected), reading_order(set(range(len(boxes))) - selected)
@@ -0,0 +1,102 @@
+from typing import Callable, Dict, List, Tuple
+
+# Rough size of a Polish OCR text in LLM tokens (llama-family tokenizers)
+CHARS_PER_TOKEN = 3.5
+# OCR text arrives as one line, so spans are fixed windows of words
+SEGMENT_WORDS = 12
+MAX_WORD_LENGTH = 40
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def is_noise_token(token: str) -> bool:
+    """
+    OCR debris: no letters/digits at all ("|", "—", "...."), mostly symbols ("#%&a")
+    or implausibly long runs of glued characters
+    """
+    alnum = sum(c.isalnum() for c in token)
+    if alnum == 0:
+        return True
+    if len(token) >= 4 and alnum / len(token) < 0.5:
+        return True
+    return len(token) > MAX_WORD_LENGTH
+
+
+def clean_ocr_text(text: str) -> str:
+    """
+    Collapse whitespace and drop noise tokens
+    """
+    return " ".join(token for token in text.split() if not is_noise_token(token))
+
+
+def select_salient_text(
+    text: str,
+    token_budget: int,
+    head_tokens: int,
+    score: Callable[[str], int]
+) -> Tuple[str, Dict]:
+    """
+    Fit OCR text into token_budget: keep the beginning of the document (header,
+    title, lab name) up to head_tokens, then the spans with the highest score
+    (e.g. number of classification keywords), then the following spans in order.
+    Kept spans stay in document order, gaps are marked with "…".
+    Returns: (selected_text, metadata)
+    """
+    cleaned = clean_ocr_text(text)
+    metadata = {
+        "llm_tokens_original": estimate_tokens(text),
+        "llm_tokens_sent": estimate_tokens(cleaned),
+        "llm_text_truncated": False,
+    }
+    if token_budget <= 0 or metadata["llm_tokens_sent"] <= token_budget:
+        return cleaned, metadata
+
+    words = cleaned.split(" ")
+    segments = [" ".join(words[i:i + SEGMENT_WORDS]) for i in range(0, len(words), SEGMENT_WORDS)]
+    costs = [estimate_tokens(segment) for segment in segments]
+
+    chosen = set()
+    used = 0
+
+    def take(index: int) -> bool:
+        nonlocal used
+        if index in chosen or used + costs[index] > token_budget:
+            return False
+        chosen.add(index)
+        used += costs[index]
+        return True
+
+    # 1. Header
+    for i in range(len(segments)):
+        if used + costs[i] > min(head_tokens, token_budget) or not take(i):
+            break
+
+    # 2. Most informative spans
+    scores = [(score(segment), i) for i, segment in enumerate(segments) if i not in chosen]
+    salient = sorted((item for item in scores if item[0] > 0), key=lambda item: (-item[0], item[1]))
+    salient_taken = sum(take(i) for _, i in salient)
+
+    # 3. Rest of the budget in document order
+    for i in range(len(segments)):
+        take(i)
+
+    parts: List[str] = []
+    previous = -1
+    for i in sorted(chosen):
+        if previous >= 0 and i != previous + 1:
+            parts.append("…")
+        parts.append(segments[i])
+        previous = i
+    if previous != len(segments) - 1:
+        parts.append("…")
+
+    selected = " ".join(parts)
+    metadata.update({
+        "llm_tokens_sent": estimate_tokens(selected),
+        "llm_text_truncated": True,
+        "llm_segments_salient": salient_taken,
+        "llm_segments_total": len(segments),
+    })
+    return selected, metadata
@@ -0,0 +1,51 @@
+"""
+Celery worker for asynchronous classification jobs (JOB_QUEUE_BACKEND=celery)
+
+Run with:
+    celery -A app.worker.celery_app worker --loglevel=info --concurrency=2
+
+Each worker process loads its own OCR reader and talks to Ollama, so OCR
+capacity scales by adding worker containers/machines independently of the API.
+Workers need access to UPLOAD_DIR / PROCESSED_DIR (shared volume).
+"""
+import logging
+from celery import Celery
+from app.config import settings
+from app.services.job_service import process_merged_document_job, retry_delay
+from app.services.llm_classifier_service import llm_classifier_service
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery("document_classify", broker=settings.REDIS_URL)
+celery_app.conf.update(
+    task_default_queue=settings.JOB_QUEUE_NAME,
+    task_serializer="json",
+    accept_content=["json"],
+    # Acknowledge only after the task finished, so a job whose worker died is redelivered
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # OCR jobs are long - do not let one worker reserve jobs others could run
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+    broker_connection_retry_on_startup=True,
+)
+
+
+@celery_app.task(bind=True, name="classify_merged_document", max_retries=settings.JOB_MAX_RETRIES)
+def classify_merged_document_task(self, job_id: str, element_id: str, recipe_id: str, files_data: list):
+    """
+    Classify merged document, retried with exponential backoff on failure
+    """
+    attempt = self.request.retries + 1
+    final_attempt = self.request.retries >= self.max_retries
+
+    try:
+        # One event loop per task: its Ollama client is closed with it
+        llm_classifier_service.run_sync(
+            process_merged_document_job(job_id, element_id, recipe_id, files_data, attempt, final_attempt)
+        )
+    except Exception as e:
+        if final_attempt:
+            logger.error(f"Job {job_id} failed after {attempt} attempt(s)")
+            return
+        raise self.retry(exc=e, countdown=retry_delay(attempt))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Total LLM time of a 6-document completeness check: one prompt per document
+vs. short documents packed into shared prompts (LLM_BATCH_PACKING).
+
+Runs against a live Ollama with the model already pulled; the classification
+cache is disabled so every run really calls the model.
+
+Usage: python benchmarks/bench_batch_packing.py [repetitions]
+"""
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, '.')
+
+from app.config import settings
+from app.services.classification_cache_service import classification_cache
+from app.services.llm_classifier_service import LLMClassifierService
+from bench_prompt_prefix import TEXTS
+
+
+async def run(repetitions: int):
+    classification_cache.enabled = False
+    service = LLMClassifierService()
+    if not await service.is_available():
+        print(f"Ollama not available at {settings.OLLAMA_URL}")
+        return
+
+    for mode in ("single", "packed"):
+        elapsed, types = 0.0, None
+        for _ in range(repetitions):
+            start_time = time.perf_counter()
+            if mode == "single":
+                results = [await service.classify_async(text) for text in TEXTS]
+            else:
+                results = await service.classify_many_async(TEXTS)
+            elapsed += time.perf_counter() - start_time
+            types = [document_type.value if document_type else None for document_type, _, _ in results]
+        print(f"{mode:<7} {elapsed / repetitions:7.1f}s per {len(TEXTS)} documents  {types}")
+
+    print(f"stats: {service.stats()}")
+    await service.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compiled keyword matcher vs. per-keyword substring scan on long documents.
+
+Without arguments a synthetic multi-page discharge card (karta informacyjna)
+is used; pass text files (e.g. OCR output of real discharge cards) to use them.
+
+Usage: python benchmarks/bench_keyword_matcher.py [text_file ...]
+"""
+import sys
+import time
+import random
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from app.services.classifier_service import DocumentClassifier
+
+PARAGRAPHS = [
+    "Karta informacyjna leczenia szpitalnego. Oddział Chorób Wewnętrznych.",
+    "Rozpoznanie: nadciśnienie tętnicze, cukrzyca typu 2, przewlekła choroba nerek.",
+    "Pacjent przyjęty z powodu duszności i obrzęków kończyn dolnych.",
+    "Morfologia: WBC 8.2, RBC 4.1, HGB 12.3, hematokryt 38%. Kreatynina 1.4 mg/dl, mocznik 52.",
+    "Na+ 138 mmol/l, K+ 4.9 mmol/l, chlorki 101. Glukoza na czczo 142 mg/dl.",
+    "EKG: rytm zatokowy miarowy 78/min, oś serca pośrednia. RTG klatki piersiowej bez zmian ogniskowych.",
+    "W trakcie pobytu stosowano leczenie diuretyczne, uzyskano poprawę stanu ogólnego.",
+    "Zalecenia: kontrola w poradni kardiologicznej, dieta cukrzycowa, kontrola INR przy leczeniu acenokumarolem.",
+]
+
+
+def legacy_scan(rules, text):
+    text_lower = text.lower()
+    return {
+        doc_type: found
+        for doc_type, keywords in rules.items()
+        if (found := [keyword for keyword in keywords if keyword.lower() in text_lower])
+    }
+
+
+def timed(function, text, repeats):
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        function(text)
+    return (time.perf_counter() - start_time) / repeats * 1000
+
+
+def run(paths):
+    classifier = DocumentClassifier()
+    rules = classifier.classification_rules
+
+    if paths:
+        documents = {Path(p).name: Path(p).read_text(encoding="utf-8") for p in paths}
+    else:
+        rng = random.Random(0)
+        documents = {
+            f"synthetic {pages} page(s)": "\n".join(rng.choice(PARAGRAPHS) for _ in range(pages * 25))
+            for pages in (1, 5, 20)
+        }
+
+    print(f"{'document':<28}{'chars':>9}{'legacy ms':>11}{'compiled ms':>13}{'types legacy/compiled':>24}")
+    for name, text in documents.items():
+        repeats = max(3, 200_000 // max(len(text), 1))
+        legacy_ms = timed(lambda t: legacy_scan(rules, t), text, repeats)
+        compiled_ms = timed(classifier.keyword_matcher.match, text, repeats)
+        legacy_types = len(legacy_scan(rules, text))
+        compiled_types = len(classifier.keyword_matcher.match(text))
+        print(f"{name:<28}{len(text):>9}{legacy_ms:>11.2f}{compiled_ms:>13.2f}{legacy_types:>14}/{compiled_types}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Speed and character accuracy of the OCR backends (OCR_BACKEND).
+
+Every image in a directory is preprocessed once and recognized by each
+available backend with the current settings. Accuracy is measured against
+<image>.txt next to the image when it exists, otherwise against the output of
+the first backend in the list.
+
+Usage: python benchmarks/bench_ocr_backends.py samples/ [easyocr,tesseract]
+"""
+import sys
+import time
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, '.')
+
+from app.config import settings
+from app.services.ocr_backends import create_ocr_backend
+from app.utils.image_preprocessing import ImagePreprocessor
+from ocr_metrics import char_accuracy
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".webp"}
+
+
+def run(directory: str, backend_names: list):
+    files = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not files:
+        print(f"No images found in {directory}")
+        return
+
+    preprocessor = ImagePreprocessor.from_settings()
+    images = [preprocessor.process(np.array(Image.open(path).convert("RGB")))[0] for path in files]
+    ground_truth = [
+        path.with_suffix(".txt").read_text(encoding="utf-8").strip() if path.with_suffix(".txt").exists() else None
+        for path in files
+    ]
+
+    reference = None
+    print(f"\n{'backend':<12} {'load s':>7} {'s/image':>8} {'accuracy':>9}  capabilities")
+    for name in backend_names:
+        settings.OCR_BACKEND = name
+        start_time = time.perf_counter()
+        try:
+            backend = create_ocr_backend()
+        except RuntimeError as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+        load_seconds = time.perf_counter() - start_time
+
+        # Warm up outside the measurement
+        backend.recognize(images[0])
+
+        start_time = time.perf_counter()
+        texts = [" ".join(backend.recognize(image)) for image in images]
+        seconds = time.perf_counter() - start_time
+
+        if reference is None:
+            reference = texts
+        accuracy = sum(
+            char_accuracy(truth if truth is not None else ref, text)
+            for truth, ref, text in zip(ground_truth, reference, texts)
+        ) / len(files)
+        print(f"{name:<12} {load_seconds:>7.1f} {seconds / len(files):>8.2f} {accuracy:>9.3f}  {backend.capabilities()}")
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "samples"
+    names = sys.argv[2].split(",") if len(sys.argv) > 2 else ["easyocr", "tesseract"]
+    run(directory, names)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Throughput and character accuracy of EasyOCR CPU inference settings.
+
+Runs every image in a directory through several OCREngineConfig variants
+(PyTorch thread count, int8 quantization, extra recognition passes) and
+reports seconds per image, recognized characters per second and character
+accuracy (1 - edit distance / reference length).
+
+The reference text of an image is read from <image>.txt next to it when that
+file exists, otherwise the output of the "reference" configuration (no
+quantization, all passes) is used - accuracy is then agreement with the
+slowest, most thorough setting rather than with the ground truth.
+
+Usage: python benchmarks/bench_ocr_engine.py samples/
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, '.')
+
+import easyocr
+from app.config import settings
+from app.utils.image_preprocessing import ImagePreprocessor
+from app.utils.ocr_engine import OCREngineConfig
+from ocr_metrics import char_accuracy
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".webp"}
+CORES = os.cpu_count() or 1
+
+CONFIGS = {
+    "reference": OCREngineConfig(torch_threads=CORES, quantize=False, rotation_info=[90, 180, 270]),
+    "default": OCREngineConfig(torch_threads=CORES),
+    "no_contrast": OCREngineConfig(torch_threads=CORES, contrast_retry=False),
+    "fp32": OCREngineConfig(torch_threads=CORES, quantize=False, contrast_retry=False),
+    "1_thread": OCREngineConfig(torch_threads=1, contrast_retry=False),
+    "half_threads": OCREngineConfig(torch_threads=max(1, CORES // 2), contrast_retry=False),
+}
+
+
+def run(directory: str):
+    files = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not files:
+        print(f"No images found in {directory}")
+        return
+
+    preprocessor = ImagePreprocessor.from_settings()
+    images = [preprocessor.process(np.array(Image.open(path).convert("RGB")))[0] for path in files]
+    ground_truth = {
+        path.name: path.with_suffix(".txt").read_text(encoding="utf-8").strip()
+        for path in files if path.with_suffix(".txt").exists()
+    }
+    print(f"{len(files)} image(s), {len(ground_truth)} with ground truth, {CORES} core(s)")
+
+    readers: Dict[bool, easyocr.Reader] = {}
+    texts: Dict[str, List[str]] = {}
+    totals = {}
+
+    for name, engine in CONFIGS.items():
+        if engine.quantize not in readers:
+            readers[engine.quantize] = easyocr.Reader(
+                settings.ocr_languages_list, gpu=False, verbose=False, **engine.reader_kwargs()
+            )
+        reader = readers[engine.quantize]
+        engine.apply_threads()
+        options = engine.readtext_kwargs()
+
+        # Warm up outside the measurement
+        reader.readtext(images[0], detail=0, **options)
+
+        start_time = time.perf_counter()
+        texts[name] = [" ".join(reader.readtext(image, detail=0, **options)) for image in images]
+        totals[name] = time.perf_counter() - start_time
+
+    print(f"\n{'config':<14} {'s/image':>8} {'chars/s':>9} {'accuracy':>9}")
+    for name in CONFIGS:
+        accuracies = []
+        for path, text, reference_text in zip(files, texts[name], texts["reference"]):
+            accuracies.append(char_accuracy(ground_truth.get(path.name, reference_text), text))
+        chars = sum(len(text) for text in texts[name])
+        print(
+            f"{name:<14} {totals[name] / len(files):>8.2f} {chars / totals[name]:>9.0f} "
+            f"{sum(accuracies) / len(accuracies):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "samples")
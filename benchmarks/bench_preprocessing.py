@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Speed/accuracy trade-off of OCR image preprocessing steps.
+
+Runs EasyOCR on every image in a directory with several preprocessing
+configurations and compares OCR time and text similarity against the
+unprocessed image (baseline).
+
+Usage: python benchmarks/bench_preprocessing.py samples/
+"""
+import sys
+import time
+import difflib
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, '.')
+
+from app.services.ocr_service import ocr_service
+from app.utils.image_preprocessing import ImagePreprocessor
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".webp"}
+
+CONFIGS = {
+    "baseline": ImagePreprocessor(grayscale=False, downscale=False),
+    "grayscale": ImagePreprocessor(grayscale=True, downscale=False),
+    "downscale": ImagePreprocessor(grayscale=True, downscale=True),
+    "deskew": ImagePreprocessor(grayscale=True, downscale=True, deskew=True),
+    "all": ImagePreprocessor(grayscale=True, downscale=True, deskew=True, crop_margins=True),
+}
+
+
+def run(directory: str):
+    files = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    totals = {name: {"preprocess": 0.0, "ocr": 0.0, "similarity": 0.0} for name in CONFIGS}
+
+    for file_path in files:
+        image_np = np.array(Image.open(file_path).convert("RGB"))
+        baseline_text = None
+        print(f"\n{file_path.name} ({image_np.shape[1]}x{image_np.shape[0]})")
+
+        for name, preprocessor in CONFIGS.items():
+            start_time = time.perf_counter()
+            processed, timings = preprocessor.process(image_np)
+            preprocess_seconds = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            text = ' '.join(ocr_service.backend.recognize(processed))
+            ocr_seconds = time.perf_counter() - start_time
+
+            if baseline_text is None:
+                baseline_text = text
+            similarity = difflib.SequenceMatcher(None, baseline_text, text).ratio()
+
+            totals[name]["preprocess"] += preprocess_seconds
+            totals[name]["ocr"] += ocr_seconds
+            totals[name]["similarity"] += similarity
+            steps = ', '.join(f"{step} {ms:.0f}ms" for step, ms in timings.items())
+            print(
+                f"  {name:<10} {processed.shape[1]:>5}x{processed.shape[0]:<5} "
+                f"ocr {ocr_seconds:6.2f}s  similarity {similarity:.3f}  [{steps}]"
+            )
+
+    if not files:
+        print(f"No images found in {directory}")
+        return
+
+    print(f"\n{'='*80}\nAverages over {len(files)} image(s)")
+    for name, total in totals.items():
+        print(
+            f"  {name:<10} preprocess {total['preprocess'] / len(files):6.3f}s  "
+            f"ocr {total['ocr'] / len(files):6.2f}s  similarity {total['similarity'] / len(files):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "samples")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Prompt prefill time with and without reuse of the static prompt prefix.
+
+- no_reuse:     document text first, instructions after it - the instructions
+                are re-evaluated on every request (no common prefix)
+- prefix_reuse: instructions as the system prompt, document text last (what
+                LLMClassifierService sends) - Ollama reuses the cached prefix
+
+Prefill is measured with Ollama's own prompt_eval_count / prompt_eval_duration,
+generating a single token per request. Run it against a CPU-only Ollama with
+the model already pulled:
+
+Usage: python benchmarks/bench_prompt_prefix.py [repetitions]
+"""
+import sys
+import time
+import httpx
+
+sys.path.insert(0, '.')
+
+from app.config import settings
+from app.services.llm_classifier_service import LLMClassifierService
+
+TEXTS = [
+    "Wynik badania: Grupa krwi A RH+ oznaczenie wykonano metodą żelową",
+    "Morfologia krwi: WBC 7.5, RBC 4.8, Hemoglobina 14.2, Hematokryt 42%",
+    "APTT 31.2 s (norma 26-36) czas częściowej tromboplastyny po aktywacji",
+    "Zaświadczenie o szczepieniu przeciw WZW typu B, dawka 3, data 12.03.2024",
+    "Poradnia kardiologiczna. Zaświadczenie: brak przeciwwskazań kardiologicznych do zabiegu",
+    "TSH 1.85 uIU/ml, FT4 1.21 ng/dl, FT3 3.1 pg/ml",
+]
+
+
+def run_mode(client: httpx.Client, service: LLMClassifierService, mode: str, repetitions: int):
+    eval_counts, eval_seconds, wall_seconds = [], [], []
+
+    # First request loads the model / fills the cache and is not measured
+    for i, text in enumerate([TEXTS[0]] + TEXTS * repetitions):
+        if mode == "prefix_reuse":
+            payload = service._payload(service.build_prompt(text), stream=False, num_predict=1)
+        else:
+            payload = service._payload(service.build_prompt(text) + "\n\n" + service.system_prompt, stream=False, num_predict=1)
+            payload["system"] = ""
+
+        start_time = time.perf_counter()
+        data = client.post("/api/generate", json=payload).json()
+        elapsed = time.perf_counter() - start_time
+
+        if i == 0:
+            continue
+        eval_counts.append(data.get("prompt_eval_count", 0))
+        eval_seconds.append(data.get("prompt_eval_duration", 0) / 1e9)
+        wall_seconds.append(elapsed)
+
+    n = len(wall_seconds)
+    print(
+        f"{mode:<13} requests {n:3d}  prompt tokens evaluated {sum(eval_counts) / n:7.1f}  "
+        f"prefill {sum(eval_seconds) / n:6.3f}s  wall {sum(wall_seconds) / n:6.3f}s"
+    )
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    service = LLMClassifierService()
+    print(f"Ollama {settings.OLLAMA_URL}, model {settings.OLLAMA_MODEL}, system prompt {len(service.system_prompt)} chars")
+
+    with httpx.Client(base_url=settings.OLLAMA_URL, timeout=settings.LLM_TOTAL_TIMEOUT) as client:
+        run_mode(client, service, "no_reuse", repetitions)
+        run_mode(client, service, "prefix_reuse", repetitions)
+
+
+if __name__ == "__main__":
+    main()
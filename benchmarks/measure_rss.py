@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Memory footprint of the API with and without the shared OCR server (Linux only).
+
+Starts uvicorn with N workers, waits until /ready answers 200 (models loaded),
+then reports RSS and PSS of every process in the tree. PSS splits pages shared
+copy-on-write between processes, so it is the number to compare: RSS counts
+shared model weights once per process.
+
+Usage:
+    python benchmarks/measure_rss.py --workers 4              # models in every worker
+    python benchmarks/measure_rss.py --workers 4 --ocr-server # one shared OCR server
+
+Compare "total PSS" and "PSS per API worker" between the two runs.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+import urllib.request
+import urllib.error
+from typing import Dict, List
+
+PORT = 8765
+
+
+def children(pid: int) -> List[int]:
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return pids
+
+
+def process_tree(pid: int) -> List[int]:
+    tree = [pid]
+    for child in children(pid):
+        tree.extend(process_tree(child))
+    return tree
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0].rstrip(":").lower()] = int(parts[1])
+    with open(f"/proc/{pid}/cmdline") as f:
+        values["cmd"] = f.read().replace("\0", " ").strip()[:60]
+    return values
+
+
+def wait_ready(url: str, consecutive: int, timeout: float):
+    """/ready is served by a random worker - require several 200s in a row"""
+    deadline = time.time() + timeout
+    ok = 0
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                ok = ok + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError):
+            ok = 0
+        if ok >= consecutive:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def report(title: str, pids: List[int], api_workers: int) -> int:
+    print(f"\n{title}")
+    print(f"{'pid':>8} {'RSS MB':>9} {'PSS MB':>9}  command")
+    total_pss = 0
+    for pid in pids:
+        try:
+            memory = memory_kb(pid)
+        except FileNotFoundError:
+            continue
+        total_pss += memory["pss"]
+        print(f"{pid:>8} {memory['rss'] / 1024:>9.1f} {memory['pss'] / 1024:>9.1f}  {memory['cmd']}")
+    print(f"total PSS: {total_pss / 1024:.1f} MB, PSS per API worker: {total_pss / 1024 / api_workers:.1f} MB")
+    return total_pss
+
+
+def run(workers: int, ocr_server: bool, ocr_server_workers: int, timeout: float):
+    env = dict(os.environ, MODEL_WARMUP="True", UPLOAD_JANITOR_INTERVAL="0")
+    processes = []
+
+    try:
+        if ocr_server:
+            socket_path = os.path.join(tempfile.mkdtemp(), "ocr.sock")
+            env.update(OCR_SERVER_SOCKET=socket_path, OCR_SERVER_WORKERS=str(ocr_server_workers))
+            processes.append(subprocess.Popen([sys.executable, "-m", "app.ocr_server"], env=env))
+            while not os.path.exists(socket_path):
+                if processes[0].poll() is not None:
+                    raise RuntimeError("OCR server exited during startup")
+                time.sleep(0.5)
+
+        api = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--workers", str(workers)],
+            env=env
+        )
+        processes.append(api)
+        wait_ready(f"http://127.0.0.1:{PORT}/ready", consecutive=workers * 3, timeout=timeout)
+        time.sleep(2)
+
+        mode = "shared OCR server" if ocr_server else "models in every worker"
+        total = report(f"API, {workers} worker(s), {mode}", process_tree(api.pid), workers)
+        if ocr_server:
+            total += report("OCR server", process_tree(processes[0].pid), workers)
+            print(f"\nAPI + OCR server PSS: {total / 1024:.1f} MB")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers")
+    parser.add_argument("--ocr-server", action="store_true", help="start python -m app.ocr_server and use it")
+    parser.add_argument("--ocr-server-workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+    run(args.workers, args.ocr_server, args.ocr_server_workers, args.timeout)
@@ -0,0 +1,19 @@
+"""
+Text accuracy metrics shared by the OCR benchmarks
+"""
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(reference: str, text: str) -> float:
+    if not reference:
+        return 1.0 if not text else 0.0
+    return max(0.0, 1 - edit_distance(reference, text) / len(reference))
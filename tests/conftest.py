@@ -0,0 +1,6 @@
+import os
+
+# Tests run without Redis: keep job records and the callback outbox in memory
+# (environment variables take precedence over .env)
+os.environ.setdefault("JOB_STORE_BACKEND", "memory")
+os.environ.setdefault("CALLBACK_OUTBOX_BACKEND", "memory")
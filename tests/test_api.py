@@ -71,3 +71,96 @@ def test_get_document_not_found():
     response = client.get("/api/v1/documents/nonexistent-id")
     assert response.status_code == 404
     assert "not found" in response.json()["detail"].lower()
+
+
+def test_classify_batch_concurrent_keeps_order(monkeypatch):
+    """Test that batch files run concurrently, keep upload order and report timings"""
+    import asyncio
+    from app.api import endpoints
+    from app.models import DocumentType
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 2)
+    running = []
+    max_running = []
+
+    async def extract_text(file_paths, reject_when_full=True):
+        running.append(1)
+        max_running.append(len(running))
+        await asyncio.sleep(0.05)
+        running.pop()
+        return open(file_paths[0], "rb").read().decode(), {}
+
+    async def classify(text):
+        if text == "broken":
+            raise RuntimeError("OCR failed")
+        return DocumentType(text), 0.9, []
+
+    monkeypatch.setattr(endpoints.document_pipeline, "extract_text", extract_text)
+    monkeypatch.setattr(endpoints.document_pipeline, "classify", classify)
+    monkeypatch.setattr(
+        endpoints.storage_service, "move_to_processed",
+        lambda path, doc_type: endpoints.storage_service.cleanup_temp_file(path)
+    )
+
+    contents = ["DOC_BADANIE_EKG", "broken", "DOC_BADANIE_RH", "DOC_BADANIE_MORF"]
+    response = client.post(
+        "/api/v1/classify/batch",
+        files=[("files", (f"{i}.png", content.encode(), "image/png")) for i, content in enumerate(contents)]
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert max(max_running) == 2
+    assert [r["classification"]["document_type"] for r in data["results"]] == [
+        "DOC_BADANIE_EKG", "DOC_BADANIE_RH", "DOC_BADANIE_MORF"
+    ]
+    assert [t["status"] for t in data["file_timings"]] == ["processed", "failed", "processed", "processed"]
+    assert data["failed"] == 1
+    assert "DOC_BADANIE_EKG" not in data["missing_required_documents"]
+
+
+def test_classify_batch_packs_llm_classification(monkeypatch):
+    """Test that with LLM_BATCH_PACKING texts of concurrent files are classified in one call"""
+    import asyncio
+    from app.api import endpoints
+    from app.models import DocumentType
+    from app.config import settings
+    from app.services.pipeline_service import classifier_service
+
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "LLM_BATCH_PACKING", True)
+    batches = []
+
+    async def extract_text(file_paths, reject_when_full=True):
+        text = open(file_paths[0], "rb").read().decode()
+        if text == "broken":
+            raise RuntimeError("OCR failed")
+        await asyncio.sleep(0.01 * len(text))
+        return text, {}
+
+    async def classify_many_async(texts):
+        batches.append(list(texts))
+        return [(DocumentType(text), 0.9, []) for text in texts]
+
+    monkeypatch.setattr(endpoints.document_pipeline, "extract_text", extract_text)
+    monkeypatch.setattr(classifier_service, "classify_many_async", classify_many_async)
+    monkeypatch.setattr(
+        endpoints.storage_service, "move_to_processed",
+        lambda path, doc_type: endpoints.storage_service.cleanup_temp_file(path)
+    )
+
+    contents = ["DOC_BADANIE_EKG", "broken", "DOC_BADANIE_RH", "DOC_BADANIE_MORF"]
+    response = client.post(
+        "/api/v1/classify/batch",
+        files=[("files", (f"{i}.png", content.encode(), "image/png")) for i, content in enumerate(contents)]
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["classification"]["document_type"] for r in data["results"]] == [
+        "DOC_BADANIE_EKG", "DOC_BADANIE_RH", "DOC_BADANIE_MORF"
+    ]
+    assert data["failed"] == 1
+    # The failed file freed its slot for the fourth one, so all texts share one batch
+    assert [sorted(batch) for batch in batches] == [["DOC_BADANIE_EKG", "DOC_BADANIE_MORF", "DOC_BADANIE_RH"]]
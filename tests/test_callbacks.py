@@ -0,0 +1,124 @@
+import asyncio
+import httpx
+from app.config import settings
+from app.services.callback_service import CallbackOutbox, MemoryOutboxBackend, build_callback_payload
+
+
+def make_outbox(monkeypatch, responses):
+    """Outbox posting to a mock transport that answers with the given status codes"""
+    monkeypatch.setattr(settings, "CALLBACK_URL", "http://checklist/elements/{elementId}/ai-validate")
+    monkeypatch.setattr(settings, "CALLBACK_RETRY_BACKOFF_SECONDS", 0)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        status = responses.pop(0) if responses else 200
+        if status is None:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(status)
+
+    outbox = CallbackOutbox(MemoryOutboxBackend())
+    outbox._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return outbox, requests
+
+
+def deliver_all(outbox):
+    async def run():
+        while await outbox.deliver_due():
+            pass
+    asyncio.run(run())
+
+
+def test_callback_payload():
+    """Test callback body and recipe match confidence"""
+    assert build_callback_payload("DOC_BADANIE_RH", "DOC_BADANIE_RH", 0.8)["confidence"] == 1.0
+    payload = build_callback_payload("DOC_BADANIE_RH", "DOC_BADANIE_EKG", 0.8)
+    assert payload == {
+        "classifyDocumentType": "DOC_BADANIE_EKG",
+        "classifyConfidence": 0.8,
+        "confidence": 0.0,
+        "recipeId": "DOC_BADANIE_RH"
+    }
+
+
+def test_callback_retried_until_delivered(monkeypatch):
+    """Test that failed deliveries are retried and latency/attempts are recorded"""
+    outbox, requests = make_outbox(monkeypatch, [503, None, 200])
+    outbox.enqueue("12345", "DOC_BADANIE_MORF", "DOC_BADANIE_MORF", 0.9)
+
+    deliver_all(outbox)
+
+    stats = outbox.stats()
+    assert len(requests) == 3
+    assert str(requests[0].url) == "http://checklist/elements/12345/ai-validate"
+    assert stats["delivered"] == 1
+    assert stats["failed_attempts"] == 2
+    assert stats["retries_scheduled"] == 2
+    assert stats["avg_attempts"] == 3
+    assert stats["pending"] == 0
+
+
+def test_callback_dead_lettered_and_replayed(monkeypatch):
+    """Test that a callback goes to the dead-letter list after the last attempt and can be replayed"""
+    monkeypatch.setattr(settings, "CALLBACK_MAX_ATTEMPTS", 2)
+    outbox, requests = make_outbox(monkeypatch, [500, 500])
+    item = outbox.enqueue("12345", "DOC_BADANIE_MORF", "DOC_BADANIE_EKG", 0.9)
+
+    deliver_all(outbox)
+
+    dead = outbox.dead_letters()
+    assert [d["id"] for d in dead] == [item["id"]]
+    assert dead[0]["last_error"].startswith("HTTP 500")
+    assert outbox.stats()["dead_lettered"] == 1
+    assert outbox.replay("missing") == 0
+
+    assert outbox.replay(item["id"]) == 1
+    deliver_all(outbox)
+
+    assert len(requests) == 3
+    assert outbox.dead_letters() == []
+    assert outbox.stats()["delivered"] == 1
+
+
+def test_invalid_callback_url_is_dead_lettered(monkeypatch):
+    """Test that non-HTTP errors go through retries to the dead-letter list without losing the batch"""
+    monkeypatch.setattr(settings, "CALLBACK_MAX_ATTEMPTS", 2)
+    outbox, requests = make_outbox(monkeypatch, [])
+    valid = outbox.enqueue("12345", "DOC_BADANIE_MORF", "DOC_BADANIE_MORF", 0.9)
+    invalid = outbox.enqueue("67890", "DOC_BADANIE_MORF", "DOC_BADANIE_MORF", 0.9)
+    invalid["url"] = "http://checklist:abc/elements/67890"
+    outbox.backend.add(invalid, 0)
+
+    deliver_all(outbox)
+
+    dead = outbox.dead_letters()
+    assert [d["id"] for d in dead] == [invalid["id"]]
+    assert dead[0]["attempts"] == 2
+    assert dead[0]["last_error"].startswith("InvalidURL")
+    assert len(requests) == 1
+    assert outbox.stats()["delivered"] == 1
+    assert valid["id"] not in [d["id"] for d in dead]
+
+
+def test_callbacks_delivered_with_bounded_concurrency(monkeypatch):
+    """Test that at most CALLBACK_CONCURRENCY callbacks are in flight"""
+    monkeypatch.setattr(settings, "CALLBACK_CONCURRENCY", 2)
+    outbox, _ = make_outbox(monkeypatch, [])
+    running = []
+    max_running = []
+
+    async def handler(request):
+        running.append(1)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return httpx.Response(204)
+
+    outbox._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    for element_id in range(5):
+        outbox.enqueue(str(element_id), "DOC_BADANIE_RH", "DOC_BADANIE_RH", 1.0)
+
+    deliver_all(outbox)
+
+    assert max(max_running) == 2
+    assert outbox.stats()["delivered"] == 5
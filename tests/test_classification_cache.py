@@ -0,0 +1,75 @@
+import time
+import pytest
+from app.config import settings
+from app.services import classification_cache_service
+from app.services.classification_cache_service import (
+    ClassificationCache,
+    MemoryCacheBackend,
+    normalize_text,
+)
+
+
+def make_cache(ttl_seconds=60, max_entries=100):
+    return ClassificationCache(MemoryCacheBackend(ttl_seconds, max_entries))
+
+
+def test_normalize_text():
+    """Test whitespace and case normalization"""
+    assert normalize_text("  Grupa   KRWI\n A  Rh+ ") == "grupa krwi a rh+"
+
+
+def test_key_ignores_whitespace_and_case():
+    """Test that trivially different OCR output shares a key"""
+    key_a = ClassificationCache.build_key("Grupa krwi\nA Rh+", "llama3.1:8b", "1")
+    key_b = ClassificationCache.build_key("grupa  krwi a rh+", "llama3.1:8b", "1")
+    assert key_a == key_b
+
+
+def test_key_depends_on_model_and_prompt_version():
+    """Test that model or prompt change invalidates the key"""
+    base = ClassificationCache.build_key("EKG", "llama3.1:8b", "1")
+    assert base != ClassificationCache.build_key("EKG", "llama3.2:3b", "1")
+    assert base != ClassificationCache.build_key("EKG", "llama3.1:8b", "2")
+
+
+def test_hit_and_miss_counters():
+    """Test cache lookup counters"""
+    cache = make_cache()
+    result = {"document_type": "DOC_BADANIE_EKG", "confidence": 0.9, "reasoning": "EKG"}
+
+    assert cache.get("key") is None
+    cache.put("key", result)
+    assert cache.get("key") == result
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_expiry():
+    """Test that expired entries are not returned"""
+    cache = make_cache(ttl_seconds=0)
+    cache.put("key", {"document_type": "inne", "confidence": 0.1, "reasoning": ""})
+    time.sleep(0.01)
+    assert cache.get("key") is None
+
+
+def test_max_entries_eviction():
+    """Test that the oldest entries are evicted first"""
+    cache = make_cache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"document_type": "inne", "confidence": 0.1, "reasoning": ""})
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.skipif(not classification_cache_service.REDIS_SUPPORT, reason="redis not installed")
+def test_unreachable_redis_falls_back_to_memory(monkeypatch):
+    """Test that the Redis backend is checked when created, not on first lookup"""
+    monkeypatch.setattr(settings, "LLM_CACHE_BACKEND", "redis")
+    monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+
+    assert isinstance(classification_cache_service._create_backend(), MemoryCacheBackend)
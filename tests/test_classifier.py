@@ -118,3 +118,79 @@ def test_multiple_keywords_increase_confidence(classifier):
     _, confidence_many, _ = classifier.classify(text_many)
 
     assert confidence_many >= confidence_few
+
+
+def test_rules_rank_by_raw_score_when_boost_is_capped(classifier):
+    """Test that two types both boosted to 1.0 are ranked by their keyword share, not rule order"""
+    from app.utils.keyword_matcher import KeywordMatcher
+    classifier.classification_rules = {
+        DocumentType.EKG: ["ekg", "serce", "rytm", "qrs", "zatokowy", "elektrokardiogram"],
+        DocumentType.MORFOLOGIA: ["wbc", "rbc", "hgb", "plt", "hct", "mcv", "mch", "mchc", "rdw", "morfologia"],
+    }
+    classifier.keyword_matcher = KeywordMatcher(classifier.classification_rules)
+
+    # EKG 5/6 = 0.83, morfologia 9/10 = 0.9 - both above 1/1.2, so both boosted to 1.0
+    text = "ekg serce rytm qrs zatokowy wbc rbc hgb plt hct mcv mch mchc rdw"
+    ranked = classifier._score_rules(text)
+
+    assert [doc_type for doc_type, _, _ in ranked] == [DocumentType.MORFOLOGIA, DocumentType.EKG]
+    assert [confidence for _, confidence, _ in ranked] == [1.0, 1.0]
+    assert classifier._classify_rules_based(text)[0] == DocumentType.MORFOLOGIA
+
+
+class FakeLLM:
+    """LLM tier stand-in that records which texts were escalated"""
+    enabled = True
+
+    def __init__(self):
+        self.calls = []
+
+    async def classify_async(self, text):
+        self.calls.append(text)
+        return DocumentType.INR_ANTYKOAGULANTY, 0.8, "warfaryna"
+
+
+@pytest.fixture
+def tiered(classifier, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CLASSIFIER_MODE", "tiered")
+    monkeypatch.setattr(settings, "TIERED_CONFIDENCE_THRESHOLD", 0.6)
+    monkeypatch.setattr(settings, "TIERED_MIN_MARGIN", 0.15)
+    classifier.llm_classifier = FakeLLM()
+    return classifier
+
+
+def test_tiered_confident_local_result_skips_llm(tiered):
+    """Test that a clear lab result never reaches the LLM"""
+    doc_type, confidence, _ = tiered.classify("Morfologia krwi: WBC 7.5, RBC 4.8, Hemoglobina 14.2, Hematokryt 42%")
+
+    assert doc_type == DocumentType.MORFOLOGIA
+    assert tiered.llm_classifier.calls == []
+    assert tiered.stats()["local_decisions"] == 1
+
+
+def test_tiered_escalates_low_confidence(tiered):
+    """Test escalation when the local tier finds nothing"""
+    doc_type, _, _ = tiered.classify("Wynik badania laboratoryjnego")
+
+    assert doc_type == DocumentType.INR_ANTYKOAGULANTY
+    assert len(tiered.llm_classifier.calls) == 1
+    assert tiered.stats()["escalation_reasons"] == {"no_match": 1}
+
+
+def test_tiered_escalates_confusable_pair(tiered):
+    """Test that PT/INR vs INR on anticoagulants is always confirmed by the LLM"""
+    doc_type, _, _ = tiered.classify("Czas protrombinowy PT 12.1 s INR 1.05")
+
+    assert doc_type == DocumentType.INR_ANTYKOAGULANTY
+    stats = tiered.stats()
+    assert stats["escalation_reasons"] == {"confusable_pair": 1}
+    assert stats["escalation_rate"] == 1.0
+
+
+def test_tiered_keeps_local_result_without_llm(tiered):
+    """Test fallback to the local answer when the LLM is unavailable"""
+    tiered.llm_classifier.enabled = False
+    doc_type, _, _ = tiered.classify("Czas protrombinowy PT 12.1 s INR 1.05")
+
+    assert doc_type == DocumentType.PT_INR
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+from app.utils.image_preprocessing import (
+    ImagePreprocessor, crop_margins, downscale, estimate_skew_angle, estimate_text_height
+)
+
+
+def make_page(width=1200, height=1600, char_height=60, margin=200):
+    """White page with rows of dark character-like blocks"""
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    for y in range(margin, height - margin, char_height * 2):
+        for x in range(margin, width - margin, char_height):
+            page[y:y + char_height, x:x + char_height // 2] = 0
+    return page
+
+
+def test_estimate_text_height():
+    """Test that character height is recovered from connected components"""
+    assert estimate_text_height(make_page(char_height=60)) == 60
+
+
+def test_downscale_to_target_text_height():
+    """Test that large text is shrunk towards the target height"""
+    result = downscale(make_page(char_height=64), target_text_height=32, max_side=5000)
+    assert result.shape[:2] == (800, 600)
+
+
+def test_downscale_never_upscales():
+    """Test that small text keeps original resolution"""
+    page = make_page(char_height=16)
+    assert downscale(page, target_text_height=32, max_side=5000) is page
+
+
+def test_downscale_caps_longer_side():
+    """Test max side limit for images without detectable text"""
+    photo = np.full((3000, 4000, 3), 128, dtype=np.uint8)
+    assert downscale(photo, target_text_height=32, max_side=2000).shape[:2] == (1500, 2000)
+
+
+def test_crop_margins():
+    """Test that empty borders are removed"""
+    cropped = crop_margins(make_page(margin=200), padding=10)
+    assert cropped.shape[0] < 1600 - 300
+    assert cropped.shape[1] < 1200 - 300
+
+
+def test_estimate_skew_angle():
+    """Test rotation estimate on a rotated page"""
+    page = cv2.cvtColor(make_page(), cv2.COLOR_RGB2GRAY)
+    matrix = cv2.getRotationMatrix2D((600, 800), 5, 1.0)
+    rotated = cv2.warpAffine(page, matrix, (1200, 1600), borderValue=255)
+    assert abs(abs(estimate_skew_angle(rotated)) - 5) < 1
+
+
+def test_preprocessor_steps_toggle_and_timing():
+    """Test that only enabled steps run and each is timed"""
+    page = make_page()
+
+    image_np, timings = ImagePreprocessor(grayscale=True, downscale=False).process(page)
+    assert image_np.ndim == 2
+    assert list(timings) == ["grayscale"]
+
+    image_np, timings = ImagePreprocessor(grayscale=False, downscale=False).process(page)
+    assert image_np is page
+    assert timings == {}
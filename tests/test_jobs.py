@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.models import DocumentType
+from app.services import job_service
+from app.services.classification_cache_service import MemoryCacheBackend, REDIS_SUPPORT
+from app.services.job_service import JobStore, run_merged_document_job
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory job store and no-op storage/callback side effects"""
+    store = JobStore(MemoryCacheBackend(ttl_seconds=60, max_entries=100))
+    callbacks = []
+
+    monkeypatch.setattr(job_service, "job_store", store)
+    monkeypatch.setattr(job_service, "retry_delay", lambda attempt: 0)
+    async def move_to_processed(path, doc_type):
+        return path
+
+    async def cleanup_temp_file(path):
+        return None
+
+    monkeypatch.setattr(job_service.storage_service, "move_to_processed", move_to_processed)
+    monkeypatch.setattr(job_service.storage_service, "cleanup_temp_file", cleanup_temp_file)
+    monkeypatch.setattr(job_service.callback_outbox, "enqueue", lambda *args: callbacks.append(args))
+    store.callbacks = callbacks
+    return store
+
+
+def fake_pipeline(monkeypatch, failures: int):
+    """Pipeline whose OCR fails the first `failures` times"""
+    calls = []
+
+    async def extract_text(file_paths, reject_when_full=True):
+        calls.append(file_paths)
+        if len(calls) <= failures:
+            raise RuntimeError("Ollama unavailable")
+        return "Morfologia krwi WBC", {}
+
+    async def classify(text):
+        return DocumentType.MORFOLOGIA, 0.9, ["morfologia"]
+
+    monkeypatch.setattr(job_service.document_pipeline, "extract_text", extract_text)
+    monkeypatch.setattr(job_service.document_pipeline, "classify", classify)
+    return calls
+
+
+def test_job_store_lifecycle():
+    """Test create / update / get of job records"""
+    store = JobStore(MemoryCacheBackend(ttl_seconds=60, max_entries=100))
+
+    job = store.create("12345", "DOC_BADANIE_MORF", 2)
+    assert store.get(job["job_id"])["status"] == "queued"
+
+    store.update(job["job_id"], status="processing", attempts=1)
+    assert store.get(job["job_id"])["attempts"] == 1
+    assert store.get("missing") is None
+
+
+def test_job_retried_until_success(store, monkeypatch):
+    """Test that a failing attempt is retried and the job completes"""
+    monkeypatch.setattr(settings, "JOB_MAX_RETRIES", 2)
+    calls = fake_pipeline(monkeypatch, failures=1)
+    job = store.create("12345", "DOC_BADANIE_MORF", 1)
+
+    asyncio.run(run_merged_document_job(job["job_id"], "12345", "DOC_BADANIE_MORF", [("id", "scan.png", "scan.png")]))
+
+    result = store.get(job["job_id"])
+    assert len(calls) == 2
+    assert result["status"] == "completed"
+    assert result["attempts"] == 2
+    assert result["result"]["document_type"] == "DOC_BADANIE_MORF"
+    assert store.callbacks == [("12345", "DOC_BADANIE_MORF", "DOC_BADANIE_MORF", 0.9)]
+
+
+def test_job_failed_after_retries(store, monkeypatch):
+    """Test that the job is marked failed once retries are exhausted"""
+    monkeypatch.setattr(settings, "JOB_MAX_RETRIES", 1)
+    calls = fake_pipeline(monkeypatch, failures=10)
+    job = store.create("12345", "DOC_BADANIE_MORF", 1)
+
+    asyncio.run(run_merged_document_job(job["job_id"], "12345", "DOC_BADANIE_MORF", [("id", "scan.png", "scan.png")]))
+
+    result = store.get(job["job_id"])
+    assert len(calls) == 2
+    assert result["status"] == "failed"
+    assert result["error"] == "Ollama unavailable"
+    assert store.callbacks == []
+
+
+def test_get_job_status_endpoint(monkeypatch):
+    """Test job status polling endpoint"""
+    store = JobStore(MemoryCacheBackend(ttl_seconds=60, max_entries=100))
+    monkeypatch.setattr("app.api.endpoints.job_store", store)
+    job = store.create("12345", "DOC_BADANIE_MORF", 1)
+
+    response = client.get(f"/api/v1/jobs/{job['job_id']}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "queued"
+
+    assert client.get("/api/v1/jobs/unknown").status_code == 404
+
+
+@pytest.mark.skipif(not REDIS_SUPPORT, reason="redis not installed")
+def test_unreachable_redis_job_store_fails(monkeypatch):
+    """Test that a configured but unreachable Redis job store is an error, not a silent in-memory store"""
+    monkeypatch.setattr(settings, "JOB_STORE_BACKEND", "redis")
+    monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+
+    with pytest.raises(RuntimeError, match="Redis job store unavailable"):
+        job_service._create_backend()
@@ -0,0 +1,47 @@
+import pytest
+from app.models import DocumentType
+from app.services.classifier_service import DocumentClassifier
+from app.utils.keyword_matcher import KeywordMatcher, fold_text
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return KeywordMatcher(DocumentClassifier().classification_rules)
+
+
+def test_fold_text():
+    """Test lowercasing and Polish diacritics folding"""
+    assert fold_text("Zaświadczenie ŁÓDŹ") == "zaswiadczenie lodz"
+
+
+def test_short_keywords_need_word_boundaries(matcher):
+    """Test that "pt" / "rh" / "inr" do not match inside unrelated words"""
+    assert matcher.match("Optymalny wynik, rhythm, pinr") == {}
+    assert matcher.match("PT 12.1 s")[DocumentType.PT_INR] == ["pt"]
+
+
+def test_symbol_keywords(matcher):
+    """Test keywords ending with + or - (electrolytes, blood groups)"""
+    hits = matcher.match("Na+ 140 mmol/l, K+4.5")
+    assert hits[DocumentType.JONOGRAM] == ["na+", "k+"]
+    assert DocumentType.GRUPA_KRWI not in hits
+
+
+def test_missing_diacritics_and_ocr_confusions(matcher):
+    """Test that OCR output without Polish characters and with 0/o, 1/l still matches"""
+    hits = matcher.match("ZASWIADCZENIE lekarskie - kardio1og, m0rfologia")
+
+    assert "zaświadczenie" in hits[DocumentType.ZASWIADCZENIE_KARDIOLOG]
+    assert "kardiolog" in hits[DocumentType.ZASWIADCZENIE_KARDIOLOG]
+    assert hits[DocumentType.MORFOLOGIA] == ["morfologia"]
+
+
+def test_multiword_keyword_across_line_break(matcher):
+    """Test that OCR line breaks between words do not hide a phrase"""
+    assert matcher.match("Czas\nprotrombinowy")[DocumentType.PT_INR] == ["czas protrombinowy"]
+
+
+def test_nested_keywords_are_all_counted(matcher):
+    """Test that a keyword inside a longer matched keyword is reported too"""
+    assert matcher.match("Poziom przeciwciał")[DocumentType.POZIOM_HBS] == ["przeciwciał", "poziom przeciwciał"]
+    assert matcher.match("anti-HBs 120")[DocumentType.POZIOM_HBS] == ["hbs", "anti-hbs"]
@@ -0,0 +1,242 @@
+import json
+import asyncio
+import httpx
+import pytest
+from app.models import DocumentType
+from app.services.llm_classifier_service import LLMClassifierService, extract_json_value
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """LLM service talking to a mocked Ollama, with the classification cache disabled"""
+    from app.services import llm_classifier_service as module
+    monkeypatch.setattr(module.classification_cache, "enabled", False)
+    monkeypatch.setattr(module.settings, "LLM_PREFIX_WARMUP", False)
+    return LLMClassifierService()
+
+
+def use_transport(monkeypatch, service, handler):
+    monkeypatch.setattr(
+        service, "_get_client",
+        lambda: httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    )
+
+
+def ndjson(*tokens, done_at=None):
+    lines = [json.dumps({"response": token, "done": i == done_at}) for i, token in enumerate(tokens)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_extract_json_value():
+    """Test detection of a complete JSON object or array in streamed text"""
+    assert extract_json_value('{"document_type": "DOC_') is None
+    assert extract_json_value('{"a": "}{", "b": {"c": 1}} trailing') == '{"a": "}{", "b": {"c": 1}}'
+    assert extract_json_value('{"a": "say \\"}\\""}') == '{"a": "say \\"}\\""}'
+    assert extract_json_value('[{"index": 0}, {"index": 1}') is None
+    assert extract_json_value('[{"index": 0}, {"index": 1, "r": "]"}] x') == '[{"index": 0}, {"index": 1, "r": "]"}]'
+
+
+def test_constructor_does_not_probe():
+    """Test that creating the service performs no network I/O"""
+    service = LLMClassifierService()
+    assert service.enabled is True
+    assert service._available is None
+
+
+def test_sync_calls_close_their_client(service):
+    """Test that every asyncio.run scope closes the client it created"""
+    async def get_client():
+        return service._get_client()
+
+    first = service.run_sync(get_client())
+    second = service.run_sync(get_client())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert len(service._clients) == 0
+
+
+def test_stream_aborts_after_complete_json(service, monkeypatch):
+    """Test that reading stops once the JSON answer is complete"""
+    tokens = ['{"document_type": ', '"DOC_BADANIE_MORF", ', '"confidence": 0.9, "reasoning": "WBC"}', "\n\n", " "]
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=ndjson(*tokens, done_at=len(tokens) - 1))
+
+    use_transport(monkeypatch, service, handler)
+
+    document_type, confidence, reasoning = asyncio.run(service.classify_async("Morfologia krwi WBC"))
+
+    assert document_type == DocumentType.MORFOLOGIA
+    assert confidence == 0.9
+    assert service.stats()["early_aborts"] == 1
+
+
+def test_unavailable_ollama(service, monkeypatch):
+    """Test that connection errors disable the classifier until the next probe"""
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    use_transport(monkeypatch, service, handler)
+
+    document_type, confidence, _ = asyncio.run(service.classify_async("Grupa krwi A Rh+"))
+
+    assert document_type is None
+    assert confidence == 0.0
+    assert service.enabled is False
+
+
+def test_failed_probe_is_retried_after_interval(service, monkeypatch):
+    """Test that Ollama coming up after a failed probe re-enables the classifier"""
+    from app.services import llm_classifier_service as module
+    monkeypatch.setattr(module.settings, "LLM_HEALTH_CHECK_INTERVAL", 0)
+    ollama_up = False
+    probes = []
+
+    def handler(request):
+        probes.append(request.url.path)
+        if not ollama_up:
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        answer = '{"document_type": "DOC_BADANIE_RH", "confidence": 0.8, "reasoning": "Rh"}'
+        return httpx.Response(200, content=ndjson(answer, done_at=0))
+
+    use_transport(monkeypatch, service, handler)
+
+    assert asyncio.run(service.classify_async("Grupa krwi A Rh+"))[0] is None
+    ollama_up = True
+
+    assert service.enabled is True
+    document_type, confidence, _ = asyncio.run(service.classify_async("Grupa krwi A Rh+"))
+    assert document_type == DocumentType.GRUPA_KRWI
+    assert probes.count("/api/tags") == 2
+
+
+def test_warmup_waits_for_ollama_to_start(service, monkeypatch):
+    """Test that startup probes are retried and a late Ollama is not disabled"""
+    from app.services import llm_classifier_service as module
+    monkeypatch.setattr(module.settings, "LLM_WARMUP_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(module.settings, "LLM_WARMUP_ATTEMPTS", 3)
+    probes = []
+
+    def handler(request):
+        probes.append(request.url.path)
+        if len(probes) < 3:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"models": []})
+
+    use_transport(monkeypatch, service, handler)
+    assert asyncio.run(service.warmup()) == {"available": True, "model": service.model_name, "attempts": 3}
+
+    monkeypatch.setattr(module.settings, "LLM_WARMUP_ATTEMPTS", 1)
+    use_transport(monkeypatch, service, lambda request: httpx.Response(503))
+    assert asyncio.run(service.warmup())["available"] is False
+    # Still down after warmup: unknown, so the first request probes again
+    assert service._available is None
+    assert service.enabled is True
+
+
+def test_static_prefix_sent_as_system_prompt(service, monkeypatch):
+    """Test that only the document text varies between requests"""
+    requests_seen = []
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        requests_seen.append(json.loads(request.content))
+        return httpx.Response(200, content=ndjson('{"document_type": "inne", "confidence": 0.2}', done_at=0))
+
+    use_transport(monkeypatch, service, handler)
+    asyncio.run(service.classify_async("Grupa krwi A Rh+"))
+    asyncio.run(service.classify_async("APTT 31 s"))
+
+    assert requests_seen[0]["system"] == requests_seen[1]["system"]
+    assert "TYPY DOKUMENTÓW" in requests_seen[0]["system"]
+    assert requests_seen[0]["prompt"].endswith("Grupa krwi A Rh+")
+    assert "TYPY DOKUMENTÓW" not in requests_seen[1]["prompt"]
+    assert requests_seen[0]["keep_alive"] == requests_seen[1]["keep_alive"]
+
+
+def test_packed_classification(service, monkeypatch):
+    """Test that short documents share one prompt and long ones are sent alone"""
+    from app.services import llm_classifier_service as module
+    monkeypatch.setattr(module.settings, "LLM_BATCH_MAX_DOCUMENT_TOKENS", 100)
+    prompts = []
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        prompt = json.loads(request.content)["prompt"]
+        prompts.append(prompt)
+        if "DOKUMENT 1" in prompt:
+            answer = {"results": [
+                {"index": 0, "document_type": "DOC_BADANIE_RH", "confidence": 0.9, "reasoning": "Rh"},
+                {"index": 1, "document_type": "DOC_BADANIE_APTT", "confidence": 0.8, "reasoning": "APTT"},
+            ]}
+        else:
+            answer = {"document_type": "DOC_BADANIE_KISZP", "confidence": 0.7, "reasoning": "karta"}
+        return httpx.Response(200, content=ndjson(json.dumps(answer), done_at=0))
+
+    use_transport(monkeypatch, service, handler)
+
+    results = asyncio.run(service.classify_many_async(["Grupa krwi 0 Rh+", "APTT 31 s", "karta " * 200]))
+
+    assert [r[0] for r in results] == [DocumentType.GRUPA_KRWI, DocumentType.APTT, DocumentType.KARTA_INFORMACYJNA]
+    assert len(prompts) == 2
+    assert service.stats()["packed_documents"] == 2
+
+
+def test_packed_classification_falls_back_to_single_calls(service, monkeypatch):
+    """Test that documents missing from the packed answer are classified alone"""
+    prompts = []
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        prompt = json.loads(request.content)["prompt"]
+        prompts.append(prompt)
+        if "DOKUMENT 1" in prompt:
+            answer = {"results": [{"index": 0, "document_type": "DOC_BADANIE_RH", "confidence": 0.9}]}
+        else:
+            answer = {"document_type": "DOC_BADANIE_EKG", "confidence": 0.6, "reasoning": "EKG"}
+        return httpx.Response(200, content=ndjson(json.dumps(answer), done_at=0))
+
+    use_transport(monkeypatch, service, handler)
+
+    results = asyncio.run(service.classify_many_async(["Grupa krwi 0 Rh+", "EKG rytm zatokowy"]))
+
+    assert [r[0] for r in results] == [DocumentType.GRUPA_KRWI, DocumentType.EKG]
+    assert len(prompts) == 2
+    assert service.stats()["packed_fallbacks"] == 1
+
+
+def test_packed_classification_accepts_streamed_bare_array(service, monkeypatch):
+    """Test that a bare array answer is not cut at its first element by the early abort"""
+    prompts = []
+    requests_seen = []
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        requests_seen.append(json.loads(request.content))
+        prompts.append(requests_seen[-1]["prompt"])
+        return httpx.Response(200, content=ndjson(
+            '[{"index": 0, "document_type": "DOC_BADANIE_RH", "confidence": 0.9, "reasoning": "Rh"}',
+            ', {"index": 1, "document_type": "DOC_BADANIE_EKG", ',
+            '"confidence": 0.8, "reasoning": "EKG"}]', "\n", " ",
+            done_at=4
+        ))
+
+    use_transport(monkeypatch, service, handler)
+
+    results = asyncio.run(service.classify_many_async(["Grupa krwi 0 Rh+", "EKG rytm zatokowy"]))
+
+    assert [r[0] for r in results] == [DocumentType.GRUPA_KRWI, DocumentType.EKG]
+    assert len(prompts) == 1
+    assert service.stats()["packed_fallbacks"] == 0
+    assert service.stats()["early_aborts"] == 1
+    assert '"results"' in requests_seen[0]["system"]
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from app.config import settings
+from app.services.ocr_backends import (
+    OCRBackend, TesseractBackend, create_ocr_backend, ocr_backend_fingerprint, recognize_title_region
+)
+from app.utils.text_regions import select_title_boxes
+
+
+def fake_tesseract(tmp_path, script: str) -> str:
+    path = tmp_path / "tesseract"
+    path.write_text("#!/bin/sh\n" + script)
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_tesseract_backend_reads_lines(tmp_path):
+    """Test that the image is piped to the binary and its output split into lines"""
+    command = fake_tesseract(tmp_path, 'cat > /dev/null\necho "$*"\necho\necho "  Morfologia krwi  "\n')
+    backend = TesseractBackend(["pl", "en"], command=command, psm=6, threads=2)
+
+    lines = backend.recognize(np.zeros((20, 40), dtype=np.uint8))
+
+    assert lines == ["stdin stdout -l pol+eng --psm 6", "Morfologia krwi"]
+    assert backend.env["OMP_THREAD_LIMIT"] == "2"
+    assert backend.capabilities() == {"backend": "tesseract", "batch": False, "gpu": False, "roi": False}
+
+
+def test_tesseract_errors(tmp_path):
+    """Test missing binary and failing recognition"""
+    with pytest.raises(RuntimeError, match="not available"):
+        TesseractBackend(["pl"], command=str(tmp_path / "missing"), psm=3, threads=1)
+
+    command = fake_tesseract(tmp_path, 'echo "Failed loading language pol" >&2\nexit 1\n')
+    backend = TesseractBackend(["pl"], command=command, psm=3, threads=1)
+    with pytest.raises(RuntimeError, match="Failed loading language"):
+        backend.recognize(np.zeros((20, 40, 3), dtype=np.uint8))
+
+
+def test_backend_selected_by_settings(tmp_path, monkeypatch):
+    """Test OCR_BACKEND selection and its effect on the OCR cache key"""
+    easyocr_fingerprint = ocr_backend_fingerprint()
+    monkeypatch.setattr(settings, "OCR_BACKEND", "tesseract")
+    monkeypatch.setattr(settings, "TESSERACT_CMD", fake_tesseract(tmp_path, "echo EKG\n"))
+
+    assert isinstance(create_ocr_backend(), TesseractBackend)
+    assert ocr_backend_fingerprint()["backend"] == "tesseract"
+    assert ocr_backend_fingerprint() != easyocr_fingerprint
+
+
+def test_default_batch_recognizes_one_by_one():
+    """Test that backends without batch support keep input order"""
+    class EchoBackend(OCRBackend):
+        name = "echo"
+
+        def recognize(self, image):
+            return [str(image.shape[0])]
+
+    images = [np.zeros((height, 10)) for height in (3, 1, 2)]
+    assert EchoBackend().recognize_batch(images) == [["3"], ["1"], ["2"]]
+
+
+class BoxBackend(OCRBackend):
+    """Region-of-interest backend returning the box's top edge as its text"""
+    name = "boxes"
+    supports_roi = True
+
+    def __init__(self, confidence: float):
+        self.confidence = confidence
+        self.calls = []
+
+    def recognize(self, image):
+        return []
+
+    def recognize_boxes(self, image, boxes):
+        self.calls.append(list(boxes))
+        return [(box, f"y{box[1]}", self.confidence) for box in sorted(boxes, key=lambda box: (box[1], box[0]))]
+
+
+# A large title near the top, regular lines below and small print in the footer
+PAGE_BOXES = [(10, 500, 200, 520), (10, 20, 400, 80), (10, 100, 200, 120), (10, 980, 100, 990), (10, 140, 200, 160)]
+
+
+def test_title_boxes_ranked_by_size_and_position():
+    """Test that large text near the top is selected first, in reading order"""
+    selected, rest = select_title_boxes(PAGE_BOXES, image_height=1000, top_k=2)
+
+    assert selected == [1, 2]
+    assert rest == [4, 0, 3]
+    assert select_title_boxes([], image_height=1000, top_k=2) == ([], [])
+
+
+def test_title_region_recognizes_top_k_then_rest():
+    """Test that "roi" recognizes only the top boxes and "rest" the others"""
+    backend = BoxBackend(confidence=0.9)
+    image = np.zeros((1000, 500), dtype=np.uint8)
+
+    lines, stats = recognize_title_region(backend, image, PAGE_BOXES, "roi", top_k=2, min_confidence=0.5)
+    assert lines == ["y20", "y100"]
+    assert stats["boxes_total"] == 5
+    assert stats["boxes_recognized"] == 2
+    assert stats["complete"] is False
+    assert stats["low_confidence_fallback"] is False
+
+    lines, stats = recognize_title_region(backend, image, PAGE_BOXES, "rest", top_k=2, min_confidence=0.5)
+    assert lines == ["y140", "y500", "y980"]
+    assert stats["boxes_recognized"] == 3
+    assert stats["complete"] is True
+
+
+def test_title_region_low_confidence_recognizes_whole_page():
+    """Test the fallback to every box when the title boxes are read poorly"""
+    backend = BoxBackend(confidence=0.2)
+    image = np.zeros((1000, 500), dtype=np.uint8)
+
+    lines, stats = recognize_title_region(backend, image, PAGE_BOXES, "roi", top_k=2, min_confidence=0.5)
+
+    assert lines == ["y20", "y100", "y140", "y500", "y980"]
+    assert stats["boxes_recognized"] == 5
+    assert stats["complete"] is True
+    assert stats["low_confidence_fallback"] is True
+    assert len(backend.calls) == 2
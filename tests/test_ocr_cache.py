@@ -0,0 +1,81 @@
+import pytest
+from app.config import settings
+from app.services.ocr_cache_service import OCRCache, file_sha256, ocr_cache_fingerprint
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create OCR cache in a temporary directory"""
+    return OCRCache(cache_dir=str(tmp_path / "cache"), memory_entries=2, max_disk_bytes=1024 * 1024)
+
+
+def test_miss_then_hit(cache):
+    """Test that stored result is returned from memory tier"""
+    key = cache.build_key("abc", {"languages": ["pl", "en"]})
+    assert cache.get(key) is None
+
+    cache.put(key, "Grupa krwi A Rh+", ["Grupa krwi", "A Rh+"], ocr_seconds=2.0)
+    assert cache.get(key) == ("Grupa krwi A Rh+", ["Grupa krwi", "A Rh+"])
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["ocr_seconds_saved"] == 2.0
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that a new cache instance reads entries written by another one"""
+    first = OCRCache(cache_dir=str(tmp_path), memory_entries=2, max_disk_bytes=1024 * 1024)
+    key = first.build_key("abc", {})
+    first.put(key, "EKG", ["EKG"])
+
+    second = OCRCache(cache_dir=str(tmp_path), memory_entries=2, max_disk_bytes=1024 * 1024)
+    assert second.get(key) == ("EKG", ["EKG"])
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_key_depends_on_ocr_settings(cache):
+    """Test that different OCR settings produce different keys"""
+    assert cache.build_key("abc", {"pdf_dpi": 200}) != cache.build_key("abc", {"pdf_dpi": 300})
+
+
+def test_fingerprint_tracks_text_layer_threshold(monkeypatch):
+    """Test that changing when the PDF text layer is trusted invalidates cached text"""
+    before = ocr_cache_fingerprint()
+    monkeypatch.setattr(settings, "PDF_TEXT_LAYER_MIN_CHARS", settings.PDF_TEXT_LAYER_MIN_CHARS + 1)
+    assert ocr_cache_fingerprint() != before
+
+
+def test_memory_tier_is_bounded(cache):
+    """Test LRU eviction from the memory tier"""
+    for i in range(5):
+        cache.put(f"key{i}", str(i), [str(i)])
+
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    """Test that disk tier is evicted below the size limit"""
+    cache = OCRCache(cache_dir=str(tmp_path), memory_entries=1, max_disk_bytes=2000)
+    for i in range(20):
+        cache.put(cache.build_key(str(i), {}), "x" * 200, [])
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 2000
+    assert stats["evictions"] > 0
+
+
+def test_disabled_cache(tmp_path):
+    """Test that disabled cache never stores anything"""
+    cache = OCRCache(cache_dir=str(tmp_path / "off"), memory_entries=2, max_disk_bytes=1024, enabled=False)
+    cache.put("key", "text", ["text"])
+    assert cache.get("key") is None
+    assert not (tmp_path / "off").exists()
+
+
+def test_file_sha256(tmp_path):
+    """Test file hashing"""
+    path = tmp_path / "doc.png"
+    path.write_bytes(b"scan")
+    assert file_sha256(str(path)) == file_sha256(str(path))
+    assert len(file_sha256(str(path))) == 64
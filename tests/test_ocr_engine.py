@@ -0,0 +1,51 @@
+from app.config import settings
+from app.services.ocr_cache_service import ocr_cache_fingerprint
+from app.utils.ocr_engine import OCREngineConfig, default_torch_threads
+
+
+def test_engine_config_from_settings(monkeypatch):
+    """Test parsing of engine settings into EasyOCR arguments"""
+    monkeypatch.setattr(settings, "OCR_TORCH_THREADS", 3)
+    monkeypatch.setattr(settings, "OCR_QUANTIZE", False)
+    monkeypatch.setattr(settings, "OCR_ROTATION_INFO", "90, 270")
+    monkeypatch.setattr(settings, "OCR_CONTRAST_RETRY", False)
+
+    engine = OCREngineConfig.from_settings()
+
+    assert engine.torch_threads == 3
+    assert engine.reader_kwargs() == {"quantize": False}
+    assert engine.readtext_kwargs() == {
+        "paragraph": False, "rotation_info": [90, 270], "contrast_ths": 0.0, "decoder": "greedy"
+    }
+
+
+def test_default_threads_split_cores_between_ocr_processes(monkeypatch):
+    """Test that OCR processes of all uvicorn workers do not each use every core"""
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    monkeypatch.setattr(settings, "OCR_SERVER_SOCKET", "")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "OCR_WORKERS", 2)
+    assert default_torch_threads() == 4
+
+    monkeypatch.setattr(settings, "OCR_WORKERS", 0)
+    assert default_torch_threads() == 8
+
+    # Every uvicorn worker runs its own OCR processes
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    assert default_torch_threads() == 2
+    monkeypatch.setattr(settings, "OCR_WORKERS", 2)
+    assert default_torch_threads() == 1
+
+    monkeypatch.setattr(settings, "OCR_SERVER_SOCKET", "/run/ocr/ocr.sock")
+    monkeypatch.setattr(settings, "OCR_SERVER_WORKERS", 16)
+    assert default_torch_threads() == 1
+
+
+def test_engine_settings_change_ocr_cache_key(monkeypatch):
+    """Test that output-changing engine settings are part of the OCR cache fingerprint"""
+    before = ocr_cache_fingerprint()
+    monkeypatch.setattr(settings, "OCR_TORCH_THREADS", 1)
+    assert ocr_cache_fingerprint() == before
+
+    monkeypatch.setattr(settings, "OCR_QUANTIZE", not settings.OCR_QUANTIZE)
+    assert ocr_cache_fingerprint() != before
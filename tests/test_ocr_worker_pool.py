@@ -0,0 +1,281 @@
+import json
+import time
+import asyncio
+import pytest
+from app.services.ocr_worker_pool import OCRWorkerPool, OCRQueueFullError
+
+# Preprocessing timings returned by OCR jobs that did not preprocess anything
+NO_TIMINGS = {"images": 0, "steps_ms": {}}
+
+
+def slow_job(value):
+    time.sleep(0.05)
+    return value
+
+
+def test_submit_returns_result():
+    """Test that job result is awaited from the pool"""
+    pool = OCRWorkerPool(workers=0, queue_size=4)
+
+    async def run():
+        return await pool.submit(slow_job, "EKG")
+
+    assert asyncio.run(run()) == "EKG"
+    assert pool.stats()["completed"] == 1
+    pool.shutdown()
+
+
+def test_queue_full_is_rejected():
+    """Test backpressure when more jobs are pending than the queue allows"""
+    pool = OCRWorkerPool(workers=0, queue_size=2)
+
+    async def run():
+        return await asyncio.gather(
+            *[pool.submit(slow_job, i) for i in range(3)],
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], OCRQueueFullError)
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_accepted_jobs_wait_instead_of_failing():
+    """Test that background jobs are queued even when the pool is full"""
+    pool = OCRWorkerPool(workers=0, queue_size=1)
+
+    async def run():
+        return await asyncio.gather(
+            pool.submit(slow_job, "a"),
+            pool.submit(slow_job, "b", reject_when_full=False)
+        )
+
+    assert asyncio.run(run()) == ["a", "b"]
+    pool.shutdown()
+
+
+def test_job_error_is_propagated():
+    """Test that worker exceptions reach the caller"""
+    pool = OCRWorkerPool(workers=0, queue_size=1)
+
+    async def run():
+        return await pool.submit(int, "not a number")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert pool.stats()["failed"] == 1
+    assert pool.stats()["pending"] == 0
+    pool.shutdown()
+
+
+def test_pdf_pages_are_reassembled_in_order(monkeypatch):
+    """Test that pages OCR'd in parallel come back in page order"""
+    from app.services import ocr_worker_pool as pool_module
+
+    def fake_page_job(pdf_path, page_number, region):
+        time.sleep(0.01 * (4 - page_number))
+        return [f"page {page_number}"], NO_TIMINGS
+
+    monkeypatch.setattr(pool_module, "_run_extract_region", fake_page_job)
+    monkeypatch.setattr(pool_module, "get_pdf_page_count", lambda pdf_path: 3)
+    monkeypatch.setattr(pool_module, "get_pdf_text_layers", lambda pdf_path: [])
+    monkeypatch.setattr(pool_module.ocr_cache, "enabled", False)
+
+    pool = OCRWorkerPool(workers=0, queue_size=1)
+    full_text, lines = asyncio.run(pool.extract_text("discharge_card.pdf"))
+
+    assert lines == ["page 1", "page 2", "page 3"]
+    assert full_text == "page 1 page 2 page 3"
+    assert pool.stats()["submitted"] == 3
+    pool.shutdown()
+
+
+def test_roi_regions_skip_rest_of_complete_pages(monkeypatch):
+    """Test region-of-interest OCR: "rest" only for incomplete pages, box counts per page"""
+    from app.services import ocr_worker_pool as pool_module
+
+    def fake_roi_job(file_path, page_number, region):
+        # Page 2 fell back to the whole page already in its "roi" job
+        complete = region == "rest" or page_number == 2
+        recognized = 2 if region == "roi" and page_number == 1 else (10 if page_number == 2 else 8)
+        stats = {"boxes_total": 10, "boxes_recognized": recognized, "complete": complete,
+                 "low_confidence_fallback": page_number == 2, "recognize_seconds": 0.1}
+        return [[f"{region} {page_number}"], stats], NO_TIMINGS
+
+    monkeypatch.setattr(pool_module, "_run_extract_roi", fake_roi_job)
+    monkeypatch.setattr(pool_module, "get_page_count", lambda file_path: 2)
+    monkeypatch.setattr(pool_module.settings, "OCR_ROI_ENABLED", True)
+
+    async def run():
+        roi_pages = []
+        regions = [
+            (page, region, lines)
+            async for page, region, lines in pool.iter_regions("lab_result.png", roi_pages=roi_pages)
+        ]
+        return regions, roi_pages
+
+    pool = OCRWorkerPool(workers=0, queue_size=1)
+    regions, roi_pages = asyncio.run(run())
+
+    assert regions == [(1, "roi", ["roi 1"]), (1, "rest", ["rest 1"]), (2, "roi", ["roi 2"])]
+    assert [(page["page"], page["boxes_recognized"]) for page in roi_pages] == [(1, 10), (2, 10)]
+    stats = pool.stats()
+    assert stats["roi_pages"] == 2
+    assert stats["roi_low_confidence_fallbacks"] == 1
+    assert stats["roi_fraction_recognized"] == 1.0
+    pool.shutdown()
+
+
+def test_preprocessing_timings_reach_stats(monkeypatch):
+    """Test that per-step preprocessing timings returned by OCR jobs are averaged in stats"""
+    from app.services import ocr_worker_pool as pool_module
+
+    def timed_job(file_path, page_number, region):
+        return ["EKG"], {"images": 1, "steps_ms": {"grayscale": 2.0, "downscale": 10.0 * page_number}}
+
+    monkeypatch.setattr(pool_module, "_run_extract_region", timed_job)
+    pool = OCRWorkerPool(workers=0, queue_size=10)
+
+    async def run():
+        await pool.ocr_region("ekg.png", 1, "page")
+        await pool.ocr_region("ekg.png", 2, "page")
+
+    asyncio.run(run())
+
+    stats = pool.stats()
+    assert stats["preprocessed_images"] == 2
+    assert stats["preprocess_avg_ms"] == {"grayscale": 2.0, "downscale": 15.0}
+    pool.shutdown()
+
+
+def test_concurrent_regions_are_batched(monkeypatch):
+    """Test that regions submitted together run as one batched job"""
+    from app.services import ocr_worker_pool as pool_module
+
+    batches = []
+
+    def fake_batch_job(items):
+        batches.append(items)
+        return [[f"{path}:{page}"] for path, page, _ in items], NO_TIMINGS
+
+    monkeypatch.setattr(pool_module, "_run_extract_batch", fake_batch_job)
+
+    pool = OCRWorkerPool(workers=0, queue_size=10, batch_size=3, batch_max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*[
+            pool.ocr_region(f"scan{i}.png", 1, "page") for i in range(4)
+        ])
+
+    results = asyncio.run(run())
+
+    assert results == [["scan0.png:1"], ["scan1.png:1"], ["scan2.png:1"], ["scan3.png:1"]]
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert pool.stats()["avg_batch_size"] == 2.0
+    pool.shutdown()
+
+
+def test_failed_batch_falls_back_to_single_jobs(monkeypatch):
+    """Test that one bad image does not fail the whole batch"""
+    from app.services import ocr_worker_pool as pool_module
+
+    def failing_batch_job(items):
+        raise ValueError("cannot identify image file")
+
+    def single_job(file_path, page_number, region):
+        if file_path == "broken.png":
+            raise ValueError("cannot identify image file")
+        return ["EKG"], NO_TIMINGS
+
+    monkeypatch.setattr(pool_module, "_run_extract_batch", failing_batch_job)
+    monkeypatch.setattr(pool_module, "_run_extract_region", single_job)
+
+    pool = OCRWorkerPool(workers=0, queue_size=10, batch_size=2, batch_max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            pool.ocr_region("ekg.png", 1, "page"),
+            pool.ocr_region("broken.png", 1, "page"),
+            return_exceptions=True
+        )
+
+    good, bad = asyncio.run(run())
+    assert good == ["EKG"]
+    assert isinstance(bad, ValueError)
+    pool.shutdown()
+
+
+def test_cancelled_waiter_does_not_break_batch(monkeypatch):
+    """Test that a region request cancelled mid-batch leaves the other results intact"""
+    from app.services import ocr_worker_pool as pool_module
+
+    def failing_batch_job(items):
+        raise ValueError("cannot identify image file")
+
+    def single_job(file_path, page_number, region):
+        time.sleep(0.1)
+        return [file_path], NO_TIMINGS
+
+    monkeypatch.setattr(pool_module, "_run_extract_batch", failing_batch_job)
+    monkeypatch.setattr(pool_module, "_run_extract_region", single_job)
+
+    pool = OCRWorkerPool(workers=0, queue_size=10, batch_size=2, batch_max_wait_ms=10)
+
+    async def run():
+        kept = asyncio.ensure_future(pool.ocr_region("ekg.png", 1, "page"))
+        cancelled = asyncio.ensure_future(pool.ocr_region("rtg.png", 1, "page"))
+        await asyncio.sleep(0.05)
+        batches = set(pool._batcher._batches)
+        cancelled.cancel()
+        lines = await kept
+        outcomes = await asyncio.gather(*batches, return_exceptions=True)
+        return lines, batches, outcomes
+
+    lines, batches, outcomes = asyncio.run(run())
+    assert lines == ["ekg.png"]
+    assert len(batches) == 1
+    assert outcomes == [None]
+    assert not pool._batcher._batches
+    pool.shutdown()
+
+
+def test_jobs_sent_to_ocr_server(monkeypatch, tmp_path):
+    """Test that with a server socket OCR jobs run on the shared OCR server"""
+    from app import ocr_server
+
+    monkeypatch.setitem(ocr_server.OCR_JOBS, "extract_region", lambda path, page, region: [[f"{path}:{page}:{region}"], NO_TIMINGS])
+    monkeypatch.setitem(ocr_server.OCR_JOBS, "extract_batch", lambda items: [[[item[0]] for item in items], NO_TIMINGS])
+    socket_path = str(tmp_path / "ocr.sock")
+
+    async def handle(reader, writer):
+        line = await reader.readline()
+        writer.write(json.dumps(ocr_server.handle_request(line)).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_unix_server(handle, path=socket_path)
+        pool = OCRWorkerPool(workers=2, queue_size=10, batch_size=2, batch_max_wait_ms=20, server_socket=socket_path)
+        async with server:
+            single = await OCRWorkerPool(workers=0, queue_size=1, server_socket=socket_path).ocr_region("ekg.png", 1, "header")
+            batched = await asyncio.gather(pool.ocr_region("a.png", 1, "page"), pool.ocr_region("b.png", 1, "page"))
+            with pytest.raises(ValueError):
+                await pool.submit(slow_job, "not an OCR job")
+        return single, batched, pool.stats()
+
+    single, batched, stats = asyncio.run(run())
+
+    assert single == ["ekg.png:1:header"]
+    assert batched == [["a.png"], ["b.png"]]
+    assert stats["mode"] == "server"
+    assert stats["batches"] == 1
+
+
+def test_ocr_server_reports_job_errors():
+    """Test that unknown jobs and job exceptions are answered as errors"""
+    from app import ocr_server
+
+    assert "Unknown OCR job" in ocr_server.handle_request(b'{"job": "os.system", "args": ["ls"]}')["error"]
+    assert ocr_server.handle_request(b"not json")["error"].startswith("JSONDecodeError")
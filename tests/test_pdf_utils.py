@@ -0,0 +1,65 @@
+import subprocess
+from app.utils import pdf_utils
+from app.utils.pdf_utils import get_pdf_text_layers, is_usable_text_layer, merge_pages
+
+
+def test_usable_text_layer():
+    """Test that real lab export text is accepted"""
+    text = "Morfologia krwi\nWBC 7.5 tys/µl\nHemoglobina 14.2 g/dl\nData pobrania: 15.11.2024"
+    assert is_usable_text_layer(text)
+
+
+def test_empty_text_layer_is_rejected():
+    """Test that scanned pages without text need OCR"""
+    assert not is_usable_text_layer("")
+    assert not is_usable_text_layer("   \n  12 ")
+
+
+def test_garbage_text_layer_is_rejected():
+    """Test that broken font encodings are not trusted"""
+    assert not is_usable_text_layer("ÿþ€‚ƒ„…†‡ˆ‰Š‹ŒŽ''\"\"•–—˜™š›œžŸ¡¢£¤¥¦§¨©ª«¬®¯" * 2)
+    assert not is_usable_text_layer("�" * 40)
+
+
+def test_get_pdf_text_layers_splits_pages(monkeypatch):
+    """Test per-page split of pdftotext output"""
+    stdout = "Grupa krwi A Rh+ oznaczenie wykonano\f\f".encode("utf-8")
+
+    def fake_run(*args, **kwargs):
+        return subprocess.CompletedProcess(args, 0, stdout=stdout, stderr=b"")
+
+    monkeypatch.setattr(pdf_utils.subprocess, "run", fake_run)
+
+    layers = get_pdf_text_layers("card.pdf")
+    assert layers == [["Grupa krwi A Rh+ oznaczenie wykonano"], None]
+
+
+def test_get_pdf_text_layers_without_poppler(monkeypatch):
+    """Test that missing pdftotext falls back to OCR"""
+    def fake_run(*args, **kwargs):
+        raise FileNotFoundError("pdftotext")
+
+    monkeypatch.setattr(pdf_utils.subprocess, "run", fake_run)
+    assert get_pdf_text_layers("card.pdf") == []
+
+
+def test_merge_pages_keeps_order():
+    """Test reassembly of per-page results"""
+    full_text, lines = merge_pages([["Karta informacyjna"], [], ["Rozpoznanie", "Zalecenia"]])
+    assert full_text == "Karta informacyjna Rozpoznanie Zalecenia"
+    assert lines == ["Karta informacyjna", "Rozpoznanie", "Zalecenia"]
+
+
+def test_pad_to_common_shape():
+    """Test padding of differently sized pages for batched OCR"""
+    import numpy as np
+    from app.utils.image_utils import pad_to_common_shape
+
+    gray = np.zeros((10, 20), dtype=np.uint8)
+    rgba = np.zeros((15, 5, 4), dtype=np.uint8)
+
+    padded = pad_to_common_shape([gray, rgba])
+
+    assert [image.shape for image in padded] == [(15, 20, 3), (15, 20, 3)]
+    assert padded[0][12, 0, 0] == 255
+    assert padded[1][0, 10, 0] == 255
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.services import pipeline_service
+from app.services.pipeline_service import DocumentPipeline
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Replace OCR worker pool with a fake two-page document"""
+    regions = [
+        (1, "header", ["Morfologia krwi"]),
+        (1, "body", ["WBC 7.5", "RBC 4.8", "Hemoglobina 14.2"]),
+        (2, "header", ["Hematokryt 42%"]),
+        (2, "body", ["Leukocyty", "Erytrocyty"]),
+    ]
+    processed = []
+
+    async def page_count(file_path):
+        return 2
+
+    async def lookup_cache(file_path):
+        return None, None
+
+    async def iter_regions(file_path, reject_when_full=True, roi_pages=None):
+        for region in regions:
+            processed.append(region)
+            yield region
+
+    monkeypatch.setattr(pipeline_service.ocr_worker_pool, "page_count", page_count)
+    monkeypatch.setattr(pipeline_service.ocr_worker_pool, "lookup_cache", lookup_cache)
+    monkeypatch.setattr(pipeline_service.ocr_worker_pool, "iter_regions", iter_regions)
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_ENABLED", True)
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_CHECK_LLM", False)
+    return processed
+
+
+def test_early_exit_stops_when_confident(fake_ocr, monkeypatch):
+    """Test that OCR stops as soon as rules reach the confidence threshold"""
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_CONFIDENCE", 0.5)
+
+    text, metadata = asyncio.run(DocumentPipeline().extract_text(["scan.pdf"]))
+
+    assert metadata["ocr_early_exit"] is True
+    assert metadata["ocr_regions_processed"] == 2
+    assert metadata["ocr_pages_processed"] == 1
+    assert metadata["ocr_pages_total"] == 2
+    assert len(fake_ocr) == 2
+    assert text.startswith("Morfologia krwi")
+
+
+def test_early_exit_reads_everything_when_unsure(fake_ocr, monkeypatch):
+    """Test that the whole document is OCR'd when threshold is never reached"""
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_CONFIDENCE", 1.1)
+
+    text, metadata = asyncio.run(DocumentPipeline().extract_text(["scan.pdf"]))
+
+    assert metadata["ocr_early_exit"] is False
+    assert metadata["ocr_regions_processed"] == 4
+    assert metadata["ocr_pages_processed"] == 2
+    assert "Erytrocyty" in text
+
+
+def test_early_exit_caches_fully_read_files_only(fake_ocr, monkeypatch):
+    """Test that a file read to the end is cached and a file left early is not"""
+    stored = []
+
+    async def lookup_cache(file_path):
+        return f"key:{file_path}", None
+
+    async def store_cache(cache_key, full_text, lines, ocr_seconds):
+        stored.append((cache_key, full_text, lines))
+
+    monkeypatch.setattr(pipeline_service.ocr_worker_pool, "lookup_cache", lookup_cache)
+    monkeypatch.setattr(pipeline_service.ocr_worker_pool, "store_cache", store_cache)
+
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_CONFIDENCE", 0.5)
+    asyncio.run(DocumentPipeline().extract_text(["scan.pdf"]))
+    assert stored == []
+
+    monkeypatch.setattr(settings, "OCR_EARLY_EXIT_CONFIDENCE", 1.1)
+    asyncio.run(DocumentPipeline().extract_text(["scan.pdf"]))
+    assert stored == [(
+        "key:scan.pdf",
+        "Morfologia krwi WBC 7.5 RBC 4.8 Hemoglobina 14.2 Hematokryt 42% Leukocyty Erytrocyty",
+        ["Morfologia krwi", "WBC 7.5", "RBC 4.8", "Hemoglobina 14.2", "Hematokryt 42%", "Leukocyty", "Erytrocyty"],
+    )]
@@ -0,0 +1,126 @@
+import io
+import hashlib
+import asyncio
+import pytest
+from starlette.datastructures import UploadFile
+import os
+import time
+from app.services.storage_service import (
+    StorageService, LocalStorageBackend, FileTooLargeError, upload_buffers, processed_key
+)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "PROCESSED_DIR", str(tmp_path / "processed"))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+    return StorageService(backend=LocalStorageBackend(str(tmp_path / "processed")))
+
+
+def upload(content: bytes, filename: str = "scan.png") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+def test_save_upload_streams_hash_and_buffer(storage, monkeypatch):
+    """Test that the upload is written once, hashed on the fly and kept for OCR"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "OCR_WORKERS", 0)
+    monkeypatch.setattr(settings, "OCR_SERVER_SOCKET", "")
+    content = b"0123456789abcdef"
+    stored = asyncio.run(storage.save_upload(upload(content)))
+
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert open(stored.file_path, "rb").read() == content
+    assert upload_buffers.content(stored.file_path) == content
+    assert upload_buffers.sha256(stored.file_path) == stored.sha256
+
+    asyncio.run(storage.cleanup_temp_file(stored.file_path))
+    assert upload_buffers.content(stored.file_path) is None
+
+
+def test_save_upload_keeps_only_hash_for_ocr_processes(storage, monkeypatch):
+    """Test that bytes are not buffered when OCR runs in worker processes or the OCR server"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "OCR_SERVER_SOCKET", "")
+    monkeypatch.setattr(settings, "OCR_WORKERS", 2)
+    stored = asyncio.run(storage.save_upload(upload(b"worker process")))
+    assert upload_buffers.content(stored.file_path) is None
+    assert upload_buffers.sha256(stored.file_path) == stored.sha256
+
+    monkeypatch.setattr(settings, "OCR_WORKERS", 0)
+    monkeypatch.setattr(settings, "OCR_SERVER_SOCKET", "/run/ocr/ocr.sock")
+    served = asyncio.run(storage.save_upload(upload(b"ocr server")))
+    assert upload_buffers.content(served.file_path) is None
+
+    asyncio.run(storage.cleanup_temp_file(stored.file_path))
+    asyncio.run(storage.cleanup_temp_file(served.file_path))
+
+
+def test_save_upload_rejects_oversized_file_while_streaming(storage, monkeypatch, tmp_path):
+    """Test that MAX_FILE_SIZE is enforced without writing anything"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 10)
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(storage.save_upload(upload(b"x" * 11)))
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+
+def test_save_upload_without_memory_buffer(storage):
+    """Test that uploads processed by another process are not registered"""
+    stored = asyncio.run(storage.save_upload(upload(b"pdf bytes", "doc.pdf"), keep_in_memory=False))
+
+    assert upload_buffers.sha256(stored.file_path) is None
+    assert open(stored.file_path, "rb").read() == b"pdf bytes"
+
+
+def test_save_upload_rejects_extension(storage):
+    """Test extension validation before reading the body"""
+    with pytest.raises(ValueError, match="not allowed"):
+        asyncio.run(storage.save_upload(upload(b"x", "script.exe")))
+
+
+def test_processed_key_is_sharded():
+    """Test hash-prefix sharding of processed files"""
+    key = processed_key("DOC_BADANIE_EKG", "abc.png", depth=2)
+    document_type, first, second, filename = key.split("/")
+
+    assert (document_type, filename) == ("DOC_BADANIE_EKG", "abc.png")
+    assert len(first) == len(second) == 2
+    assert key == processed_key("DOC_BADANIE_EKG", "abc.png", depth=2)
+
+
+def test_move_to_processed(storage, tmp_path):
+    """Test that processed files land in the sharded layout without partial files"""
+    stored = asyncio.run(storage.save_upload(upload(b"image")))
+    location = asyncio.run(storage.move_to_processed(stored.file_path, "DOC_BADANIE_EKG"))
+
+    assert location.endswith(processed_key("DOC_BADANIE_EKG", os.path.basename(stored.file_path)))
+    assert open(location, "rb").read() == b"image"
+    assert not os.path.exists(stored.file_path)
+    assert upload_buffers.content(stored.file_path) is None
+    assert not list((tmp_path / "processed").rglob("*.part"))
+
+
+def test_janitor_removes_only_old_orphans(storage, tmp_path):
+    """Test cleanup of uploads left behind by crashes"""
+    uploads = tmp_path / "uploads"
+    orphan = uploads / "orphan.png"
+    orphan.write_bytes(b"x")
+    old = time.time() - 7200
+    os.utime(orphan, (old, old))
+    fresh = uploads / "fresh.png"
+    fresh.write_bytes(b"x")
+    in_flight = asyncio.run(storage.save_upload(upload(b"busy")))
+    os.utime(in_flight.file_path, (old, old))
+
+    removed = asyncio.run(storage.cleanup_orphans(max_age_seconds=3600))
+
+    assert removed == 1
+    assert not orphan.exists()
+    assert fresh.exists()
+    assert os.path.exists(in_flight.file_path)
+    asyncio.run(storage.cleanup_temp_file(in_flight.file_path))
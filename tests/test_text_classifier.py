@@ -0,0 +1,99 @@
+import random
+import pytest
+from app.models import DocumentType
+from app.services.classifier_service import DocumentClassifier
+from app.services.text_classifier_service import NgramTextClassifier, load_training_texts, normalize_text
+
+
+VOCABULARY = {
+    DocumentType.MORFOLOGIA: "morfologia krwi WBC RBC hemoglobina hematokryt leukocyty erytrocyty płytki",
+    DocumentType.PT_INR: "czas protrombinowy PT INR wskaźnik protrombinowy sekundy",
+    DocumentType.GLUKOZA: "glukoza na czczo cukier mg/dl glikemia",
+    DocumentType.EKG: "elektrokardiogram EKG rytm zatokowy oś serca odprowadzenia",
+}
+NOISE = "pacjent data badania laboratorium wynik norma jednostka pesel adres lekarz zlecający".split()
+
+
+def _synthetic_corpus(per_label=15, words=80):
+    rng = random.Random(0)
+    texts, labels = [], []
+    for doc_type, vocabulary in VOCABULARY.items():
+        pool = vocabulary.split() + NOISE
+        for _ in range(per_label):
+            texts.append(" ".join(rng.choice(pool) for _ in range(words)))
+            labels.append(doc_type.value)
+    return texts, labels
+
+
+@pytest.fixture(scope="module")
+def model():
+    texts, labels = _synthetic_corpus()
+    return NgramTextClassifier(labels=sorted(set(labels)), dim_bits=14).fit(texts, labels, epochs=60)
+
+
+def test_normalize_text_folds_diacritics_and_digits():
+    """Test that OCR variants of the same text normalize identically"""
+    assert normalize_text("Płytki KRWI 250") == normalize_text("plytki krwi 317")
+
+
+def test_predicts_trained_labels(model):
+    """Test ranking of short unseen texts"""
+    assert model.rank("Morfologia krwi: WBC 7.5, Hemoglobina 14.2")[0][0] == DocumentType.MORFOLOGIA.value
+    assert model.rank("Glukoza na czczo 92 mg/dl")[0][0] == DocumentType.GLUKOZA.value
+    assert model.rank("EKG: rytm zatokowy")[0][0] == DocumentType.EKG.value
+
+
+def test_robust_to_missing_diacritics(model):
+    """Test that text without Polish characters gets the same answer"""
+    assert model.rank("wskaznik protrombinowy")[0][0] == model.rank("wskaźnik protrombinowy")[0][0]
+
+
+def test_batch_prediction_matches_single(model):
+    """Test vectorized batch inference"""
+    texts = ["morfologia krwi", "glukoza", "", "EKG"] * 50
+    probabilities = model.predict_proba(texts)
+
+    assert probabilities.shape == (200, len(model.labels))
+    assert probabilities.sum(axis=1) == pytest.approx(1.0, abs=1e-5)
+    assert probabilities[0] == pytest.approx(model.predict_proba(["morfologia krwi"])[0], abs=1e-6)
+
+
+def test_save_and_load_round_trip(model, tmp_path):
+    """Test compact serialization"""
+    path = tmp_path / "model.npz"
+    model.save(str(path))
+    loaded = NgramTextClassifier.load(str(path))
+
+    assert loaded.labels == model.labels
+    assert loaded.predict_proba(["hematokryt leukocyty"]) == pytest.approx(
+        model.predict_proba(["hematokryt leukocyty"]), abs=1e-2
+    )
+
+
+def test_load_training_texts(tmp_path):
+    """Test reading <dir>/<document type>/*.txt and skipping unknown folders"""
+    (tmp_path / "DOC_BADANIE_EKG").mkdir()
+    (tmp_path / "DOC_BADANIE_EKG" / "1.txt").write_text("EKG", encoding="utf-8")
+    (tmp_path / "not_a_type").mkdir()
+    (tmp_path / "not_a_type" / "1.txt").write_text("x", encoding="utf-8")
+
+    texts, labels = load_training_texts(str(tmp_path))
+
+    assert texts == ["EKG"]
+    assert labels == ["DOC_BADANIE_EKG"]
+
+
+def test_document_classifier_uses_text_model(model, monkeypatch):
+    """Test that a loaded model replaces keyword rules in the local tier"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CLASSIFIER_MODE", "tiered")
+    classifier = DocumentClassifier()
+    classifier.text_model = model
+    classifier.llm_classifier = None
+
+    doc_type, confidence, keywords = classifier.classify("Morfologia krwi: WBC 7.5, RBC 4.8, Hemoglobina 14.2")
+
+    assert doc_type == DocumentType.MORFOLOGIA
+    assert 0.0 < confidence <= 1.0
+    assert "morfologia" in keywords
+    assert classifier.stats()["local_model"] == "text_model"
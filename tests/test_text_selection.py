@@ -0,0 +1,59 @@
+from app.services.classifier_service import DocumentClassifier
+from app.utils.text_selection import clean_ocr_text, estimate_tokens, select_salient_text
+
+
+def keyword_count(segment):
+    return segment.count("INR")
+
+
+def test_clean_ocr_text_drops_noise():
+    """Test whitespace collapsing and removal of OCR debris"""
+    assert clean_ocr_text("Grupa   krwi | ---- A  Rh+ #%&a\n12.5 ....") == "Grupa krwi A Rh+ 12.5"
+
+
+def test_short_text_is_sent_whole():
+    """Test that texts within the budget are only cleaned"""
+    text, metadata = select_salient_text("APTT 31 s  |", token_budget=100, head_tokens=20, score=keyword_count)
+
+    assert text == "APTT 31 s"
+    assert metadata["llm_text_truncated"] is False
+    assert metadata["llm_tokens_sent"] < metadata["llm_tokens_original"]
+
+
+def test_long_text_keeps_header_and_salient_spans():
+    """Test selection of header and keyword spans under the token budget"""
+    header = "SZPITAL WOJEWODZKI Laboratorium Analityczne Sprawozdanie z badania nr 123 pacjent Jan Kowalski"
+    filler = " ".join(f"opis{i} przebiegu leczenia pacjenta bez istotnych zmian" for i in range(200))
+    text = f"{header} {filler} Czas protrombinowy INR 2.8 leczenie acenokumarolem {filler}"
+
+    selected, metadata = select_salient_text(text, token_budget=120, head_tokens=40, score=keyword_count)
+
+    assert selected.startswith("SZPITAL WOJEWODZKI")
+    assert "INR 2.8" in selected
+    assert "…" in selected
+    assert metadata["llm_text_truncated"] is True
+    assert metadata["llm_tokens_sent"] <= 125
+    assert metadata["llm_tokens_original"] == estimate_tokens(text)
+    assert metadata["llm_segments_salient"] == 1
+
+
+def test_classifier_sends_selected_text_to_llm(monkeypatch):
+    """Test that the LLM tier receives the budgeted text"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "LLM_TEXT_TOKEN_BUDGET", 60)
+    monkeypatch.setattr(settings, "LLM_TEXT_HEAD_TOKENS", 20)
+    classifier = DocumentClassifier()
+    seen = []
+
+    class FakeLLM:
+        enabled = True
+
+        async def classify_async(self, text):
+            seen.append(text)
+            return None, 0.0, ""
+
+    classifier.llm_classifier = FakeLLM()
+    classifier.classify("Karta informacyjna " + "bez zmian " * 300 + " EKG rytm zatokowy")
+
+    assert estimate_tokens(seen[0]) <= 65
+    assert "EKG rytm zatokowy" in seen[0]
@@ -0,0 +1,81 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.services.warmup_service import ModelWarmup
+
+client = TestClient(app)
+
+
+def test_ready_after_required_components_load(monkeypatch):
+    """Test that readiness waits for required models only and reports timings"""
+    monkeypatch.setattr(settings, "MODEL_WARMUP", True)
+    warmup = ModelWarmup()
+    loaded = asyncio.Event()
+
+    async def load_ocr():
+        await loaded.wait()
+        return {"workers_loaded": 1}
+
+    async def load_llm():
+        return {"available": False}
+
+    async def run():
+        with warmup.step("ocr_pool"):
+            pass
+        warmup.register("ocr", load_ocr, required=True)
+        warmup.register("llm", load_llm, required=False)
+        warmup.start()
+        await asyncio.sleep(0.01)
+        before = warmup.status()
+        loaded.set()
+        await warmup._task
+        return before, warmup.status()
+
+    before, after = asyncio.run(run())
+
+    assert before["ready"] is False
+    assert before["components"]["ocr"]["state"] == "loading"
+    assert after["ready"] is True
+    assert after["components"]["ocr"]["workers_loaded"] == 1
+    assert after["components"]["llm"]["state"] == "unavailable"
+    assert {"ocr_pool", "warmup", "load_ocr", "load_llm"} <= set(after["startup_seconds"])
+
+
+def test_failed_required_component_is_not_ready(monkeypatch):
+    """Test that a model that failed to load keeps the process not ready"""
+    monkeypatch.setattr(settings, "MODEL_WARMUP", True)
+    warmup = ModelWarmup()
+
+    async def load_ocr():
+        raise RuntimeError("weights not found")
+
+    async def run():
+        warmup.register("ocr", load_ocr)
+        warmup.start()
+        await warmup._task
+
+    asyncio.run(run())
+
+    status = warmup.status()
+    assert status["ready"] is False
+    assert status["components"]["ocr"] == {
+        "state": "failed", "required": True, "seconds": status["components"]["ocr"]["seconds"],
+        "error": "weights not found"
+    }
+
+
+def test_ready_endpoint(monkeypatch):
+    """Test /ready status codes"""
+    monkeypatch.setattr(settings, "MODEL_WARMUP", True)
+    warmup = ModelWarmup()
+    warmup.register("ocr", lambda: None)
+    monkeypatch.setattr("app.main.model_warmup", warmup)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["ocr"]["state"] == "not_loaded"
+
+    # Lazy loading: ready as soon as the process serves requests
+    monkeypatch.setattr(settings, "MODEL_WARMUP", False)
+    assert client.get("/ready").status_code == 200